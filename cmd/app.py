@@ -1,5 +1,6 @@
 """Flask 应用入口"""
 import os
+import atexit
 import logging
 
 from flask import Flask
@@ -7,7 +8,10 @@ from flask import Flask
 from internal.configs.config import Config
 from internal.middleware.logging import setup_logging
 from internal.service.service import register_routes
-from internal.pkg.dao import init_database
+from internal.pkg.dao import init_database, close_pool, close_chat_writer, close_audit_log
+from internal.pkg.models.llm_client import close_llm_client
+from internal.pkg.models.response_cache import close_response_cache
+from internal.service.chat_agent.intent_classifier import close_intent_classifier
 
 # 设置日志
 setup_logging()
@@ -24,6 +28,13 @@ register_routes(app)
 
 # 初始化数据库
 init_database()
+atexit.register(close_pool)
+# atexit 后注册先执行：先写完排队中的对话消息与操作日志再关闭连接池
+atexit.register(close_chat_writer)
+atexit.register(close_audit_log)
+atexit.register(close_llm_client)
+atexit.register(close_response_cache)
+atexit.register(close_intent_classifier)
 
 
 if __name__ == '__main__':
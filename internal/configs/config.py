@@ -19,11 +19,88 @@ class Config:
     MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "rootroot")
     MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "logistics")
 
+    # MySQL 连接池配置
+    MYSQL_POOL_MIN_SIZE = int(os.getenv("MYSQL_POOL_MIN_SIZE", "2"))
+    MYSQL_POOL_MAX_SIZE = int(os.getenv("MYSQL_POOL_MAX_SIZE", "20"))
+    MYSQL_POOL_MAX_LIFETIME = float(os.getenv("MYSQL_POOL_MAX_LIFETIME", "3600"))  # 秒
+    MYSQL_POOL_PING_INTERVAL = float(os.getenv("MYSQL_POOL_PING_INTERVAL", "30"))  # 空闲超过该秒数借出前 ping
+    MYSQL_POOL_ACQUIRE_TIMEOUT = float(os.getenv("MYSQL_POOL_ACQUIRE_TIMEOUT", "10"))  # 秒
+
+    # 数据代际：多进程部署时感知其他进程数据变更的最长延迟（秒）
+    GENERATION_CHECK_INTERVAL = float(os.getenv("GENERATION_CHECK_INTERVAL", "1"))
+
+    # 物流列式快照最多保留的最近记录数
+    SNAPSHOT_MAX_ROWS = int(os.getenv("SNAPSHOT_MAX_ROWS", "200000"))
+
+    # 流式读取配置（iter_shipments / 导出）
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "5000"))  # 每批行数
+    STREAM_NET_WRITE_TIMEOUT = int(os.getenv("STREAM_NET_WRITE_TIMEOUT", "600"))  # 秒
+
+    # 对话消息后写队列：ChatAgent 消息由后台线程批量写库
+    CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "true").lower() == "true"
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "200"))  # 每批最多条数
+    CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL", "0.05"))  # 凑批等待秒数
+
+    # 操作日志异步批量写入
+    AUDIT_LOG_ASYNC = os.getenv("AUDIT_LOG_ASYNC", "true").lower() == "true"
+    AUDIT_LOG_BUFFER_SIZE = int(os.getenv("AUDIT_LOG_BUFFER_SIZE", "10000"))  # 缓冲区上限，写满后同步写库
+    AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500"))  # 每批最多条数
+    AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "0.5"))  # 秒
+
+    # 日志分区、保留与归档
+    LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "12"))  # 操作日志保留整月数，0 为永久保留
+    CHAT_RETENTION_MONTHS = int(os.getenv("CHAT_RETENTION_MONTHS", "0"))  # 对话历史保留月数，0 为永久保留
+    LOG_PARTITION_AHEAD_MONTHS = int(os.getenv("LOG_PARTITION_AHEAD_MONTHS", "3"))  # 提前建好的未来月分区数
+    LOG_QUERY_WINDOW_MONTHS = int(os.getenv("LOG_QUERY_WINDOW_MONTHS", "2"))  # 日志列表优先只查最近几个月的分区
+    RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "24"))  # 0 关闭定时执行
+    ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"  # 删除前是否导出归档
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "jsonl")  # jsonl（gzip）/ parquet（需 pyarrow）
+
+    # 地点字典：起点/终点筛选改写为规范化地址列上的等值条件
+    LOCATION_INDEX_MAX_ENTRIES = int(os.getenv("LOCATION_INDEX_MAX_ENTRIES", "50000"))  # 每侧最多组合数，超过退回 LIKE
+    LOCATION_MAX_IN = int(os.getenv("LOCATION_MAX_IN", "500"))  # 单个筛选改写出的 IN 列表上限
+
+    # 批量改状态每个事务处理的记录数
+    MUTATION_CHUNK_SIZE = int(os.getenv("MUTATION_CHUNK_SIZE", "500"))
+
+    # CSV 导入配置
+    IMPORT_MODE = os.getenv("IMPORT_MODE", "swap")  # swap: 影子表原子换表；replace: 单事务清空后写入
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "20000"))  # 流式读取 CSV 每块行数
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))  # 多行 INSERT 每批行数
+    IMPORT_USE_LOAD_DATA = os.getenv("IMPORT_USE_LOAD_DATA", "false").lower() == "true"  # 需服务端开启 local_infile
+
     # MiniMax API 配置
     MINIMAX_API_KEY = os.getenv("MINIMAX_API_KEY")
     MINIMAX_API_URL = os.getenv("MINIMAX_API_URL", "https://api.minimaxi.com/anthropic/v1/messages")
     MINIMAX_MODEL = os.getenv("MINIMAX_MODEL", "MiniMax-M2.7-highspeed")
 
+    # 模型客户端：共享连接池与超时（秒）
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))  # 两次收到数据之间的最长间隔
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))  # 空闲连接保留时间
+
+    # 模型响应缓存：按 (模型, 提示词, 数据代际) 缓存完整响应，过期时间按场景设置（秒）
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")  # 为空时只用内存缓存
+    LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+    LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "5000"))
+    LLM_CACHE_REPLAY_CHUNK = int(os.getenv("LLM_CACHE_REPLAY_CHUNK", "64"))  # 命中时重放的片段长度
+    LLM_CACHE_TTL_ROUTE = float(os.getenv("LLM_CACHE_TTL_ROUTE", "86400"))  # chat_agent 意图路由
+    LLM_CACHE_TTL_REPORT = float(os.getenv("LLM_CACHE_TTL_REPORT", "1800"))  # 日报 / 分析报告 / 对比分析
+    LLM_CACHE_TTL_CODE = float(os.getenv("LLM_CACHE_TTL_CODE", "3600"))  # 代码生成
+
+    # chat_agent 本地意图分类：置信度不够时才调用模型
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+    INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "data/intent_model.json")
+    INTENT_RULE_CONFIDENCE = float(os.getenv("INTENT_RULE_CONFIDENCE", "0.6"))  # 规则命中且与模型一致时的最低概率
+    INTENT_MODEL_CONFIDENCE = float(os.getenv("INTENT_MODEL_CONFIDENCE", "0.9"))  # 没有规则命中时的最低概率
+    INTENT_MODEL_SAVE_EVERY = int(os.getenv("INTENT_MODEL_SAVE_EVERY", "20"))  # 增量学习多少条落盘一次
+
+    # 日报 / 分析报告并发请求合并：同一数据代际只生成一次，完成后结果保留秒数
+    STREAM_RETENTION_SECONDS = float(os.getenv("STREAM_RETENTION_SECONDS", "600"))
+
     # 高德地图 API 配置
     AMAP_API_KEY = os.getenv("AMAP_API_KEY", "82de2ea63b894cfddb12e56f8e76a637")
     AMAP_GEO_KEY = os.getenv("AMAP_GEO_KEY", "2c35b15d80e3779d6db45ff9999cf3bb")
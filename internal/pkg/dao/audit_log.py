@@ -0,0 +1,157 @@
+# internal/pkg/dao/audit_log.py
+"""操作日志异步批量写入
+
+登录、上传、清空、删除用户等操作记日志时只追加到内存环形缓冲区，由后台线程定期批量写入 operation_logs：
+- 缓冲区有容量上限（AUDIT_LOG_BUFFER_SIZE）；写满时不丢日志，改为在请求线程同步写库（背压）
+- 后台线程攒够 AUDIT_LOG_BATCH_SIZE 条或每隔 AUDIT_LOG_FLUSH_INTERVAL 秒写一批，多行 INSERT 一次提交
+- 日志时间取入队时刻，不受写库延迟影响
+- stats() 返回入队/写入/同步回退/失败次数、当前积压与历史最高积压，便于观察背压
+"""
+import collections
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from internal.configs.config import Config
+from internal.pkg.dao.pool import get_pool
+
+INSERT_LOG_SQL = (
+    "INSERT INTO operation_logs (user_id, username, action, detail, ip_address, timestamp) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+_RETRY_DELAYS = (0.2, 1.0)
+
+
+def write_logs(rows: List[tuple]) -> None:
+    """同步批量写入日志行"""
+    with get_pool().connection() as conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.executemany(INSERT_LOG_SQL, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+class AuditLogPipeline:
+    """操作日志缓冲区 + 后台批量写入线程"""
+
+    def __init__(self, capacity: int = None, batch_size: int = None, flush_interval: float = None):
+        self.capacity = capacity or Config.AUDIT_LOG_BUFFER_SIZE
+        self.batch_size = batch_size or Config.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval = Config.AUDIT_LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._buffer: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'enqueued': 0, 'written': 0, 'batches': 0,
+            'sync_fallbacks': 0, 'failed': 0, 'high_water': 0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, user_id: int, username: str, action: str, detail: str, ip_address: str) -> None:
+        """追加一条日志；缓冲区已满或已关闭时同步写库"""
+        row = (user_id, username, action, detail, ip_address, datetime.now())
+        with self._cond:
+            if not self._closed and len(self._buffer) < self.capacity:
+                self._buffer.append(row)
+                self._stats['enqueued'] += 1
+                self._stats['high_water'] = max(self._stats['high_water'], len(self._buffer))
+                self._ensure_started()
+                if len(self._buffer) >= self.batch_size:
+                    self._cond.notify_all()
+                return
+            self._stats['sync_fallbacks'] += 1
+        self._write([row])
+
+    def _write(self, rows: List[tuple]) -> bool:
+        for delay in _RETRY_DELAYS + (None,):
+            try:
+                write_logs(rows)
+                with self._cond:
+                    self._stats['written'] += len(rows)
+                    self._stats['batches'] += 1
+                return True
+            except Exception as e:
+                if delay is None:
+                    with self._cond:
+                        self._stats['failed'] += len(rows)
+                    print(f"添加日志失败（{len(rows)} 条）: {e}")
+                    return False
+                time.sleep(delay)
+        return False
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._buffer) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if not self._buffer:
+                    if self._closed:
+                        return
+                    continue
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._inflight = len(batch)
+            try:
+                self._write(batch)
+            finally:
+                with self._cond:
+                    self._inflight = 0
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """等待当前缓冲区写完，超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._buffer or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """背压与吞吐统计"""
+        with self._cond:
+            return dict(self._stats, pending=len(self._buffer) + self._inflight, capacity=self.capacity)
+
+    def close(self, timeout: float = 30.0) -> None:
+        """写完缓冲区后停止后台线程；之后的日志同步写库"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_pipeline: Optional[AuditLogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_audit_log() -> AuditLogPipeline:
+    """获取进程级操作日志写入管道（首次调用时创建）"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = AuditLogPipeline()
+    return _pipeline
+
+
+def close_audit_log() -> None:
+    """写完缓冲区中的日志并关闭管道（进程退出时调用，需在关闭连接池之前）"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.close()
+            _pipeline = None
@@ -0,0 +1,87 @@
+# internal/pkg/dao/chat_search.py
+"""对话历史全文检索
+
+chat_history 的 title / user_input / ai_response 建有 ngram 分词的 FULLTEXT 索引（中文按二元组切词），
+检索走倒排索引而不是对用户全部历史做 LIKE '%kw%' 扫描。
+
+- 过滤：BOOLEAN MODE，每个关键词作为短语必须出现（+"词"），避免 ngram 拆词后只命中半个词
+- 排序：NATURAL LANGUAGE MODE 的相关度（InnoDB 基于 TF-IDF 的打分），相同时按时间倒序
+- 短于 ngram_token_size（默认 2）的关键词无法走索引，整体退回 LIKE 检索
+- 片段：在命中字段中截取关键词附近的文本，HTML 转义后用 <mark> 高亮
+"""
+import html
+import re
+from typing import Dict, List, Optional, Tuple
+
+FULLTEXT_INDEX = 'ft_chat_content'
+FULLTEXT_COLUMNS = 'title, user_input, ai_response'
+# 与 MySQL ngram_token_size 默认值一致
+NGRAM_TOKEN_SIZE = 2
+# 片段字段的检查顺序
+SNIPPET_FIELDS = ('title', 'user_input', 'ai_response')
+
+# BOOLEAN MODE 中有特殊含义的字符
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def split_terms(keyword: str) -> List[str]:
+    """关键词按空白切分、去掉布尔运算符并去重（保持顺序）"""
+    terms = []
+    for term in _BOOLEAN_OPERATORS.sub(' ', keyword or '').split():
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def boolean_query(terms: List[str]) -> Optional[str]:
+    """构造 BOOLEAN MODE 查询串；有关键词短于分词长度时返回 None（需退回 LIKE）"""
+    if not terms or any(len(term) < NGRAM_TOKEN_SIZE for term in terms):
+        return None
+    return ' '.join(f'+"{term}"' for term in terms)
+
+
+def like_clause(terms: List[str]) -> Tuple[str, List[str]]:
+    """LIKE 退化检索条件：每个关键词需出现在任一字段中"""
+    clauses, params = [], []
+    for term in terms:
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        clauses.append('(title LIKE %s OR user_input LIKE %s OR ai_response LIKE %s)')
+        params.extend([pattern] * 3)
+    return ' AND '.join(clauses), params
+
+
+def build_snippet(text: str, terms: List[str], width: int = 80) -> Optional[str]:
+    """截取首个命中位置附近 width 个字符，转义后高亮所有关键词；未命中返回 None"""
+    if not text:
+        return None
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    if not positions:
+        return None
+    first = min(positions)
+    start = max(0, first - width // 4)
+    end = min(len(text), start + width)
+    start = max(0, min(start, end - width))
+    window = text[start:end]
+
+    pattern = re.compile('|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    parts, last = [], 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[last:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(html.escape(window[last:]))
+    snippet = ''.join(parts).replace('\n', ' ')
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+
+def attach_snippet(row: Dict, terms: List[str]) -> Dict:
+    """为检索结果补充 snippet / matched_field"""
+    row['snippet'], row['matched_field'] = None, None
+    for field in SNIPPET_FIELDS:
+        snippet = build_snippet(row.get(field) or '', terms)
+        if snippet:
+            row['snippet'], row['matched_field'] = snippet, field
+            break
+    return row
@@ -0,0 +1,95 @@
+# internal/pkg/dao/chat_sessions.py
+"""对话会话汇总表 chat_sessions
+
+侧边栏会话列表每次都对用户全部 chat_history 做 GROUP BY，改为维护一张每会话一行的汇总表，
+列表只需按 (user_id, last_updated) 索引倒序读取 limit 行。
+
+- chat_agent 页面：session_key 为 session_id，create_session 建行，每条 add_message 更新计数与预览
+- 其他页面：每条 create_chat 记录独立成行，session_key 为 'single_<id>'
+- 与 chat_history 的写入在同一事务内完成；删除单条会话消息时按会话重算
+"""
+from typing import Optional
+
+SESSIONS_TABLE = 'chat_sessions'
+# 标题与最后一条消息预览的长度
+TITLE_LENGTH = 256
+PREVIEW_LENGTH = 200
+
+CREATE_SESSIONS_SQL = f"""CREATE TABLE IF NOT EXISTS {SESSIONS_TABLE} (
+    session_key VARCHAR(64) PRIMARY KEY COMMENT 'chat_agent 为 session_id，其他页面为 single_<chat_history.id>',
+    user_id INT NOT NULL,
+    page VARCHAR(64) NOT NULL,
+    is_session TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否为 chat_agent 多轮会话',
+    title VARCHAR({TITLE_LENGTH}) NOT NULL DEFAULT '',
+    last_message VARCHAR({PREVIEW_LENGTH}) NOT NULL DEFAULT '' COMMENT '最后一条消息预览',
+    message_count INT NOT NULL DEFAULT 0,
+    last_updated DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_user_updated (user_id, last_updated)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+
+_COLUMNS = 'session_key, user_id, page, is_session, title, last_message, message_count, last_updated'
+
+# 由 chat_history 聚合 chat_agent 会话行；最后一条消息按 message_order 取
+_AGENT_SESSIONS_SQL = f"""
+    INSERT INTO {SESSIONS_TABLE} ({_COLUMNS})
+    SELECT s.session_id, s.user_id, 'chat_agent', 1, s.title,
+           COALESCE((SELECT LEFT(IF(h.user_input != '', h.user_input, COALESCE(h.ai_response, '')), {PREVIEW_LENGTH})
+                     FROM chat_history h
+                     WHERE h.session_id = s.session_id AND h.user_input != '__SESSION_START__'
+                     ORDER BY h.message_order DESC, h.id DESC LIMIT 1), ''),
+           s.message_count, s.last_updated
+    FROM (
+        SELECT session_id, MIN(user_id) AS user_id,
+               COALESCE(MAX(CASE WHEN user_input = '__SESSION_START__' THEN title END), '') AS title,
+               SUM(user_input != '__SESSION_START__') AS message_count,
+               COALESCE(MAX(created_at), NOW()) AS last_updated
+        FROM chat_history
+        WHERE page = 'chat_agent' AND session_id != '' {{filter}}
+        GROUP BY session_id
+    ) s"""
+
+_SINGLE_CHATS_SQL = f"""
+    INSERT INTO {SESSIONS_TABLE} ({_COLUMNS})
+    SELECT CONCAT('single_', id), user_id, page, 0,
+           LEFT(COALESCE(NULLIF(title, ''), user_input), {TITLE_LENGTH}),
+           LEFT(COALESCE(NULLIF(ai_response, ''), user_input), {PREVIEW_LENGTH}),
+           1, COALESCE(created_at, NOW())
+    FROM chat_history
+    WHERE page != 'chat_agent'"""
+
+
+def preview(text: Optional[str], length: int = PREVIEW_LENGTH) -> str:
+    """截断为预览文本"""
+    return (text or '')[:length]
+
+
+def single_key(chat_id: int) -> str:
+    return f"single_{chat_id}"
+
+
+def rebuild_sessions(cursor) -> None:
+    """由 chat_history 全量重建会话汇总表（调用方负责提交）"""
+    cursor.execute(f"DELETE FROM {SESSIONS_TABLE}")
+    cursor.execute(_AGENT_SESSIONS_SQL.format(filter=''))
+    cursor.execute(_SINGLE_CHATS_SQL)
+
+
+def refresh_session(cursor, session_id: str) -> None:
+    """按 chat_history 重算单个 chat_agent 会话（调用方负责提交）；会话已无记录时删除汇总行"""
+    cursor.execute(f"DELETE FROM {SESSIONS_TABLE} WHERE session_key = %s", (session_id,))
+    cursor.execute(_AGENT_SESSIONS_SQL.format(filter='AND session_id = %s'), (session_id,))
+
+
+def touch_session(cursor, user_id: int, session_id: str, content: str,
+                  count: int = 1, title: str = None) -> None:
+    """会话新增 count 条消息（content 为最后一条）：更新计数、预览与时间；标题为空时用 title（默认 content）补上"""
+    cursor.execute(
+        f"""INSERT INTO {SESSIONS_TABLE} ({_COLUMNS})
+            VALUES (%s, %s, 'chat_agent', 1, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                message_count = message_count + VALUES(message_count),
+                title = IF(title = '', VALUES(title), title),
+                last_message = VALUES(last_message),
+                last_updated = VALUES(last_updated)""",
+        (session_id, user_id, preview(content if title is None else title, TITLE_LENGTH), preview(content), count)
+    )
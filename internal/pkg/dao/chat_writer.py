@@ -0,0 +1,195 @@
+# internal/pkg/dao/chat_writer.py
+"""对话消息后写（write-behind）队列
+
+ChatAgent 发送/流式对话时只把消息放入内存队列立即返回，由后台线程批量写库：
+- 一次取出最多 CHAT_WRITE_BATCH_SIZE 条，多行 INSERT + 会话汇总更新在一个事务内提交（组提交）
+- 单个写线程按入队顺序写入，同一会话的消息顺序与自增 id 顺序一致
+- 读会话消息前调用 wait_session()，等待该会话已入队的消息落库，保证读到自己的写入
+- 写库失败按退避重试，仍失败时逐条写入以隔离坏数据；进程退出时 close_chat_writer() 写完剩余消息
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from internal.configs.config import Config
+from internal.pkg.dao.chat_sessions import touch_session
+from internal.pkg.dao.pool import get_pool
+
+# chat_history 消息行的列顺序
+MESSAGE_COLUMNS = (
+    'user_id', 'username', 'page', 'title', 'user_input', 'ai_response',
+    'session_id', 'message_order', 'action_type', 'action_result', 'diff_content', 'created_at',
+)
+INSERT_MESSAGE_SQL = (
+    f"INSERT INTO chat_history ({', '.join(MESSAGE_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(MESSAGE_COLUMNS))})"
+)
+
+_RETRY_DELAYS = (0.2, 1.0, 3.0)
+
+
+def message_row(user_id: int, username: str, session_id: str, message_order: int, role: str,
+                content: str, action_type: str = None, action_result: str = None,
+                diff_content: str = None, created_at: datetime = None) -> tuple:
+    """一条 chat_agent 消息 -> chat_history 行（按 MESSAGE_COLUMNS 顺序）"""
+    return (user_id, username, 'chat_agent', '', content if role == 'user' else '',
+            content if role == 'assistant' else '', session_id, message_order,
+            action_type, action_result, diff_content, created_at or datetime.now())
+
+
+def write_messages(cursor, rows: List[tuple]) -> None:
+    """多行写入消息并按会话更新汇总表（调用方负责提交）"""
+    cursor.executemany(INSERT_MESSAGE_SQL, rows)
+    # 会话 -> (user_id, 首条内容, 末条内容, 条数)
+    sessions: Dict[str, List] = {}
+    for row in rows:
+        content = row[4] or row[5]
+        entry = sessions.get(row[6])
+        if entry is None:
+            sessions[row[6]] = [row[0], content, content, 1]
+        else:
+            entry[2] = content
+            entry[3] += 1
+    for session_id, (user_id, first, last, count) in sessions.items():
+        touch_session(cursor, user_id, session_id, last, count=count, title=first)
+
+
+class ChatMessageWriter:
+    """后台批量写入对话消息"""
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None):
+        self.batch_size = batch_size or Config.CHAT_WRITE_BATCH_SIZE
+        self.flush_interval = Config.CHAT_WRITE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._pending: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, row: tuple) -> None:
+        """消息入队（不阻塞）"""
+        if self._closed:
+            raise RuntimeError("对话消息写入队列已关闭")
+        with self._cond:
+            self._pending[row[6]] = self._pending.get(row[6], 0) + 1
+        self._ensure_started()
+        self._queue.put(row)
+
+    def wait_session(self, session_id: str, timeout: float = 5.0) -> bool:
+        """等待该会话已入队的消息全部落库，超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending.get(session_id):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _take_batch(self) -> Tuple[List[tuple], bool]:
+        """阻塞取出一批；第一条到达后最多再等 flush_interval 凑批。返回 (批, 是否收到停止信号)"""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, rows: List[tuple]) -> None:
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    write_messages(cursor, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _flush(self, batch: List[tuple]) -> None:
+        for delay in _RETRY_DELAYS + (None,):
+            try:
+                self._write(batch)
+                self.written += len(batch)
+                break
+            except Exception as e:
+                if delay is None:
+                    print(f"批量写入对话消息失败，改为逐条写入: {e}")
+                    self._flush_each(batch)
+                    break
+                print(f"批量写入对话消息失败，{delay}s 后重试: {e}")
+                time.sleep(delay)
+        with self._cond:
+            for row in batch:
+                left = self._pending.get(row[6], 0) - 1
+                if left > 0:
+                    self._pending[row[6]] = left
+                else:
+                    self._pending.pop(row[6], None)
+            self._cond.notify_all()
+
+    def _flush_each(self, batch: List[tuple]) -> None:
+        for row in batch:
+            try:
+                self._write([row])
+                self.written += 1
+            except Exception as e:
+                self.dropped += 1
+                print(f"写入对话消息失败，已丢弃（会话 {row[6]}，序号 {row[7]}）: {e}")
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    def close(self, timeout: float = 30.0) -> None:
+        """停止接收新消息，写完队列中剩余消息后退出"""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+_writer: Optional[ChatMessageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_chat_writer() -> ChatMessageWriter:
+    """获取进程级对话消息写入队列（首次调用时创建）"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ChatMessageWriter()
+    return _writer
+
+
+def close_chat_writer() -> None:
+    """写完剩余消息并关闭写入队列（进程退出时调用，需在关闭连接池之前）"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
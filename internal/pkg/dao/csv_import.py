@@ -0,0 +1,92 @@
+# internal/pkg/dao/csv_import.py
+"""CSV 流式读取与向量化清洗"""
+from io import BytesIO
+from typing import Any, BinaryIO, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+from internal.pkg.dao.location import LOCATION_COLUMNS, split_locations
+
+# 字符串列及缺失时的默认值
+_STR_DEFAULTS = {
+    'id': '',
+    'origin': '',
+    'destination': '',
+    'origin_city': '',
+    'destination_city': '',
+    'status': 'pending',
+    'customer_id': '',
+    'courier_company': '',
+    'courier': '',
+    'package_type': '',
+    'priority': 'standard',
+    'customer_type': '',
+    'payment_method': '',
+}
+_FLOAT_COLUMNS = ('weight', 'shipping_fee', 'length', 'width', 'height')
+_DATE_COLUMNS = ('estimated_delivery', 'actual_delivery')
+_DATETIME_COLUMNS = ('created_at',)
+
+
+def iter_shipment_chunks(source: Union[bytes, BinaryIO], chunksize: int) -> Iterator[pd.DataFrame]:
+    """按块读取 CSV 并逐块清洗，内存占用与文件大小无关"""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    # 统一按字符串读取，避免各块类型推断不一致（如单号前导 0 被吃掉）
+    reader = pd.read_csv(source, chunksize=chunksize, dtype=str, skipinitialspace=True)
+    for chunk in reader:
+        df = normalize_shipment_chunk(chunk)
+        if not df.empty:
+            yield df
+
+
+def normalize_shipment_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """向量化清洗一块原始 CSV 数据，输出列与 shipments 表一致"""
+    n = len(chunk)
+    out = {}
+
+    for column, default in _STR_DEFAULTS.items():
+        if column in chunk:
+            out[column] = chunk[column].fillna(default)
+        else:
+            out[column] = pd.Series(default, index=chunk.index, dtype=object)
+
+    for column in _FLOAT_COLUMNS:
+        if column in chunk:
+            out[column] = pd.to_numeric(chunk[column], errors='coerce').fillna(0.0).astype(np.float64)
+        else:
+            out[column] = pd.Series(np.zeros(n), index=chunk.index)
+
+    for column in _DATE_COLUMNS:
+        out[column] = _format_dates(chunk.get(column), chunk.index, '%Y-%m-%d')
+    for column in _DATETIME_COLUMNS:
+        out[column] = _format_dates(chunk.get(column), chunk.index, '%Y-%m-%d %H:%M:%S')
+
+    df = pd.DataFrame(out, index=chunk.index)
+    # 地址拆为 城市 / 区县 / 网点
+    for side in LOCATION_COLUMNS:
+        split_locations(df, side)
+    # 没有单号的记录无法入库，直接丢弃
+    return df[df['id'] != ''].reset_index(drop=True)
+
+
+def _format_dates(values: Any, index: pd.Index, fmt: str) -> pd.Series:
+    """向量化解析日期并格式化为字符串，无法解析的置为 None"""
+    if values is None:
+        return pd.Series([None] * len(index), index=index, dtype=object)
+    parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+    formatted = parsed.dt.strftime(fmt).astype(object)
+    return formatted.where(parsed.notna(), None)
+
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """向量化计算每行内容哈希（uint64，跨进程稳定），用于增量导入的变更检测"""
+    return pd.util.hash_pandas_object(df[list(columns)], index=False)
+
+
+def chunk_rows(df: pd.DataFrame, columns: List[str]) -> Iterator[tuple]:
+    """按列顺序输出参数元组（NaN/NaT 转为 None）"""
+    frame = df[list(columns)].astype(object)
+    frame = frame.where(frame.notna(), None)
+    return frame.itertuples(index=False, name=None)
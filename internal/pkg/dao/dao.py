@@ -1,14 +1,159 @@
 # internal/pkg/dao.py
 """数据访问对象层"""
+import base64
 import hashlib
+import itertools
 import json
+import os
+import time
+import tempfile
+import threading
 import contextlib
-from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator, Union, BinaryIO
 
+import pandas as pd
 import pymysql
 from pymysql.cursors import DictCursor
 
 from internal.configs.config import Config
+from internal.pkg.dao.pool import get_pool
+from internal.pkg.dao.generation import current_generation, bump_generation
+from internal.pkg.dao.csv_import import iter_shipment_chunks, chunk_rows, row_hashes
+from internal.pkg.dao.snapshot import ShipmentSnapshot, get_snapshot
+from internal.pkg.dao.location import DERIVED_COLUMNS, LOCATION_COLUMNS, LocationIndex, fill_location_fields
+from internal.pkg.dao.chat_sessions import SESSIONS_TABLE, TITLE_LENGTH, preview, refresh_session, single_key
+from internal.pkg.dao.audit_log import get_audit_log, write_logs
+from internal.pkg.dao.retention import month_start
+from internal.pkg.dao.chat_writer import get_chat_writer, message_row, write_messages
+from internal.pkg.dao.chat_search import FULLTEXT_COLUMNS, attach_snippet, boolean_query, like_clause, split_terms
+from internal.pkg.dao.rollup import ROLLUP_TABLE, collect_days, frame_days, rebuild_rollup, refresh_rollup_days
+
+# shipments 表可写列，批量写入与 LOAD DATA 均按此顺序
+SHIPMENT_COLUMNS = (
+    'id', 'origin', 'destination', 'origin_city', 'destination_city',
+    'origin_district', 'origin_hub', 'destination_district', 'destination_hub', 'status',
+    'estimated_delivery', 'actual_delivery', 'weight', 'length', 'width', 'height', 'customer_id',
+    'courier_company', 'courier', 'package_type', 'priority', 'customer_type',
+    'payment_method', 'shipping_fee', 'created_at', 'row_hash',
+)
+# 尺寸列（cm），旧版以 dimensions JSON 存储
+DIMENSION_COLUMNS = ('length', 'width', 'height')
+# 参与变更检测哈希的业务列（区县、网点由地址派生，不参与）
+_HASHED_COLUMNS = [c for c in SHIPMENT_COLUMNS if c != 'row_hash' and c not in DERIVED_COLUMNS]
+
+
+# iter_shipments 可读取的列
+STREAM_COLUMNS = SHIPMENT_COLUMNS + ('created_date', 'volumetric_weight')
+# 对外返回的列：不含内部的 row_hash（64 位无符号整数，JS 无法精确表示）与 created_date
+READ_COLUMNS = tuple(c for c in SHIPMENT_COLUMNS if c != 'row_hash') + ('volumetric_weight',)
+_READ_SELECT = ', '.join(READ_COLUMNS)
+
+
+def _criteria_clause(filters: Dict[str, Any], locations: Optional[LocationIndex] = None) -> Tuple[str, List[Any]]:
+    """Agent 查询参数 -> (WHERE 子句, 参数)：status 精确匹配，days 为最近天数，origin/destination 模糊匹配
+
+    给出 locations 时，origin/destination 先经地点字典改写为规范化地址列上的等值条件，无法改写时才用 LIKE
+    """
+    conditions = []
+    params = []
+    if filters.get('status'):
+        conditions.append("status = %s")
+        params.append(filters['status'])
+    if filters.get('days'):
+        conditions.append("created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)")
+        params.append(int(filters['days']))
+    for side in LOCATION_COLUMNS:
+        keyword = filters.get(side)
+        if not keyword:
+            continue
+        resolved = locations.resolve(side, keyword) if locations is not None else None
+        if resolved is not None:
+            conditions.append(resolved[0])
+            params.extend(resolved[1])
+        else:
+            conditions.append(f"{side} LIKE %s")
+            params.append(f"%{keyword}%")
+    return (" AND ".join(conditions) if conditions else "1=1"), params
+
+
+def _attach_dimensions(row: Dict) -> Dict:
+    """按需把尺寸列组装为旧版的 dimensions 字典"""
+    row['dimensions'] = {c: row.get(c) for c in DIMENSION_COLUMNS}
+    return row
+
+
+def _upsert_shipments_sql(table: str = 'shipments') -> str:
+    """多行 upsert 语句（PyMySQL executemany 会改写为 VALUES (...), (...)）"""
+    return (
+        f"INSERT INTO {table} ({', '.join(SHIPMENT_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(SHIPMENT_COLUMNS))}) "
+        "ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{c}=VALUES({c})" for c in SHIPMENT_COLUMNS if c != 'id')
+    )
+
+
+def _insert_ignore_shipments_sql(table: str = 'shipments') -> str:
+    """多行插入，已存在的单号保持不变"""
+    return (
+        f"INSERT IGNORE INTO {table} ({', '.join(SHIPMENT_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(SHIPMENT_COLUMNS))})"
+    )
+
+
+# 影子表导入：新一代数据写入 *_next，校验后通过 RENAME TABLE 原子换入，旧一代改名为 *_old 后直接 DROP
+STAGING_SUFFIX = '_next'
+RETIRED_SUFFIX = '_old'
+IMPORT_LOCK_NAME = 'logistics_shipments_import'
+IMPORT_MODES = ('swap', 'replace', 'append', 'merge')
+
+# 物流总数缓存：{'generation': 代际号, 'total': 总数, 'status_counts': 各状态数}，进程内所有 ShipmentDAO 实例共享
+_total_cache: Dict[str, Any] = {}
+_total_cache_lock = threading.Lock()
+
+# 地点字典，按数据代际缓存，进程内共享
+_location_index: Optional[LocationIndex] = None
+_location_index_lock = threading.Lock()
+
+
+def _daily_stats_row(date: str, total_shipments: Any, delivered: Any, delayed: Any) -> Dict[str, Any]:
+    """统一每日统计结构（SUM 返回的 Decimal/None 转为 int）"""
+    total_shipments, delivered, delayed = int(total_shipments or 0), int(delivered or 0), int(delayed or 0)
+    return {
+        "date": date,
+        "total_shipments": total_shipments,
+        "delivered": delivered,
+        "delayed": delayed,
+        "on_time_rate": (delivered - delayed) / delivered * 100 if delivered > 0 else 0
+    }
+
+
+def _encode_cursor(created_at: Any, shipment_id: str) -> str:
+    """分页游标编码（对调用方不透明）"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.strftime('%Y-%m-%d %H:%M:%S')
+    raw = json.dumps([created_at, shipment_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(token: str) -> Tuple[Optional[str], str]:
+    """分页游标解码，格式非法时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, shipment_id = json.loads(raw.decode('utf-8'))
+        return created_at, str(shipment_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _tsv_field(value: Any) -> str:
+    """LOAD DATA 字段编码：None -> \\N，并转义分隔符"""
+    if value is None:
+        return '\\N'
+    return str(value).translate(_TSV_ESCAPES)
 
 
 class ShipmentDAO:
@@ -35,186 +180,555 @@ class ShipmentDAO:
 
     @contextlib.contextmanager
     def get_connection(self, with_db: bool = True):
+        if with_db:
+            with get_pool().connection() as conn:
+                yield conn
+            return
         conn = self._get_connection(with_db)
         try:
             yield conn
         finally:
             conn.close()
 
-    def import_from_csv_bytes(self, file_bytes: bytes) -> Dict[str, Any]:
-        """从内存字节流导入CSV数据"""
+    def import_from_csv(self, source: Union[bytes, BinaryIO], mode: str = None,
+                        tombstone_missing: bool = False) -> Dict[str, Any]:
+        """流式导入CSV数据（字节或文件对象），按块读取、向量化清洗后直接写库
+
+        mode:
+        - swap: 写入影子表 shipments_next，校验后 RENAME TABLE 原子换入，读请求全程看到完整数据（默认）
+        - replace: 在同一事务内清空旧数据并写入新数据，失败时整体回滚
+        - append: 只插入库中不存在的单号，已有记录保持不变
+        - merge: 按行哈希比对，只写入新增或内容有变化的记录；tombstone_missing=True 时删除文件中不存在的记录
+        """
+        mode = mode or Config.IMPORT_MODE
+        if mode not in IMPORT_MODES:
+            return {"success": False, "message": f"不支持的导入模式: {mode}"}
+        written = False
         try:
-            from io import BytesIO
-            import pandas as pd
-
-            df = pd.read_csv(BytesIO(file_bytes))
-            shipments = df.to_dict('records')
-
-            processed_shipments = []
-            for i, shipment in enumerate(shipments):
-                try:
-                    processed_shipment = self._process_shipment_record(shipment)
-                    processed_shipments.append(processed_shipment)
-                except Exception as e:
-                    print(f"处理第{i+1}条记录时出错: {e}")
-                    continue
-
-            if not processed_shipments:
+            frames = self._iter_csv_frames(source)
+            first = next(frames, None)
+            if first is None:
                 return {"success": False, "message": "没有成功处理任何数据记录"}
+            frames = itertools.chain([first], frames)
+            written = True
+
+            if mode in ('append', 'merge'):
+                stats = self._merge_frames(frames, mode, tombstone_missing)
+                return {
+                    "success": True,
+                    "message": (f"导入完成：新增 {stats['inserted']} 条，更新 {stats['updated']} 条，"
+                                f"未变化 {stats['unchanged']} 条，删除 {stats['deleted']} 条"),
+                    "count": stats['inserted'] + stats['updated'],
+                    **stats
+                }
 
-            self.clear_all_data()
-            self.bulk_insert_shipments(processed_shipments)
+            rows = (row for df in frames for row in chunk_rows(df, SHIPMENT_COLUMNS))
+            if mode == 'swap':
+                stats = self._import_via_staging(rows)
+            else:
+                stats = self._write_rows(rows, replace_all=True)
+                self._refresh_rollup()
 
             return {
                 "success": True,
-                "message": f"成功导入 {len(processed_shipments)} 条物流数据",
-                "count": len(processed_shipments)
+                "message": f"成功导入 {stats['rows']} 条物流数据",
+                "count": stats['rows'],
+                "rows_per_sec": stats['rows_per_sec']
             }
         except Exception as e:
-            print(f"从字节流导入CSV失败: {e}")
+            print(f"导入CSV失败: {e}")
             import traceback
             traceback.print_exc()
             return {"success": False, "message": f"导入失败: {str(e)}"}
+        finally:
+            # 增量模式按块提交，失败时也可能已有部分写入，一律让派生数据失效
+            if written:
+                self._data_changed()
 
-    def _process_shipment_record(self, shipment: Dict) -> Dict:
-        """处理单条物流记录"""
-        from internal.pkg.utils import safe_float, safe_str, safe_date
-
-        return {
-            'id': safe_str(shipment.get('id', '')),
-            'origin': safe_str(shipment.get('origin', '')),
-            'destination': safe_str(shipment.get('destination', '')),
-            'origin_city': safe_str(shipment.get('origin_city', '')),
-            'destination_city': safe_str(shipment.get('destination_city', '')),
-            'status': safe_str(shipment.get('status', 'pending')),
-            'estimated_delivery': safe_date(shipment.get('estimated_delivery')),
-            'actual_delivery': safe_date(shipment.get('actual_delivery')),
-            'weight': safe_float(shipment.get('weight', 0)),
-            'dimensions': {
-                'length': safe_float(shipment.get('length', 0)),
-                'width': safe_float(shipment.get('width', 0)),
-                'height': safe_float(shipment.get('height', 0))
-            },
-            'customer_id': safe_str(shipment.get('customer_id', '')),
-            'courier_company': safe_str(shipment.get('courier_company', '')),
-            'courier': safe_str(shipment.get('courier', '')),
-            'package_type': safe_str(shipment.get('package_type', '')),
-            'priority': safe_str(shipment.get('priority', 'standard')),
-            'customer_type': safe_str(shipment.get('customer_type', '')),
-            'payment_method': safe_str(shipment.get('payment_method', '')),
-            'shipping_fee': safe_float(shipment.get('shipping_fee', 0)),
-            'created_at': safe_str(shipment.get('created_at', ''))
-        }
+    def import_from_csv_bytes(self, file_bytes: bytes) -> Dict[str, Any]:
+        """从内存字节流导入CSV数据"""
+        return self.import_from_csv(file_bytes)
+
+    def _iter_csv_frames(self, source: Union[bytes, BinaryIO]) -> Iterator[pd.DataFrame]:
+        """CSV -> 已清洗并补齐 row_hash 的数据块"""
+        for df in iter_shipment_chunks(source, Config.IMPORT_CHUNK_SIZE):
+            df['row_hash'] = row_hashes(df, _HASHED_COLUMNS)
+            yield df
+
+    def _merge_frames(self, frames: Iterable[pd.DataFrame], mode: str,
+                      tombstone_missing: bool = False) -> Dict[str, Any]:
+        """增量导入：逐块比对行哈希，只写入差异；每块一个短事务"""
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        affected_days = set()
+        batch_size = Config.IMPORT_BATCH_SIZE
+        upsert_sql = _upsert_shipments_sql()
+        insert_sql = _insert_ignore_shipments_sql()
+        start = time.perf_counter()
 
-    def clear_all_data(self) -> None:
-        """清空所有数据"""
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 try:
-                    cursor.execute('DELETE FROM shipment_events')
-                    cursor.execute('DELETE FROM shipments')
-                    conn.commit()
+                    if tombstone_missing:
+                        cursor.execute(
+                            "CREATE TEMPORARY TABLE IF NOT EXISTS import_seen_ids "
+                            "(id VARCHAR(128) PRIMARY KEY) ENGINE=InnoDB"
+                        )
+                    for df in frames:
+                        df = df.drop_duplicates('id', keep='last')
+                        ids = df['id'].tolist()
+                        if tombstone_missing:
+                            for i in range(0, len(ids), batch_size):
+                                cursor.executemany(
+                                    "INSERT IGNORE INTO import_seen_ids (id) VALUES (%s)",
+                                    ids[i:i + batch_size]
+                                )
+
+                        old_days = {}
+                        existing = self._fetch_row_hashes(cursor, ids, batch_size, old_days)
+                        # 显式使用 object 列，避免 uint64 哈希混入 NaN 后被转成 float 丢失精度
+                        stored = pd.Series([existing.get(i) for i in ids], index=df.index, dtype=object)
+                        is_new = stored.isna()
+                        # 库中哈希为 NULL（如被 Agent 改过状态）按已变化处理
+                        is_changed = ~is_new & (stored.astype(object) != df['row_hash'].astype(object))
+
+                        if mode == 'append':
+                            todo, sql = df[is_new], insert_sql
+                            counts['unchanged'] += int((~is_new).sum())
+                        else:
+                            todo, sql = df[is_new | is_changed], upsert_sql
+                            counts['updated'] += int(is_changed.sum())
+                            counts['unchanged'] += int((~is_new & ~is_changed).sum())
+                        counts['inserted'] += int(is_new.sum())
+                        # 汇总表按天重算：新值所在日期，以及被覆盖记录原来所在的日期
+                        affected_days.update(collect_days(frame_days(todo)))
+                        for shipment_id in todo['id']:
+                            affected_days.update(collect_days(old_days.get(shipment_id, ())))
+
+                        rows = list(chunk_rows(todo, SHIPMENT_COLUMNS))
+                        for i in range(0, len(rows), batch_size):
+                            cursor.executemany(sql, rows[i:i + batch_size])
+                        conn.commit()
+
+                    if tombstone_missing:
+                        cursor.execute(
+                            "SELECT DISTINCT s.created_date, s.actual_delivery FROM shipments s "
+                            "LEFT JOIN import_seen_ids t ON t.id = s.id WHERE t.id IS NULL"
+                        )
+                        for row in cursor.fetchall():
+                            affected_days.update(collect_days((row['created_date'], row['actual_delivery'])))
+                        cursor.execute(
+                            "DELETE s FROM shipments s LEFT JOIN import_seen_ids t ON t.id = s.id "
+                            "WHERE t.id IS NULL"
+                        )
+                        counts['deleted'] = cursor.rowcount
+                        conn.commit()
                 except Exception as e:
-                    print(f"清空数据失败: {e}")
+                    print(f"增量导入出错: {e}")
                     conn.rollback()
                     raise
+                finally:
+                    if tombstone_missing:
+                        cursor.execute("DROP TEMPORARY TABLE IF EXISTS import_seen_ids")
+                    # 已提交的块即使后续失败也要反映到汇总表
+                    if affected_days:
+                        self._refresh_rollup(affected_days)
+
+        elapsed = time.perf_counter() - start
+        written = counts['inserted'] + counts['updated']
+        counts['rows_per_sec'] = round(written / elapsed) if elapsed > 0 else written
+        print(f"增量导入（{mode}）完成: {counts}，耗时 {elapsed:.3f}s")
+        return counts
+
+    @staticmethod
+    def _fetch_row_hashes(cursor, ids: List[str], batch_size: int,
+                          old_days: Dict[str, tuple] = None) -> Dict[str, int]:
+        """查询已存在单号的行哈希，哈希为 NULL 的记为 -1；传入 old_days 时顺带记下各单号原来的创建日与送达日"""
+        existing = {}
+        for i in range(0, len(ids), batch_size):
+            part = ids[i:i + batch_size]
+            placeholders = ','.join(['%s'] * len(part))
+            cursor.execute(
+                f"SELECT id, row_hash, created_date, actual_delivery FROM shipments WHERE id IN ({placeholders})",
+                part
+            )
+            for row in cursor.fetchall():
+                existing[row['id']] = row['row_hash'] if row['row_hash'] is not None else -1
+                if old_days is not None:
+                    old_days[row['id']] = (row['created_date'], row['actual_delivery'])
+        return existing
+
+    @staticmethod
+    def _fetch_days(cursor, ids: List[str], batch_size: int) -> set:
+        """查询已存在单号的创建日与送达日"""
+        days = set()
+        for i in range(0, len(ids), batch_size):
+            part = ids[i:i + batch_size]
+            placeholders = ','.join(['%s'] * len(part))
+            cursor.execute(
+                f"SELECT created_date, actual_delivery FROM shipments WHERE id IN ({placeholders})", part
+            )
+            for row in cursor.fetchall():
+                days.update(collect_days((row['created_date'], row['actual_delivery'])))
+        return days
 
-    def bulk_insert_shipments(self, shipments: List[Dict]):
-        """批量插入物流数据"""
+    @contextlib.contextmanager
+    def _import_lock(self, timeout: int = 30):
+        """数据库级互斥锁，保证同一时刻只有一个换表导入"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (IMPORT_LOCK_NAME, timeout))
+                if not cursor.fetchone()['locked']:
+                    raise RuntimeError("另一个导入任务正在进行，请稍后重试")
+            try:
+                yield
+            finally:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (IMPORT_LOCK_NAME,))
+
+    def _import_via_staging(self, rows: Iterable[tuple]) -> Dict[str, Any]:
+        """影子表导入：写 shipments_next -> 校验 -> 原子换表 -> DROP 旧表"""
+        with self._import_lock():
+            self._prepare_staging()
+            stats = self._write_rows(rows, table='shipments' + STAGING_SUFFIX)
+            stats['rows'] = self._swap_in_staging()
+        return stats
+
+    def _prepare_staging(self) -> None:
+        """重建空的影子表（结构与索引均复制自线上表），顺带清理上次中断遗留的表"""
+        staging = 'shipments' + STAGING_SUFFIX
+        events_staging = 'shipment_events' + STAGING_SUFFIX
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                # 先删子表，再删父表
+                for table in (events_staging, 'shipment_events' + RETIRED_SUFFIX,
+                              staging, 'shipments' + RETIRED_SUFFIX,
+                              ROLLUP_TABLE + STAGING_SUFFIX, ROLLUP_TABLE + RETIRED_SUFFIX):
+                    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.execute(f"CREATE TABLE {staging} LIKE shipments")
+                cursor.execute(f"CREATE TABLE {ROLLUP_TABLE + STAGING_SUFFIX} LIKE {ROLLUP_TABLE}")
+                # LIKE 不复制外键，事件表的外键需单独指向影子表，换表后随表名一起生效
+                cursor.execute(f"CREATE TABLE {events_staging} LIKE shipment_events")
+                cursor.execute(
+                    f"ALTER TABLE {events_staging} ADD FOREIGN KEY (shipment_id) "
+                    f"REFERENCES {staging}(id) ON DELETE CASCADE"
+                )
+
+    def _swap_in_staging(self, allow_empty: bool = False) -> int:
+        """校验影子表后原子换入，返回新一代数据行数"""
+        staging = 'shipments' + STAGING_SUFFIX
+        events_staging = 'shipment_events' + STAGING_SUFFIX
+        retired = 'shipments' + RETIRED_SUFFIX
+        events_retired = 'shipment_events' + RETIRED_SUFFIX
+        rollup_staging = ROLLUP_TABLE + STAGING_SUFFIX
+        rollup_retired = ROLLUP_TABLE + RETIRED_SUFFIX
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) AS c, SUM(id IS NULL OR id = '') AS bad FROM {staging}")
+                row = cursor.fetchone()
+                count, bad = row['c'], row['bad'] or 0
+                if bad:
+                    raise ValueError(f"影子表校验失败：{bad} 条记录缺少单号")
+                if not count and not allow_empty:
+                    raise ValueError("影子表校验失败：没有写入任何数据")
+                cursor.execute(f"ANALYZE TABLE {staging}")
+                cursor.fetchall()
+                # 新一代数据的日汇总随明细表一起换入
+                rebuild_rollup(cursor, source=staging, target=rollup_staging)
+                conn.commit()
+
+                # 单条 RENAME TABLE 原子完成，读请求要么看到旧一代、要么看到新一代
+                cursor.execute(
+                    f"RENAME TABLE shipments TO {retired}, {staging} TO shipments, "
+                    f"shipment_events TO {events_retired}, {events_staging} TO shipment_events, "
+                    f"{ROLLUP_TABLE} TO {rollup_retired}, {rollup_staging} TO {ROLLUP_TABLE}"
+                )
+                cursor.execute(f"DROP TABLE IF EXISTS {events_retired}")
+                cursor.execute(f"DROP TABLE IF EXISTS {retired}")
+                cursor.execute(f"DROP TABLE IF EXISTS {rollup_retired}")
+        return count
+
+    def clear_all_data(self) -> None:
+        """清空所有数据：换入空的影子表后 DROP 旧表，避免大批量 DELETE"""
+        try:
+            with self._import_lock():
+                self._prepare_staging()
+                self._swap_in_staging(allow_empty=True)
+        except Exception as e:
+            print(f"清空数据失败: {e}")
+            raise
+        finally:
+            self._data_changed()
+
+    def _data_changed(self) -> None:
+        """数据变更后推进代际号，并丢弃本进程的总数缓存"""
+        try:
+            generation = bump_generation()
+        except Exception as e:
+            print(f"更新数据代际失败: {e}")
+            generation = None
+        with _total_cache_lock:
+            _total_cache.clear()
+            if generation is not None:
+                _total_cache['generation'] = generation
+
+    def _refresh_rollup(self, days: Iterable[Any] = None) -> None:
+        """重算日汇总表：days 为 None 时全量重建，否则只重算这些天；失败只记录，不影响已写入的明细"""
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    if days is None:
+                        rebuild_rollup(cursor)
+                    else:
+                        refresh_rollup_days(cursor, days)
+                conn.commit()
+        except Exception as e:
+            print(f"更新日汇总表失败: {e}")
+
+    def bulk_insert_shipments(self, shipments: List[Dict], batch_size: int = None,
+                              use_load_data: bool = None) -> Dict[str, Any]:
+        """批量插入物流数据
+
+        默认按 batch_size 分批走多行 INSERT ... VALUES (...), (...) ON DUPLICATE KEY UPDATE；
+        use_load_data=True 时写入临时文件后走 LOAD DATA LOCAL INFILE（重复主键按 REPLACE 处理）。
+        返回 {rows, elapsed, rows_per_sec, method}
+        """
+        batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+        shipments = list(shipments)
+        ids = [shipment.get('id') for shipment in shipments]
+        # 被覆盖记录原来所在的日期 + 新记录所在的日期
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                affected_days = self._fetch_days(cursor, ids, batch_size)
+        for shipment in shipments:
+            affected_days.update(collect_days((shipment.get('created_at'), shipment.get('actual_delivery'))))
+
+        rows = (self._shipment_row(shipment) for shipment in shipments)
+        try:
+            return self._write_rows(rows, batch_size, use_load_data)
+        finally:
+            self._refresh_rollup(affected_days)
+            self._data_changed()
+
+    def _write_rows(self, rows: Iterable[tuple], batch_size: int = None, use_load_data: bool = None,
+                    replace_all: bool = False, table: str = 'shipments') -> Dict[str, Any]:
+        """批量写入引擎，replace_all=True 时在同一事务内先清空旧数据"""
+        batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+        if use_load_data is None:
+            use_load_data = Config.IMPORT_USE_LOAD_DATA
+
+        start = time.perf_counter()
+        if use_load_data:
+            count = self._load_data_rows(rows, table=table, replace_all=replace_all)
+            method = 'load_data'
+        else:
+            count = self._executemany_rows(rows, batch_size, replace_all=replace_all, table=table)
+            method = 'executemany'
+        elapsed = time.perf_counter() - start
+
+        stats = {
+            'rows': count,
+            'elapsed': round(elapsed, 3),
+            'rows_per_sec': round(count / elapsed) if elapsed > 0 else count,
+            'method': method,
+        }
+        print(f"成功插入 {count} 条物流数据，耗时 {stats['elapsed']}s，{stats['rows_per_sec']} 行/秒（{method}）")
+        return stats
+
+    @staticmethod
+    def _shipment_row(shipment: Dict) -> tuple:
+        """物流记录 -> 按 SHIPMENT_COLUMNS 排列的参数元组；尺寸可直接给出 length/width/height，也兼容 dimensions 字典"""
+        shipment = fill_location_fields(dict(shipment))
+        dimensions = shipment.get('dimensions') or {}
+        return tuple(
+            shipment.get(column, dimensions.get(column)) if column in DIMENSION_COLUMNS else shipment.get(column)
+            for column in SHIPMENT_COLUMNS
+        )
+
+    def _executemany_rows(self, rows: Iterable[tuple], batch_size: int, replace_all: bool = False,
+                          table: str = 'shipments') -> int:
+        """分批 executemany，PyMySQL 会将其改写为多行 VALUES 语句"""
+        sql = _upsert_shipments_sql(table)
+        count = 0
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 try:
-                    for shipment in shipments:
-                        cursor.execute(
-                            """
-                            INSERT INTO shipments
-                            (id, origin, destination, origin_city, destination_city, status, estimated_delivery, actual_delivery,
-                             weight, dimensions, customer_id, courier_company, courier, package_type, priority,
-                             customer_type, payment_method, shipping_fee, created_at)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON DUPLICATE KEY UPDATE
-                                origin=VALUES(origin),
-                                destination=VALUES(destination),
-                                origin_city=VALUES(origin_city),
-                                destination_city=VALUES(destination_city),
-                                status=VALUES(status),
-                                estimated_delivery=VALUES(estimated_delivery),
-                                actual_delivery=VALUES(actual_delivery),
-                                weight=VALUES(weight),
-                                dimensions=VALUES(dimensions),
-                                customer_id=VALUES(customer_id),
-                                courier_company=VALUES(courier_company),
-                                courier=VALUES(courier),
-                                package_type=VALUES(package_type),
-                                priority=VALUES(priority),
-                                customer_type=VALUES(customer_type),
-                                payment_method=VALUES(payment_method),
-                                shipping_fee=VALUES(shipping_fee),
-                                created_at=VALUES(created_at)
-                            """,
-                            (
-                                shipment.get('id'),
-                                shipment.get('origin'),
-                                shipment.get('destination'),
-                                shipment.get('origin_city'),
-                                shipment.get('destination_city'),
-                                shipment.get('status'),
-                                shipment.get('estimated_delivery'),
-                                shipment.get('actual_delivery'),
-                                shipment.get('weight'),
-                                json.dumps(shipment.get('dimensions', {})),
-                                shipment.get('customer_id'),
-                                shipment.get('courier_company'),
-                                shipment.get('courier'),
-                                shipment.get('package_type'),
-                                shipment.get('priority'),
-                                shipment.get('customer_type'),
-                                shipment.get('payment_method'),
-                                shipment.get('shipping_fee'),
-                                shipment.get('created_at'),
-                            ),
-                        )
+                    if replace_all:
+                        cursor.execute('DELETE FROM shipment_events')
+                        cursor.execute(f'DELETE FROM {table}')
+                    batch = []
+                    for row in rows:
+                        batch.append(row)
+                        if len(batch) >= batch_size:
+                            cursor.executemany(sql, batch)
+                            count += len(batch)
+                            batch = []
+                    if batch:
+                        cursor.executemany(sql, batch)
+                        count += len(batch)
                     conn.commit()
-                    print(f"成功插入 {len(shipments)} 条物流数据")
                 except Exception as e:
                     print(f"插入数据时出错: {e}")
                     conn.rollback()
+                    raise
+        return count
+
+    def _load_data_rows(self, rows: Iterable[tuple], table: str = 'shipments', replace_all: bool = False) -> int:
+        """写入临时 TSV 文件后通过 LOAD DATA LOCAL INFILE 一次性导入"""
+        count = 0
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8', newline='', delete=False) as f:
+            path = f.name
+            for row in rows:
+                f.write('\t'.join(_tsv_field(value) for value in row))
+                f.write('\n')
+                count += 1
+        try:
+            # LOAD DATA LOCAL 需要单独开启 local_infile，不走共享连接池
+            conn = pymysql.connect(
+                host=self.host,
+                port=self.port,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                charset="utf8mb4",
+                autocommit=False,
+                local_infile=True,
+            )
+            try:
+                with conn.cursor() as cursor:
+                    if replace_all:
+                        cursor.execute('DELETE FROM shipment_events')
+                        cursor.execute(f'DELETE FROM {table}')
+                    cursor.execute(
+                        f"""LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {table}
+                            CHARACTER SET utf8mb4
+                            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+                            LINES TERMINATED BY '\\n'
+                            ({', '.join(SHIPMENT_COLUMNS)})""",
+                        (path,)
+                    )
+                conn.commit()
+            except Exception as e:
+                print(f"LOAD DATA 导入失败: {e}")
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        finally:
+            os.remove(path)
+        return count
 
-    def get_shipment_by_id(self, shipment_id: str) -> Optional[Dict]:
-        """根据ID获取物流信息"""
+    def get_shipment_by_id(self, shipment_id: str, with_dimensions: bool = False) -> Optional[Dict]:
+        """根据ID获取物流信息，with_dimensions=True 时附带 dimensions 字典"""
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute('SELECT * FROM shipments WHERE id = %s', (shipment_id,))
+                cursor.execute(f'SELECT {_READ_SELECT} FROM shipments WHERE id = %s', (shipment_id,))
                 row = cursor.fetchone()
-                if row:
-                    row['dimensions'] = json.loads(row.get('dimensions') or '{}')
-                    return row
-                return None
-
-    def get_all_shipments(self, limit: int = 10000, page: int = None, pageSize: int = None) -> Tuple[List[Dict], int]:
-        """获取所有物流信息，支持分页"""
+                if row and with_dimensions:
+                    _attach_dimensions(row)
+                return row
+
+    def count_shipments(self) -> int:
+        """物流总数，按数据代际缓存，导入或修改后自动失效"""
+        generation = current_generation()
+        with _total_cache_lock:
+            if _total_cache.get('generation') == generation and 'total' in _total_cache:
+                return _total_cache['total']
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute('SELECT COUNT(*) as total FROM shipments')
                 total = cursor.fetchone()['total']
+        with _total_cache_lock:
+            if _total_cache.get('generation') != generation:
+                _total_cache.clear()
+            _total_cache.update({'generation': generation, 'total': total})
+        return total
+
+    def get_location_index(self) -> LocationIndex:
+        """当前代际的地点字典（各侧不同的 城市/区县/网点 组合），数据变更后首次调用时重建"""
+        global _location_index
+        generation = current_generation()
+        index = _location_index
+        if index is not None and index.generation == generation:
+            return index
+        with _location_index_lock:
+            if _location_index is None or _location_index.generation != generation:
+                limit = Config.LOCATION_INDEX_MAX_ENTRIES
+                entries = {}
+                with self.get_connection() as conn:
+                    with conn.cursor(pymysql.cursors.Cursor) as cursor:
+                        for side, columns in LOCATION_COLUMNS.items():
+                            select = ', '.join(f"COALESCE({c}, '')" for c in columns)
+                            cursor.execute(f"SELECT DISTINCT {select} FROM shipments LIMIT %s", (limit + 1,))
+                            rows = cursor.fetchall()
+                            # 组合过多时该侧不建字典，筛选退回 LIKE
+                            if len(rows) <= limit:
+                                entries[side] = rows
+                _location_index = LocationIndex(entries, generation, Config.LOCATION_MAX_IN)
+            return _location_index
+
+    def _locations(self) -> Optional[LocationIndex]:
+        try:
+            return self.get_location_index()
+        except Exception as e:
+            print(f"加载地点字典失败，地址筛选退回 LIKE: {e}")
+            return None
 
+    def get_all_shipments(self, limit: int = 10000, page: int = None, pageSize: int = None,
+                          with_dimensions: bool = False) -> Tuple[List[Dict], int]:
+        """获取所有物流信息，支持分页；with_dimensions=True 时附带 dimensions 字典"""
+        total = self.count_shipments()
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
                 if page is not None and pageSize is not None:
                     offset = (page - 1) * pageSize
                     cursor.execute(
-                        'SELECT * FROM shipments ORDER BY created_at DESC LIMIT %s OFFSET %s',
+                        f'SELECT {_READ_SELECT} FROM shipments ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s',
                         (int(pageSize), int(offset))
                     )
                 else:
                     cursor.execute(
-                        'SELECT * FROM shipments ORDER BY created_at DESC LIMIT %s',
+                        f'SELECT {_READ_SELECT} FROM shipments ORDER BY created_at DESC, id DESC LIMIT %s',
                         (int(limit),)
                     )
                 rows = cursor.fetchall()
-                result = []
-                for row in rows:
-                    row['dimensions'] = json.loads(row.get('dimensions') or '{}')
-                    result.append(row)
-                return result, total
+                if with_dimensions:
+                    for row in rows:
+                        _attach_dimensions(row)
+                return rows, total
+
+    def get_shipments_page(self, cursor_token: str = None, page_size: int = 20) -> Tuple[List[Dict], Optional[str], int]:
+        """游标（keyset）分页：按 (created_at, id) 倒序，深翻页与首页代价相同
+
+        返回 (本页数据, 下一页游标, 总数)，没有下一页时游标为 None
+        """
+        page_size = max(1, min(int(page_size), 1000))
+        conditions, params = [], []
+        if cursor_token:
+            created_at, last_id = _decode_cursor(cursor_token)
+            if created_at is None:
+                # created_at 为 NULL 的记录在倒序中排在最后
+                conditions.append("created_at IS NULL AND id < %s")
+                params.append(last_id)
+            else:
+                conditions.append("(created_at < %s OR (created_at = %s AND id < %s) OR created_at IS NULL)")
+                params.extend([created_at, created_at, last_id])
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {_READ_SELECT} FROM shipments WHERE {where_clause} "
+                    "ORDER BY created_at DESC, id DESC LIMIT %s",
+                    params + [page_size + 1]
+                )
+                rows = cursor.fetchall()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = _encode_cursor(last.get('created_at'), last['id'])
+        return rows, next_cursor, self.count_shipments()
 
     def get_shipment_events(self, shipment_id: str) -> List[Dict]:
         """获取物流事件历史"""
@@ -226,137 +740,259 @@ class ShipmentDAO:
                 )
                 return cursor.fetchall()
 
+    def get_snapshot(self) -> ShipmentSnapshot:
+        """当前数据代际的列式快照，供各服务向量化过滤与聚合"""
+        return get_snapshot()
+
     def get_daily_stats(self, date: str = None) -> Dict[str, Any]:
-        """获取每日统计信息"""
+        """获取每日统计信息（读日汇总表）"""
+        if date:
+            return self.get_daily_stats_range(date, date)[0]
+
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                if date:
-                    cursor.execute('SELECT COUNT(*) AS c FROM shipments WHERE DATE(created_at) = %s', (date,))
-                    total_shipments = cursor.fetchone()["c"]
-                    cursor.execute('SELECT COUNT(*) AS c FROM shipments WHERE DATE(actual_delivery) = %s', (date,))
-                    delivered = cursor.fetchone()["c"]
-                    cursor.execute(
-                        'SELECT COUNT(*) AS c FROM shipments WHERE status = %s AND actual_delivery > estimated_delivery AND DATE(actual_delivery) = %s',
-                        ("delivered", date,)
-                    )
-                    delayed = cursor.fetchone()["c"]
-                else:
-                    cursor.execute('SELECT COUNT(*) AS c FROM shipments')
-                    total_shipments = cursor.fetchone()["c"]
-                    cursor.execute('SELECT COUNT(*) AS c FROM shipments WHERE actual_delivery IS NOT NULL')
-                    delivered = cursor.fetchone()["c"]
-                    cursor.execute(
-                        'SELECT COUNT(*) AS c FROM shipments WHERE status = %s AND actual_delivery > estimated_delivery',
-                        ("delivered",)
-                    )
-                    delayed = cursor.fetchone()["c"]
+                cursor.execute(
+                    f"SELECT SUM(delivered) AS delivered, SUM(delayed_deliveries) AS delayed_deliveries "
+                    f"FROM {ROLLUP_TABLE}"
+                )
+                row = cursor.fetchone()
+        return _daily_stats_row("all", self.count_shipments(), row['delivered'], row['delayed_deliveries'])
 
-                return {
-                    "date": date if date else "all",
-                    "total_shipments": total_shipments,
-                    "delivered": delivered,
-                    "delayed": delayed,
-                    "on_time_rate": (delivered - delayed) / delivered * 100 if delivered > 0 else 0
-                }
+    def get_daily_stats_range(self, start_date: str, end_date: str, max_days: int = 366) -> List[Dict[str, Any]]:
+        """获取日期区间 [start_date, end_date] 内每天的统计，一条 SQL 读日汇总表，没有数据的日期补 0"""
+        start = datetime.strptime(str(start_date)[:10], '%Y-%m-%d').date()
+        end = datetime.strptime(str(end_date)[:10], '%Y-%m-%d').date()
+        if end < start:
+            start, end = end, start
+        if (end - start).days >= max_days:
+            raise ValueError(f"日期区间不能超过 {max_days} 天")
+
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""SELECT day, SUM(shipments) AS total_shipments, SUM(delivered) AS delivered,
+                               SUM(delayed_deliveries) AS delayed_deliveries
+                        FROM {ROLLUP_TABLE}
+                        WHERE day >= %s AND day < %s
+                        GROUP BY day""",
+                    (start, end + timedelta(days=1))
+                )
+                by_day = {row['day']: row for row in cursor.fetchall()}
+
+        result = []
+        day = start
+        while day <= end:
+            row = by_day.get(day) or {}
+            result.append(_daily_stats_row(
+                day.isoformat(), row.get('total_shipments'), row.get('delivered'), row.get('delayed_deliveries')
+            ))
+            day += timedelta(days=1)
+        return result
 
     def get_daily_trend(self) -> Dict[str, List[Dict]]:
-        """获取每日趋势数据"""
+        """获取每日趋势数据（读日汇总表）"""
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute('''
-                    SELECT DATE(created_at) AS date, COUNT(*) AS shipments
-                    FROM shipments
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
+                cursor.execute(f'''
+                    SELECT day, SUM(shipments) AS shipments, SUM(delivered) AS delivered,
+                           SUM(CASE WHEN status = 'in_transit' THEN shipments ELSE 0 END) AS in_transit
+                    FROM {ROLLUP_TABLE}
+                    GROUP BY day
+                    ORDER BY day
                 ''')
-                daily_shipments = cursor.fetchall()
-
-                cursor.execute('''
-                    SELECT DATE(actual_delivery) AS date, COUNT(*) AS delivered
-                    FROM shipments
-                    WHERE actual_delivery IS NOT NULL
-                    GROUP BY DATE(actual_delivery)
-                    ORDER BY date
-                ''')
-                daily_delivered = cursor.fetchall()
-
-                cursor.execute('''
-                    SELECT DATE(created_at) AS date, COUNT(*) AS in_transit
-                    FROM shipments
-                    WHERE status = 'in_transit'
-                    GROUP BY DATE(created_at)
-                    ORDER BY date
-                ''')
-                daily_in_transit = cursor.fetchall()
+                rows = cursor.fetchall()
 
-                return {
-                    "shipments": daily_shipments,
-                    "delivered": daily_delivered,
-                    "in_transit": daily_in_transit
-                }
+        daily_shipments, daily_delivered, daily_in_transit = [], [], []
+        for row in rows:
+            if row['shipments']:
+                daily_shipments.append({'date': row['day'], 'shipments': int(row['shipments'])})
+            if row['delivered']:
+                daily_delivered.append({'date': row['day'], 'delivered': int(row['delivered'])})
+            if row['in_transit']:
+                daily_in_transit.append({'date': row['day'], 'in_transit': int(row['in_transit'])})
+
+        return {
+            "shipments": daily_shipments,
+            "delivered": daily_delivered,
+            "in_transit": daily_in_transit
+        }
+
+    def count_by_status(self) -> Dict[str, int]:
+        """各状态物流数（走 idx_status_created 索引），按数据代际缓存
 
-    def batch_update_status(self, shipment_ids: List[str], new_status: str) -> Tuple[int, List[Dict], List[Dict]]:
-        """批量更新状态，返回 (成功数, 变更前, 变更后)"""
-        before_states = []
-        after_states = []
+        直接统计明细表而不是日汇总表：汇总表按创建日计数，created_at 为空的记录不在其中，
+        合计会与 count_shipments() 对不上
+        """
+        generation = current_generation()
+        with _total_cache_lock:
+            if _total_cache.get('generation') == generation and 'status_counts' in _total_cache:
+                return dict(_total_cache['status_counts'])
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                try:
-                    # 获取变更前的状态
-                    placeholders = ','.join(['%s'] * len(shipment_ids))
-                    cursor.execute(f"SELECT id, status FROM shipments WHERE id IN ({placeholders})", shipment_ids)
-                    for row in cursor.fetchall():
-                        before_states.append({'id': row['id'], 'status': row['status']})
+                cursor.execute("SELECT status, COUNT(*) AS total FROM shipments GROUP BY status")
+                rows = cursor.fetchall()
+        status_counts = {}
+        for row in rows:
+            key = row['status'] or 'unknown'
+            status_counts[key] = status_counts.get(key, 0) + int(row['total'])
+        with _total_cache_lock:
+            if _total_cache.get('generation') != generation:
+                _total_cache.clear()
+            _total_cache.update({'generation': generation, 'status_counts': status_counts})
+        return dict(status_counts)
+
+    def get_rollup_summary(self) -> Dict[str, Any]:
+        """全量汇总指标：各状态物流数（明细表）、送达数与平均时效（日汇总表）"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""SELECT SUM(delivered) AS delivered, SUM(delayed_deliveries) AS delayed_deliveries,
+                               SUM(delivery_hours) AS delivery_hours, SUM(timed_deliveries) AS timed_deliveries
+                        FROM {ROLLUP_TABLE}"""
+                )
+                rows = cursor.fetchall()
 
-                    # 执行更新
-                    cursor.execute(
-                        f"UPDATE shipments SET status = %s WHERE id IN ({placeholders})",
-                        [new_status] + shipment_ids
-                    )
-                    conn.commit()
+        status_counts = self.count_by_status()
+        delivered = delayed = timed = 0
+        hours = 0.0
+        for row in rows:
+            delivered += int(row['delivered'] or 0)
+            delayed += int(row['delayed_deliveries'] or 0)
+            timed += int(row['timed_deliveries'] or 0)
+            hours += float(row['delivery_hours'] or 0)
+        return {
+            "status_counts": status_counts,
+            "delivered": delivered,
+            "delayed": delayed,
+            "avg_delivery_hours": hours / timed if timed else 0
+        }
 
-                    # 获取变更后的状态
-                    cursor.execute(f"SELECT id, status FROM shipments WHERE id IN ({placeholders})", shipment_ids)
-                    for row in cursor.fetchall():
-                        after_states.append({'id': row['id'], 'status': row['status']})
+    def iter_batch_update_status(self, shipment_ids: List[str], new_status: str,
+                                 chunk_size: int = None) -> Iterator[Dict[str, Any]]:
+        """分块批量更新状态，每块完成后产出进度
 
-                    return cursor.rowcount, before_states, after_states
-                except Exception as e:
-                    conn.rollback()
-                    raise
+        每块一个短事务：一次 SELECT ... FOR UPDATE 读出并锁定本块记录，据此得到变更前后状态，
+        只 UPDATE 状态确实变化的行，同一事务内重算日汇总表后提交。锁只持有一块的时间，
+        IN 列表长度也受块大小限制。某块失败时回滚该块并抛出异常，之前的块已提交。
+
+        产出 {'done', 'total', 'matched', 'updated', 'before', 'after'}，计数为截至当前块的累计值，
+        before/after 为本块的变更前后状态。
+        """
+        ids = list(dict.fromkeys(shipment_ids))
+        chunk_size = chunk_size or Config.MUTATION_CHUNK_SIZE
+        matched = updated = 0
+        try:
+            for i in range(0, len(ids), chunk_size):
+                chunk = ids[i:i + chunk_size]
+                placeholders = ','.join(['%s'] * len(chunk))
+                with self.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        try:
+                            cursor.execute(
+                                f"SELECT id, status, created_date, actual_delivery FROM shipments "
+                                f"WHERE id IN ({placeholders}) FOR UPDATE",
+                                chunk
+                            )
+                            rows = cursor.fetchall()
+                            changed = [row for row in rows if row['status'] != new_status]
+                            count = 0
+                            if changed:
+                                cursor.execute(
+                                    f"UPDATE shipments SET status = %s, row_hash = NULL "
+                                    f"WHERE id IN ({','.join(['%s'] * len(changed))})",
+                                    [new_status] + [row['id'] for row in changed]
+                                )
+                                count = cursor.rowcount
+                                refresh_rollup_days(cursor, itertools.chain.from_iterable(
+                                    (row['created_date'], row['actual_delivery']) for row in changed))
+                            conn.commit()
+                        except Exception:
+                            conn.rollback()
+                            raise
+                matched += len(rows)
+                updated += count
+                yield {
+                    'done': i + len(chunk),
+                    'total': len(ids),
+                    'matched': matched,
+                    'updated': updated,
+                    'before': [{'id': row['id'], 'status': row['status']} for row in rows],
+                    'after': [{'id': row['id'], 'status': new_status} for row in rows],
+                }
+        finally:
+            if updated:
+                self._data_changed()
+
+    def batch_update_status(self, shipment_ids: List[str], new_status: str,
+                            chunk_size: int = None) -> Tuple[int, List[Dict], List[Dict]]:
+        """批量更新状态，返回 (实际变更行数, 变更前, 变更后)；按 MUTATION_CHUNK_SIZE 分块提交"""
+        updated = 0
+        before_states, after_states = [], []
+        for progress in self.iter_batch_update_status(shipment_ids, new_status, chunk_size):
+            updated = progress['updated']
+            before_states.extend(progress['before'])
+            after_states.extend(progress['after'])
+        return updated, before_states, after_states
 
     def get_shipments_by_criteria(self, status: str = None, days: int = None,
                                    origin: str = None, destination: str = None,
-                                   limit: int = 1000) -> List[Dict]:
-        """按条件查询物流记录"""
-        conditions = []
-        params = []
-        if status:
-            conditions.append("status = %s")
-            params.append(status)
-        if days:
-            conditions.append(f"created_at >= DATE_SUB(NOW(), INTERVAL %s DAY)")
-            params.append(days)
-        if origin:
-            conditions.append("origin LIKE %s")
-            params.append(f"%{origin}%")
-        if destination:
-            conditions.append("destination LIKE %s")
-            params.append(f"%{destination}%")
-
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
+                                   limit: int = 1000, with_dimensions: bool = False) -> List[Dict]:
+        """按条件查询物流记录，with_dimensions=True 时附带 dimensions 字典"""
+        filters = {'status': status, 'days': days, 'origin': origin, 'destination': destination}
+        where_clause, params = _criteria_clause(
+            filters, self._locations() if origin or destination else None
+        )
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
-                    f"SELECT * FROM shipments WHERE {where_clause} ORDER BY created_at DESC LIMIT %s",
+                    f"SELECT {_READ_SELECT} FROM shipments WHERE {where_clause} ORDER BY created_at DESC LIMIT %s",
                     params + [limit]
                 )
                 rows = cursor.fetchall()
-                result = []
-                for row in rows:
-                    row['dimensions'] = json.loads(row.get('dimensions') or '{}')
-                    result.append(row)
-                return result
+                if with_dimensions:
+                    for row in rows:
+                        _attach_dimensions(row)
+                return rows
+
+    def iter_shipments(self, filters: Dict[str, Any] = None, columns: Iterable[str] = None,
+                       batch_size: int = None, as_frame: bool = False) -> Iterator[Union[List[tuple], pd.DataFrame]]:
+        """服务端游标（SSCursor）流式遍历物流记录，按批产出，内存占用与表大小无关
+
+        - filters: 与 Agent 查询参数一致（status / days / origin / destination）
+        - columns: 要读取的列，默认全部可读列
+        - as_frame: False 时每批为元组列表（顺序同 columns），True 时为 DataFrame
+
+        生成器未读完就被关闭时直接丢弃连接，避免为排空结果集读完整张表。
+        """
+        columns = list(columns or STREAM_COLUMNS)
+        unknown = [c for c in columns if c not in STREAM_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的列: {', '.join(unknown)}")
+        batch_size = batch_size or Config.STREAM_BATCH_SIZE
+        filters = filters or {}
+        where_clause, params = _criteria_clause(
+            filters, self._locations() if filters.get('origin') or filters.get('destination') else None
+        )
+
+        pool = get_pool()
+        pooled = pool.acquire()
+        finished = False
+        try:
+            # 不用 with：SSCursor.close() 会读完剩余结果集，提前退出时应直接丢弃连接
+            cursor = pooled.conn.cursor(pymysql.cursors.SSCursor)
+            # 消费方处理慢时服务端不能因写超时断开
+            cursor.execute("SET SESSION net_write_timeout = %s", (Config.STREAM_NET_WRITE_TIMEOUT,))
+            cursor.execute(f"SELECT {', '.join(columns)} FROM shipments WHERE {where_clause}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns) if as_frame else list(rows)
+            cursor.execute("SET SESSION net_write_timeout = DEFAULT")
+            cursor.close()
+            finished = True
+        finally:
+            pool.release(pooled, discard=not finished)
 
 
 class UserDAO:
@@ -383,6 +1019,10 @@ class UserDAO:
 
     @contextlib.contextmanager
     def get_connection(self, with_db: bool = True):
+        if with_db:
+            with get_pool().connection() as conn:
+                yield conn
+            return
         conn = self._get_connection(with_db)
         try:
             yield conn
@@ -475,6 +1115,10 @@ class LogDAO:
 
     @contextlib.contextmanager
     def get_connection(self, with_db: bool = True):
+        if with_db:
+            with get_pool().connection() as conn:
+                yield conn
+            return
         conn = self._get_connection(with_db)
         try:
             yield conn
@@ -482,34 +1126,46 @@ class LogDAO:
             conn.close()
 
     def add_log(self, user_id: int, username: str, action: str, detail: str = "", ip_address: str = "") -> None:
-        with self.get_connection() as conn:
-            with conn.cursor() as cursor:
-                try:
-                    cursor.execute(
-                        "INSERT INTO operation_logs (user_id, username, action, detail, ip_address) VALUES (%s, %s, %s, %s, %s)",
-                        (user_id, username, action, detail, ip_address)
-                    )
-                    conn.commit()
-                except Exception as e:
-                    print(f"添加日志失败: {e}")
+        """记录操作日志：AUDIT_LOG_ASYNC 开启时放入后台批量写入管道，否则同步写库"""
+        if Config.AUDIT_LOG_ASYNC:
+            get_audit_log().submit(user_id, username, action, detail, ip_address)
+            return
+        try:
+            write_logs([(user_id, username, action, detail, ip_address, datetime.now())])
+        except Exception as e:
+            print(f"添加日志失败: {e}")
 
-    def get_all_logs(self, limit: int = 100) -> List[Dict]:
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """操作日志写入管道统计"""
+        return get_audit_log().stats() if Config.AUDIT_LOG_ASYNC else {}
+
+    def _flush_pending(self) -> None:
+        # 读日志前等待缓冲区中已提交的日志落库
+        if Config.AUDIT_LOG_ASYNC:
+            get_audit_log().flush()
+
+    def _recent_logs(self, where: str, params: Tuple, limit: int) -> List[Dict]:
+        """按时间倒序取日志：先只查最近 LOG_QUERY_WINDOW_MONTHS 个月（分区裁剪），不足 limit 条时再查全表"""
+        sql = ("SELECT id, user_id, username, action, detail, ip_address, timestamp FROM operation_logs "
+               "WHERE {where} ORDER BY timestamp DESC LIMIT %s")
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id, user_id, username, action, detail, ip_address, timestamp FROM operation_logs ORDER BY timestamp DESC LIMIT %s",
-                    (limit,)
-                )
+                if Config.LOG_QUERY_WINDOW_MONTHS > 0:
+                    since = month_start(datetime.now().date(), -Config.LOG_QUERY_WINDOW_MONTHS)
+                    cursor.execute(sql.format(where=f"{where} AND timestamp >= %s"), params + (since, limit))
+                    rows = cursor.fetchall()
+                    if len(rows) >= limit:
+                        return rows
+                cursor.execute(sql.format(where=where), params + (limit,))
                 return cursor.fetchall()
 
+    def get_all_logs(self, limit: int = 100) -> List[Dict]:
+        self._flush_pending()
+        return self._recent_logs("1=1", (), limit)
+
     def get_user_logs(self, user_id: int, limit: int = 50) -> List[Dict]:
-        with self.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id, user_id, username, action, detail, ip_address, timestamp FROM operation_logs WHERE user_id = %s ORDER BY timestamp DESC LIMIT %s",
-                    (user_id, limit)
-                )
-                return cursor.fetchall()
+        self._flush_pending()
+        return self._recent_logs("user_id = %s", (user_id,), limit)
 
 
 class ChatHistoryDAO:
@@ -536,6 +1192,10 @@ class ChatHistoryDAO:
 
     @contextlib.contextmanager
     def get_connection(self, with_db: bool = True):
+        if with_db:
+            with get_pool().connection() as conn:
+                yield conn
+            return
         conn = self._get_connection(with_db)
         try:
             yield conn
@@ -551,8 +1211,16 @@ class ChatHistoryDAO:
                        VALUES (%s, %s, %s, %s, %s, %s, NOW())""",
                     (user_id, username, page, title, user_input, ai_response)
                 )
+                chat_id = cursor.lastrowid
+                cursor.execute(
+                    f"""INSERT INTO {SESSIONS_TABLE}
+                        (session_key, user_id, page, is_session, title, last_message, message_count, last_updated)
+                        VALUES (%s, %s, %s, 0, %s, %s, 1, NOW())""",
+                    (single_key(chat_id), user_id, page, preview(title or user_input, TITLE_LENGTH),
+                     preview(ai_response or user_input))
+                )
                 conn.commit()
-                return cursor.lastrowid
+                return chat_id
 
     def get_user_chats(self, user_id: int, page: str = None, limit: int = 50) -> List[Dict]:
         """获取用户的对话历史列表"""
@@ -587,29 +1255,78 @@ class ChatHistoryDAO:
                 )
                 return cursor.fetchone()
 
+    @staticmethod
+    def _wait_queued(session_id: str) -> None:
+        """等待会话排队中的消息落库，避免删除后写线程再写入、会话重新出现"""
+        if Config.CHAT_WRITE_BEHIND and session_id and not get_chat_writer().wait_session(session_id):
+            print(f"等待会话 {session_id} 消息落库超时，删除后可能残留消息")
+
     def delete_chat(self, chat_id: int, user_id: int) -> bool:
-        """删除对话"""
+        """删除对话（chat_agent 消息先等待所属会话排队中的消息落库）"""
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
-                    "DELETE FROM chat_history WHERE id = %s AND user_id = %s",
+                    "SELECT session_id FROM chat_history WHERE id = %s AND user_id = %s AND page = 'chat_agent'",
                     (chat_id, user_id)
                 )
+                target = cursor.fetchone()
+                conn.rollback()
+            if target:
+                self._wait_queued(target['session_id'])
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT page, session_id FROM chat_history WHERE id = %s AND user_id = %s FOR UPDATE",
+                    (chat_id, user_id)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return False
+                cursor.execute("DELETE FROM chat_history WHERE id = %s", (chat_id,))
+                if row['page'] == 'chat_agent' and row['session_id']:
+                    refresh_session(cursor, row['session_id'])
+                else:
+                    cursor.execute(f"DELETE FROM {SESSIONS_TABLE} WHERE session_key = %s", (single_key(chat_id),))
                 conn.commit()
-                return cursor.rowcount > 0
+                return True
 
     def search_chats(self, user_id: int, keyword: str, limit: int = 20) -> List[Dict]:
-        """搜索对话"""
+        """全文检索对话（标题、提问、回答），按相关度排序，结果附带高亮片段 snippet"""
+        terms = split_terms(keyword)
+        if not terms:
+            return []
+        query = boolean_query(terms)
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    """SELECT id, page, title, user_input, ai_response, created_at
-                       FROM chat_history
-                       WHERE user_id = %s AND (title LIKE %s OR user_input LIKE %s)
-                       ORDER BY created_at DESC LIMIT %s""",
-                    (user_id, f"%{keyword}%", f"%{keyword}%", limit)
-                )
-                return cursor.fetchall()
+                rows = None
+                if query is not None:
+                    try:
+                        cursor.execute(
+                            f"""SELECT id, page, session_id, title, user_input, ai_response, created_at,
+                                       MATCH({FULLTEXT_COLUMNS}) AGAINST (%s) AS score
+                                FROM chat_history
+                                WHERE user_id = %s AND user_input != '__SESSION_START__'
+                                  AND MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)
+                                ORDER BY score DESC, created_at DESC LIMIT %s""",
+                            (' '.join(terms), user_id, query, limit)
+                        )
+                        rows = cursor.fetchall()
+                    except pymysql.err.MySQLError as e:
+                        # 1191: 全文索引尚未建立（迁移未执行），退回 LIKE
+                        if e.args[0] != 1191:
+                            raise
+                if rows is None:
+                    where, params = like_clause(terms)
+                    cursor.execute(
+                        f"""SELECT id, page, session_id, title, user_input, ai_response, created_at,
+                                   0 AS score
+                            FROM chat_history
+                            WHERE user_id = %s AND user_input != '__SESSION_START__' AND {where}
+                            ORDER BY created_at DESC LIMIT %s""",
+                        [user_id] + params + [limit]
+                    )
+                    rows = cursor.fetchall()
+                return [attach_snippet(row, terms) for row in rows]
 
     def create_session(self, user_id: int, username: str, title: str = "") -> str:
         """创建新会话，返回 session_id"""
@@ -623,6 +1340,12 @@ class ChatHistoryDAO:
                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
                     (user_id, username, 'chat_agent', title, '__SESSION_START__', '', session_id, 0)
                 )
+                cursor.execute(
+                    f"""INSERT INTO {SESSIONS_TABLE}
+                        (session_key, user_id, page, is_session, title, last_message, message_count, last_updated)
+                        VALUES (%s, %s, 'chat_agent', 1, %s, '', 0, NOW())""",
+                    (session_id, user_id, preview(title, TITLE_LENGTH))
+                )
                 conn.commit()
                 return session_id
 
@@ -630,22 +1353,30 @@ class ChatHistoryDAO:
                     message_order: int, role: str, content: str,
                     action_type: str = None, action_result: str = None,
                     diff_content: str = None) -> None:
-        """添加消息"""
+        """添加消息（同步写库）"""
+        row = message_row(user_id, username, session_id, message_order, role, content,
+                          action_type, action_result, diff_content)
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    """INSERT INTO chat_history
-                       (user_id, username, page, title, user_input, ai_response,
-                        session_id, message_order, action_type, action_result, diff_content)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                    (user_id, username, 'chat_agent', '', content if role == 'user' else '',
-                     content if role == 'assistant' else '',
-                     session_id, message_order, action_type, action_result, diff_content)
-                )
+                write_messages(cursor, [row])
                 conn.commit()
 
+    def queue_message(self, user_id: int, username: str, session_id: str,
+                      message_order: int, role: str, content: str,
+                      action_type: str = None, action_result: str = None,
+                      diff_content: str = None) -> None:
+        """添加消息（后写）：放入后台写入队列立即返回，CHAT_WRITE_BEHIND 关闭时同步写库"""
+        if not Config.CHAT_WRITE_BEHIND:
+            self.add_message(user_id, username, session_id, message_order, role, content,
+                             action_type, action_result, diff_content)
+            return
+        get_chat_writer().submit(message_row(user_id, username, session_id, message_order, role, content,
+                                             action_type, action_result, diff_content))
+
     def get_session_messages(self, session_id: str) -> List[Dict]:
-        """获取会话所有消息，按 message_order 排序"""
+        """获取会话所有消息，按 message_order 排序（先等待该会话排队中的消息落库）"""
+        if Config.CHAT_WRITE_BEHIND and not get_chat_writer().wait_session(session_id):
+            print(f"等待会话 {session_id} 消息落库超时，读取结果可能不完整")
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
@@ -672,46 +1403,38 @@ class ChatHistoryDAO:
                 return result
 
     def get_user_sessions(self, user_id: int, limit: int = 50) -> List[Dict]:
-        """获取用户所有对话历史（统一展示）"""
+        """获取用户所有对话历史（统一展示）
+
+        chat_agent 按会话一行，其他页面每条记录一行；读 chat_sessions 汇总表，按 (user_id, last_updated) 索引倒序
+        """
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                # chat_agent 按 session_id 分组，其他页面的每条记录独立展示
                 cursor.execute(
-                    """SELECT
-                        CASE
-                            WHEN page = 'chat_agent' THEN session_id
-                            ELSE CONCAT('single_', CAST(id AS CHAR))
-                        END as session_key,
-                        page,
-                        MAX(CASE WHEN user_input != '__SESSION_START__'
-                            THEN COALESCE(user_input, ai_response) ELSE NULL END) as title,
-                        MAX(CASE WHEN user_input != '__SESSION_START__'
-                            THEN user_input ELSE NULL END) as user_input,
-                        MAX(CASE WHEN user_input != '__SESSION_START__'
-                            THEN ai_response ELSE NULL END) as ai_response,
-                        COUNT(*) as message_count,
-                        MAX(created_at) as last_updated,
-                        MAX(CASE WHEN page = 'chat_agent' THEN 1 ELSE 0 END) as is_session
-                       FROM chat_history
-                       WHERE user_id = %s
-                       GROUP BY session_key, page
-                       ORDER BY last_updated DESC
-                       LIMIT %s""",
+                    f"""SELECT session_key, page, title, last_message, message_count, last_updated, is_session
+                        FROM {SESSIONS_TABLE}
+                        WHERE user_id = %s
+                        ORDER BY last_updated DESC
+                        LIMIT %s""",
                     (user_id, limit)
                 )
                 rows = cursor.fetchall()
-                # 转换 is_session 标志
                 for row in rows:
                     row['is_session'] = bool(row['is_session'])
                 return rows
 
     def delete_session(self, session_id: str, user_id: int) -> bool:
-        """删除会话"""
+        """删除会话（先等待该会话排队中的消息落库）"""
+        self._wait_queued(session_id)
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     "DELETE FROM chat_history WHERE session_id = %s AND user_id = %s",
                     (session_id, user_id)
                 )
+                deleted = cursor.rowcount > 0
+                cursor.execute(
+                    f"DELETE FROM {SESSIONS_TABLE} WHERE session_key = %s AND user_id = %s",
+                    (session_id, user_id)
+                )
                 conn.commit()
-                return cursor.rowcount > 0
+                return deleted
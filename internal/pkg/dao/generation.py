@@ -0,0 +1,56 @@
+# internal/pkg/dao/generation.py
+"""数据代际（generation）
+
+每次导入、清空或批量修改物流数据都会把代际号 +1，派生数据（总数缓存、快照、LLM 缓存等）
+以代际号作为失效依据：代际号变了，旧结果自然作废。
+
+代际号持久化在 data_generations 表中，多进程部署时各进程最多延迟
+GENERATION_CHECK_INTERVAL 秒感知到其他进程的变更；本进程内的变更立即可见。
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+from internal.configs.config import Config
+from internal.pkg.dao.pool import get_pool
+
+SHIPMENTS = 'shipments'
+
+_lock = threading.Lock()
+# name -> (generation, 读取时间)
+_cache: Dict[str, Tuple[int, float]] = {}
+
+
+def current_generation(name: str = SHIPMENTS) -> int:
+    """当前代际号"""
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(name)
+    if cached and now - cached[1] < Config.GENERATION_CHECK_INTERVAL:
+        return cached[0]
+
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT generation FROM data_generations WHERE name = %s", (name,))
+            row = cursor.fetchone()
+    generation = row['generation'] if row else 0
+    with _lock:
+        _cache[name] = (generation, now)
+    return generation
+
+
+def bump_generation(name: str = SHIPMENTS) -> int:
+    """代际号 +1，返回新值"""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO data_generations (name, generation) VALUES (%s, 1) "
+                "ON DUPLICATE KEY UPDATE generation = LAST_INSERT_ID(generation + 1)",
+                (name,)
+            )
+            # 新插入时 lastrowid 为 0，此时代际号即 1
+            generation = cursor.lastrowid or 1
+        conn.commit()
+    with _lock:
+        _cache[name] = (generation, time.monotonic())
+    return generation
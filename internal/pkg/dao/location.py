@@ -0,0 +1,145 @@
+# internal/pkg/dao/location.py
+"""地址规范化与地点索引
+
+地址形如「北京朝阳区分拨中心」「上海浦东新区」，导入时拆成 城市 / 区县 / 网点 三列分别落库
+（origin_city + origin_district + origin_hub，收件地址同理），并建联合索引。
+
+起点/终点的模糊筛选不再对明细表做 LIKE '%x%' 全表扫描：LocationIndex 按数据代际缓存
+每一侧所有不同的 (城市, 区县, 网点) 组合（通常只有几百个，走索引读取），先在这本字典里做子串匹配，
+再把命中的组合改写成索引列上的等值条件：
+- 命中某些城市下的全部组合 -> city IN (...)
+- 否则 -> (city, district, hub) IN ((...), ...)
+- 没有命中 -> 1=0
+字典过大或命中组合过多时退回 LIKE。
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 区县名：最短匹配到「新区 / 区 / 县 / 旗」为止
+_DISTRICT_RE = re.compile(r'^(.{1,8}?(?:新区|区|县|旗))')
+_CITY_SUFFIX = '市'
+
+# 地址列 -> (城市列, 区县列, 网点列)
+LOCATION_COLUMNS = {
+    'origin': ('origin_city', 'origin_district', 'origin_hub'),
+    'destination': ('destination_city', 'destination_district', 'destination_hub'),
+}
+DERIVED_COLUMNS = ('origin_district', 'origin_hub', 'destination_district', 'destination_hub')
+
+
+def normalize_city(city: Optional[str]) -> str:
+    city = (city or '').strip()
+    return city[:-1] if len(city) > 2 and city.endswith(_CITY_SUFFIX) else city
+
+
+def _normalize_text(text: str) -> str:
+    """用于匹配的规范化：去空白与「市」字，关键词与字典两边做相同处理"""
+    return re.sub(r'\s+', '', text or '').replace(_CITY_SUFFIX, '')
+
+
+def parse_location(address: Optional[str], city: Optional[str] = None,
+                   known_cities: Iterable[str] = ()) -> Tuple[str, str, str]:
+    """地址 -> (城市, 区县, 网点)
+
+    city 给出时优先使用；否则取 known_cities 中与地址开头匹配的最长城市名，再否则取地址中「市」之前的部分
+    """
+    address = (address or '').strip()
+    city = normalize_city(city)
+    if not city:
+        city = max((c for c in known_cities if c and address.startswith(c)), key=len, default='')
+    rest = address
+    if city and rest.startswith(city):
+        rest = rest[len(city):]
+        if rest.startswith(_CITY_SUFFIX):
+            rest = rest[1:]
+    elif not city and _CITY_SUFFIX in address[:8]:
+        city, rest = address.split(_CITY_SUFFIX, 1)
+    match = _DISTRICT_RE.match(rest)
+    district = match.group(1) if match else ''
+    return city, district, rest[len(district):]
+
+
+def split_locations(df, side: str) -> None:
+    """为数据块补齐一侧地址的规范化列（原地修改）
+
+    同一块里地址和城市大量重复，只对不同的 (地址, 城市) 组合调用 parse_location，再按组合回填
+    """
+    city_col, district_col, hub_col = LOCATION_COLUMNS[side]
+    # 本块两侧出现过的城市，用于补全缺失的城市列
+    known = {normalize_city(c) for col, _, _ in LOCATION_COLUMNS.values() if col in df
+             for c in df[col].dropna().unique()}
+    known.discard('')
+    keys = df[[side]].assign(_city=df[city_col] if city_col in df else '').fillna('')
+    unique = keys.drop_duplicates()
+    parsed = [parse_location(address, city, known) for address, city in zip(unique[side], unique['_city'])]
+    unique = unique.assign(**{column: [p[i] for p in parsed]
+                              for i, column in enumerate((city_col, district_col, hub_col))})
+    merged = keys.merge(unique, on=[side, '_city'], how='left')
+    for column in (city_col, district_col, hub_col):
+        df[column] = merged[column].to_numpy()
+
+
+def fill_location_fields(shipment: Dict) -> Dict:
+    """单条物流记录补齐规范化地址字段（已给出的不覆盖）"""
+    for side, columns in LOCATION_COLUMNS.items():
+        parsed = parse_location(shipment.get(side), shipment.get(columns[0]))
+        for column, value in zip(columns, parsed):
+            if not shipment.get(column):
+                shipment[column] = value
+    return shipment
+
+
+class LocationIndex:
+    """某一数据代际的地点字典"""
+
+    def __init__(self, entries: Dict[str, List[Tuple[str, str, str]]], generation: int,
+                 max_in: int = 500):
+        self.generation = generation
+        self.max_in = max_in
+        # side -> [(规范化文本, (city, district, hub))]
+        self._entries = {
+            side: [(_normalize_text(''.join(entry)), tuple(entry)) for entry in rows]
+            for side, rows in entries.items()
+        }
+        self._city_sizes = {
+            side: _count_by_city(entry for _, entry in rows)
+            for side, rows in self._entries.items()
+        }
+
+    def cities(self) -> List[str]:
+        """两侧出现过的全部城市"""
+        return sorted({entry[0] for rows in self._entries.values() for _, entry in rows if entry[0]})
+
+    def resolve(self, side: str, keyword: str) -> Optional[Tuple[str, List[str]]]:
+        """关键词 -> (条件, 参数)；无法改写时返回 None（调用方退回 LIKE）"""
+        needle = _normalize_text(keyword)
+        if not needle or side not in self._entries:
+            return None
+        city_col, district_col, hub_col = LOCATION_COLUMNS[side]
+        matched = [entry for text, entry in self._entries[side] if needle in text]
+        if not matched:
+            return "1=0", []
+
+        matched_sizes = _count_by_city(matched)
+        whole_cities = [c for c, n in matched_sizes.items() if n == self._city_sizes[side].get(c)]
+        partial = [entry for entry in matched if entry[0] not in whole_cities]
+        if len(whole_cities) + len(partial) > self.max_in:
+            return None
+
+        clauses, params = [], []
+        if whole_cities:
+            clauses.append(f"{city_col} IN ({','.join(['%s'] * len(whole_cities))})")
+            params.extend(whole_cities)
+        if partial:
+            clauses.append(f"({city_col}, {district_col}, {hub_col}) IN "
+                           f"({','.join(['(%s,%s,%s)'] * len(partial))})")
+            for entry in partial:
+                params.extend(entry)
+        return "(" + " OR ".join(clauses) + ")", params
+
+
+def _count_by_city(entries: Iterable[Tuple[str, str, str]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        counts[entry[0]] = counts.get(entry[0], 0) + 1
+    return counts
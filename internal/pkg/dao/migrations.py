@@ -0,0 +1,312 @@
+# internal/pkg/dao/migrations.py
+"""数据库版本化迁移
+
+每个迁移有唯一递增的版本号，已执行的版本记录在 schema_migrations 表中。
+MySQL 的 DDL 不能回滚，因此每个迁移都写成可重复执行（先检查再变更），
+对已有库重复运行、或中途失败后重跑都是安全的。
+"""
+import logging
+from datetime import date
+from typing import Callable, List, Tuple
+
+from internal.configs.config import Config
+from internal.pkg.dao.chat_search import FULLTEXT_COLUMNS, FULLTEXT_INDEX
+from internal.pkg.dao.chat_sessions import CREATE_SESSIONS_SQL, rebuild_sessions
+from internal.pkg.dao.location import LOCATION_COLUMNS, parse_location
+from internal.pkg.dao.retention import list_partitions, partition_by_month
+from internal.pkg.dao.rollup import CREATE_ROLLUP_SQL, rebuild_rollup
+
+logger = logging.getLogger("LogisticsAPI")
+
+MIGRATION_LOCK_NAME = 'logistics_schema_migrations'
+
+# 初始建表 SQL（版本 1）
+CREATE_TABLES_SQL = [
+    """CREATE TABLE IF NOT EXISTS shipments (
+        id VARCHAR(128) PRIMARY KEY,
+        origin VARCHAR(255),
+        destination VARCHAR(255),
+        origin_city VARCHAR(255),
+        destination_city VARCHAR(255),
+        status VARCHAR(64),
+        estimated_delivery DATE,
+        actual_delivery DATE,
+        weight DOUBLE,
+        dimensions TEXT,
+        customer_id VARCHAR(128),
+        courier_company VARCHAR(255),
+        courier VARCHAR(255),
+        package_type VARCHAR(128),
+        priority VARCHAR(64),
+        customer_type VARCHAR(128),
+        payment_method VARCHAR(128),
+        shipping_fee DOUBLE,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS shipment_events (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        shipment_id VARCHAR(128),
+        event_type VARCHAR(128),
+        location VARCHAR(255),
+        description TEXT,
+        timestamp DATETIME,
+        CONSTRAINT fk_shipment
+            FOREIGN KEY (shipment_id) REFERENCES shipments(id)
+            ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(64) UNIQUE NOT NULL,
+        password VARCHAR(256) NOT NULL,
+        role VARCHAR(32) DEFAULT 'user',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS operation_logs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        username VARCHAR(64),
+        action VARCHAR(128),
+        detail TEXT,
+        ip_address VARCHAR(64),
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE IF NOT EXISTS chat_history (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        username VARCHAR(64) NOT NULL,
+        page VARCHAR(64) NOT NULL COMMENT '页面标识：code_generator/analysis_report/compare等',
+        title VARCHAR(256) DEFAULT '' COMMENT '对话标题/摘要',
+        user_input TEXT NOT NULL COMMENT '用户输入',
+        ai_response TEXT COMMENT 'AI响应内容',
+        session_id VARCHAR(64) NOT NULL DEFAULT '' COMMENT '会话ID，关联同一轮对话',
+        message_order INT NOT NULL DEFAULT 0 COMMENT '消息顺序',
+        action_type VARCHAR(32) DEFAULT NULL COMMENT '动作类型：query/mutation/optimize/explain',
+        action_result TEXT DEFAULT NULL COMMENT '执行结果（JSON）',
+        diff_content TEXT DEFAULT NULL COMMENT '变更Diff（JSON）',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_user_page (user_id, page),
+        INDEX idx_user_created (user_id, created_at),
+        INDEX idx_session_id (session_id),
+        INDEX idx_user_session (user_id, session_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+]
+
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+        (table, index)
+    )
+    return cursor.fetchone() is not None
+
+
+def add_column(cursor, table: str, column: str, definition: str) -> None:
+    """列不存在时添加"""
+    if not _column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def add_index(cursor, table: str, index: str, columns: str, kind: str = "INDEX", options: str = "") -> None:
+    """索引不存在时创建（kind 可为 INDEX / UNIQUE INDEX / FULLTEXT INDEX 等，options 如 WITH PARSER ngram）"""
+    if not _index_exists(cursor, table, index):
+        cursor.execute(f"CREATE {kind} {index} ON {table} ({columns}) {options}".rstrip())
+
+
+# ---- 迁移定义 ----
+
+def _m001_baseline(cursor) -> None:
+    for sql in CREATE_TABLES_SQL:
+        cursor.execute(sql)
+
+
+def _m002_shipments_row_hash(cursor) -> None:
+    add_column(cursor, 'shipments', 'row_hash',
+               "BIGINT UNSIGNED DEFAULT NULL COMMENT '行内容哈希，增量导入变更检测'")
+
+
+def _m003_shipments_analytical_indexes(cursor) -> None:
+    # 列表分页 / 按创建时间范围统计：ORDER BY created_at DESC、created_at >= ...
+    add_index(cursor, 'shipments', 'idx_created_id', 'created_at, id')
+    # 状态 + 时间：get_shipments_by_criteria、运输中趋势
+    add_index(cursor, 'shipments', 'idx_status_created', 'status, created_at')
+    # 送达统计：按送达日期范围计数并判断延误，覆盖查询无需回表
+    add_index(cursor, 'shipments', 'idx_delivery_status', 'actual_delivery, status, estimated_delivery')
+    # 城市线路聚合与过滤
+    add_index(cursor, 'shipments', 'idx_route', 'origin_city, destination_city')
+    add_index(cursor, 'shipments', 'idx_destination_city', 'destination_city')
+    # 快递公司费用统计（覆盖索引）
+    add_index(cursor, 'shipments', 'idx_courier_fee', 'courier_company, shipping_fee')
+
+
+def _m004_data_generations(cursor) -> None:
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS data_generations (
+            name VARCHAR(64) PRIMARY KEY,
+            generation BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+    )
+    cursor.execute("INSERT IGNORE INTO data_generations (name, generation) VALUES ('shipments', 1)")
+
+
+def _m005_shipments_created_date(cursor) -> None:
+    # 按天统计直接走 created_date 索引范围扫描，避免 DATE(created_at) 使索引失效
+    add_column(cursor, 'shipments', 'created_date', 'DATE AS (DATE(created_at)) STORED')
+    add_index(cursor, 'shipments', 'idx_created_date_status', 'created_date, status')
+
+
+def _m006_shipment_daily_rollup(cursor) -> None:
+    cursor.execute(CREATE_ROLLUP_SQL)
+    rebuild_rollup(cursor)
+
+
+def _m007_shipments_dimension_columns(cursor) -> None:
+    add_column(cursor, 'shipments', 'length', "DOUBLE DEFAULT NULL COMMENT '长(cm)'")
+    add_column(cursor, 'shipments', 'width', "DOUBLE DEFAULT NULL COMMENT '宽(cm)'")
+    add_column(cursor, 'shipments', 'height', "DOUBLE DEFAULT NULL COMMENT '高(cm)'")
+    # 体积重按快递行业常用抛比 6000 计算，可直接参与 SQL 聚合
+    add_column(cursor, 'shipments', 'volumetric_weight',
+               "DOUBLE AS (length * width * height / 6000) STORED COMMENT '体积重(kg)'")
+    if _column_exists(cursor, 'shipments', 'dimensions'):
+        # 存量数据从 JSON 回填；行哈希的列组成变了，一并置空，下次增量导入按已变化处理
+        cursor.execute(
+            """UPDATE shipments SET
+                   length = JSON_EXTRACT(dimensions, '$.length') + 0,
+                   width = JSON_EXTRACT(dimensions, '$.width') + 0,
+                   height = JSON_EXTRACT(dimensions, '$.height') + 0
+               WHERE JSON_VALID(dimensions)"""
+        )
+        cursor.execute("UPDATE shipments SET row_hash = NULL")
+        cursor.execute("ALTER TABLE shipments DROP COLUMN dimensions")
+
+
+def _m008_chat_history_fulltext(cursor) -> None:
+    # 对话内容是中文，用 ngram 分词；标题、提问、回答都参与检索
+    add_index(cursor, 'chat_history', FULLTEXT_INDEX, FULLTEXT_COLUMNS,
+              kind="FULLTEXT INDEX", options="WITH PARSER ngram")
+
+
+def _m009_chat_sessions(cursor) -> None:
+    cursor.execute(CREATE_SESSIONS_SQL)
+    rebuild_sessions(cursor)
+
+
+def _m010_operation_logs_indexes(cursor) -> None:
+    # /api/logs 按时间倒序取最近 N 条；个人日志按用户 + 时间
+    add_index(cursor, 'operation_logs', 'idx_timestamp', 'timestamp')
+    add_index(cursor, 'operation_logs', 'idx_user_timestamp', 'user_id, timestamp')
+
+
+def _m011_operation_logs_partitions(cursor) -> None:
+    # 保留策略按过期会话的最后更新时间扫描
+    add_index(cursor, 'chat_sessions', 'idx_last_updated', 'last_updated')
+    if list_partitions(cursor, 'operation_logs'):
+        return
+    # 分区列必须属于主键且非空
+    cursor.execute("UPDATE operation_logs SET timestamp = NOW() WHERE timestamp IS NULL")
+    cursor.execute(
+        """ALTER TABLE operation_logs
+           MODIFY timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+           DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)"""
+    )
+    cursor.execute("SELECT MIN(timestamp) AS first FROM operation_logs")
+    first = cursor.fetchone()['first']
+    partition_by_month(cursor, 'operation_logs', 'timestamp',
+                       first.date() if first else date.today(), Config.LOG_PARTITION_AHEAD_MONTHS)
+
+
+def _m012_shipments_location_columns(cursor) -> None:
+    for side, (city, district, hub) in LOCATION_COLUMNS.items():
+        add_column(cursor, 'shipments', district, "VARCHAR(64) NOT NULL DEFAULT '' COMMENT '区县'")
+        add_column(cursor, 'shipments', hub, "VARCHAR(128) NOT NULL DEFAULT '' COMMENT '网点'")
+    # 存量数据按 id 分批回填（城市同时去掉「市」后缀），只更新已有行
+    last_id = ''
+    while True:
+        cursor.execute(
+            "SELECT id, origin, origin_city, destination, destination_city FROM shipments "
+            "WHERE id > %s ORDER BY id LIMIT 5000",
+            (last_id,)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        values = []
+        for row in rows:
+            values.append((row['id'],) + parse_location(row['origin'], row['origin_city'])
+                          + parse_location(row['destination'], row['destination_city']))
+        cursor.executemany(
+            """INSERT INTO shipments (id, origin_city, origin_district, origin_hub,
+                                      destination_city, destination_district, destination_hub)
+               VALUES (%s, %s, %s, %s, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE
+                   origin_city = VALUES(origin_city), origin_district = VALUES(origin_district),
+                   origin_hub = VALUES(origin_hub), destination_city = VALUES(destination_city),
+                   destination_district = VALUES(destination_district), destination_hub = VALUES(destination_hub)""",
+            values
+        )
+        last_id = rows[-1]['id']
+    for side, (city, district, hub) in LOCATION_COLUMNS.items():
+        add_index(cursor, 'shipments', f'idx_{side}_location', f'{city}, {district}, {hub}')
+        add_index(cursor, 'shipments', f'idx_{district}', district)
+
+
+# (版本号, 说明, 执行函数)，只追加、不修改已发布的版本
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, '初始表结构', _m001_baseline),
+    (2, 'shipments 增加 row_hash 列', _m002_shipments_row_hash),
+    (3, 'shipments 分析查询索引', _m003_shipments_analytical_indexes),
+    (4, '数据代际表 data_generations', _m004_data_generations),
+    (5, 'shipments 增加 created_date 生成列及索引', _m005_shipments_created_date),
+    (6, '物流日汇总表 shipment_daily_rollup', _m006_shipment_daily_rollup),
+    (7, 'shipments 尺寸拆为 length/width/height 数值列并增加体积重', _m007_shipments_dimension_columns),
+    (8, 'chat_history 增加 ngram 全文索引', _m008_chat_history_fulltext),
+    (9, '对话会话汇总表 chat_sessions', _m009_chat_sessions),
+    (10, 'operation_logs 时间与用户索引', _m010_operation_logs_indexes),
+    (11, 'operation_logs 按月分区', _m011_operation_logs_partitions),
+    (12, 'shipments 地址拆分为城市/区县/网点列及索引', _m012_shipments_location_columns),
+]
+
+
+def run_migrations(conn) -> List[int]:
+    """执行所有未应用的迁移，返回本次执行的版本号列表"""
+    applied_now = []
+    with conn.cursor() as cursor:
+        # 多进程同时启动时只允许一个执行迁移
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (MIGRATION_LOCK_NAME, 60))
+        if not cursor.fetchone()['locked']:
+            raise RuntimeError("等待数据库迁移锁超时")
+        try:
+            cursor.execute(
+                """CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+            )
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row['version'] for row in cursor.fetchall()}
+
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info(f"执行数据库迁移 {version}: {name}")
+                migrate(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                conn.commit()
+                applied_now.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+    return applied_now
@@ -0,0 +1,271 @@
+# internal/pkg/dao/pool.py
+"""MySQL 连接池 - 进程内共享，线程安全"""
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+from pymysql.cursors import DictCursor
+
+from internal.configs.config import Config
+
+logger = logging.getLogger("LogisticsAPI")
+
+
+class PoolExhaustedError(RuntimeError):
+    """在超时时间内没有可用连接"""
+
+
+class _PooledConnection:
+    """池内连接及其元数据"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """线程安全的 MySQL 连接池
+
+    - min_size: 预热并常驻的连接数
+    - max_size: 同时存在的连接数上限，超出时借用方阻塞等待
+    - max_lifetime: 连接最长存活秒数，到期归还时关闭并重建
+    - ping_interval: 连接空闲超过该秒数时，借出前先 ping 检查存活（0 表示每次都检查）
+    - acquire_timeout: 借用连接的最长等待秒数
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 10, max_lifetime: float = 3600,
+                 ping_interval: float = 30, acquire_timeout: float = 10, **connect_kwargs):
+        if max_size < 1:
+            raise ValueError("max_size 必须大于 0")
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+        self._connect_kwargs = connect_kwargs
+
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'acquired': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+        }
+
+    # ---- 内部工具 ----
+
+    def _connect(self) -> _PooledConnection:
+        conn = pymysql.connect(**self._connect_kwargs)
+        with self._cond:
+            self._stats['created'] += 1
+        return _PooledConnection(conn)
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        return bool(self.max_lifetime) and now - pooled.created_at >= self.max_lifetime
+
+    def _is_alive(self, pooled: _PooledConnection, now: float) -> bool:
+        if now - pooled.last_used < self.ping_interval:
+            return True
+        try:
+            pooled.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['ping_failures'] += 1
+            return False
+
+    # ---- 对外接口 ----
+
+    def warmup(self) -> None:
+        """预先建立 min_size 个连接"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self, timeout: Optional[float] = None) -> _PooledConnection:
+        """借出一个可用连接"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        wait_start = time.monotonic()
+
+        while True:
+            pooled = None
+            with self._cond:
+                if self._closed:
+                    raise PoolExhaustedError("连接池已关闭")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolExhaustedError(
+                            f"等待数据库连接超时（{timeout}s），连接池上限 {self.max_size}"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    # 后进先出，优先复用最热的连接，冷连接自然老化
+                    pooled = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    pooled = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._expired(pooled, now):
+                    with self._cond:
+                        self._stats['recycled'] += 1
+                    self._close(pooled)
+                    continue
+                if not self._is_alive(pooled, now):
+                    self._close(pooled)
+                    continue
+
+            with self._cond:
+                self._stats['acquired'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_time'] += time.monotonic() - wait_start
+            return pooled
+
+    def release(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        """归还连接；discard=True 或连接状态异常时直接关闭"""
+        if not discard:
+            try:
+                # 未提交的事务（包括只读查询隐式开启的快照）必须结束，避免下一个借用方读到旧数据
+                if pooled.conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    pooled.conn.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        if not discard and self._expired(pooled, now):
+            with self._cond:
+                self._stats['recycled'] += 1
+            discard = True
+
+        if discard or self._closed:
+            self._close(pooled)
+            return
+
+        pooled.last_used = now
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """借用连接的上下文管理器，退出时自动归还"""
+        pooled = self.acquire()
+        discard = False
+        try:
+            yield pooled.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(pooled, discard=discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        stats['avg_wait_ms'] = stats['wait_time'] / stats['waits'] * 1000 if stats['waits'] else 0.0
+        return stats
+
+    def close_all(self) -> None:
+        """关闭池内所有空闲连接，并拒绝后续借用"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            self._close(pooled)
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """获取进程级共享连接池（首次调用时创建）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=Config.MYSQL_POOL_MIN_SIZE,
+                    max_size=Config.MYSQL_POOL_MAX_SIZE,
+                    max_lifetime=Config.MYSQL_POOL_MAX_LIFETIME,
+                    ping_interval=Config.MYSQL_POOL_PING_INTERVAL,
+                    acquire_timeout=Config.MYSQL_POOL_ACQUIRE_TIMEOUT,
+                    host=Config.MYSQL_HOST,
+                    port=Config.MYSQL_PORT,
+                    user=Config.MYSQL_USER,
+                    password=Config.MYSQL_PASSWORD,
+                    database=Config.MYSQL_DATABASE,
+                    charset="utf8mb4",
+                    cursorclass=DictCursor,
+                    autocommit=False,
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    """关闭共享连接池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
@@ -0,0 +1,305 @@
+# internal/pkg/dao/retention.py
+"""日志分区、保留策略与归档
+
+operation_logs 按月 RANGE 分区（分区名 pYYYYMM，末尾 pmax 兜底）：
+- 维护任务提前建好未来几个月的分区（从 pmax 拆分，pmax 为空时只改元数据）
+- 超过保留期（LOG_RETENTION_MONTHS）的整月分区先导出为归档文件，再 DROP PARTITION，代价与行数无关
+
+chat_history 带 ngram FULLTEXT 索引，InnoDB 分区表不支持全文索引，因此不分区：
+按 chat_sessions.last_updated 找出超过 CHAT_RETENTION_MONTHS 的整段会话，分批归档后删除，
+会话不会被从中间截断。
+
+归档格式为 gzip JSONL（默认）或 Parquet（需 pyarrow），先写临时文件、完成后改名，
+导出失败时不删除任何数据。维护任务用 GET_LOCK 保证多进程下只有一个在执行。
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from internal.configs.config import Config
+from internal.pkg.dao.chat_sessions import SESSIONS_TABLE
+from internal.pkg.dao.pool import get_pool
+
+logger = logging.getLogger("LogisticsAPI")
+
+RETENTION_LOCK_NAME = 'logistics_retention'
+LOG_TABLE = 'operation_logs'
+LOG_COLUMNS = ('id', 'user_id', 'username', 'action', 'detail', 'ip_address', 'timestamp')
+CHAT_COLUMNS = ('id', 'user_id', 'username', 'page', 'title', 'user_input', 'ai_response', 'session_id',
+                'message_order', 'action_type', 'action_result', 'diff_content', 'created_at')
+ARCHIVE_FORMATS = ('jsonl', 'parquet')
+
+# 归档读取每批行数 / 每批处理的会话数
+_READ_BATCH = 10000
+_SESSION_BATCH = 500
+
+
+# ---- 月份与分区 ----
+
+def month_start(day: date, offset: int = 0) -> date:
+    """day 所在月（向后偏移 offset 个月）的第一天"""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    """pYYYYMM -> 该月第一天；pmax 等返回 None"""
+    if len(name) == 7 and name.startswith('p') and name[1:].isdigit():
+        return date(int(name[1:5]), int(name[5:]), 1)
+    return None
+
+
+def _partition_clause(month: date) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{month_start(month, 1)}'))"
+
+
+def list_partitions(cursor, table: str) -> List[str]:
+    """表的分区名（按顺序）；未分区返回空列表"""
+    cursor.execute(
+        "SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (table,)
+    )
+    return [row['name'] for row in cursor.fetchall()]
+
+
+def partition_by_month(cursor, table: str, column: str, first_month: date, ahead: int) -> None:
+    """将表改为按 column 的月份 RANGE 分区，覆盖 first_month 至当前月之后 ahead 个月"""
+    last_month = month_start(date.today(), ahead)
+    months, month = [], month_start(first_month)
+    while month <= last_month:
+        months.append(month)
+        month = month_start(month, 1)
+    clauses = [_partition_clause(m) for m in months] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+    cursor.execute(f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS({column})) ({', '.join(clauses)})")
+
+
+def ensure_future_partitions(cursor, table: str, ahead: int) -> List[str]:
+    """从 pmax 拆出至当前月之后 ahead 个月的分区，返回新建的分区名"""
+    existing = [m for m in map(_partition_month, list_partitions(cursor, table)) if m]
+    if not existing:
+        return []
+    target = month_start(date.today(), ahead)
+    months, month = [], month_start(max(existing), 1)
+    while month <= target:
+        months.append(month)
+        month = month_start(month, 1)
+    if months:
+        clauses = [_partition_clause(m) for m in months] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(clauses)})")
+    return [partition_name(m) for m in months]
+
+
+# ---- 归档文件 ----
+
+def _archive_path(table: str, name: str, fmt: str) -> str:
+    directory = os.path.join(Config.ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    suffix = 'jsonl.gz' if fmt == 'jsonl' else 'parquet'
+    return os.path.join(directory, f"{table}_{name}.{suffix}")
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class _ArchiveWriter:
+    """分批写入归档文件；close() 后才改名为正式文件名"""
+
+    def __init__(self, path: str, fmt: str):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"不支持的归档格式: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.tmp_path = path + '.tmp'
+        self.rows = 0
+        self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8') if fmt == 'jsonl' else None
+        self._writer = None
+
+    def write(self, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        if self.fmt == 'jsonl':
+            for row in rows:
+                self._file.write(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                # 首批中整列为空的字段按字符串处理
+                inferred = pa.Table.from_pylist(rows).schema
+                schema = pa.schema([pa.field(f.name, pa.string() if pa.types.is_null(f.type) else f.type)
+                                    for f in inferred])
+                self._writer = pq.ParquetWriter(self.tmp_path, schema, compression='zstd')
+            self._writer.write_table(pa.Table.from_pylist(rows, schema=self._writer.schema))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+        elif self.fmt == 'parquet':
+            # 空分区：仍生成空文件，表示已归档
+            open(self.tmp_path, 'wb').close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            if self._file is not None:
+                self._file.close()
+            if self._writer is not None:
+                self._writer.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def _export(cursor, writer: _ArchiveWriter, sql: str, params: Tuple = ()) -> None:
+    """按 id 键集分页读取并写入归档；sql 需包含 id > %s 条件与 ORDER BY id LIMIT %s"""
+    last_id = 0
+    while True:
+        cursor.execute(sql, params + (last_id, _READ_BATCH))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        writer.write(rows)
+        last_id = rows[-1]['id']
+
+
+# ---- 保留策略 ----
+
+def archive_log_partitions(conn, cutoff: date, fmt: str, archive: bool = True) -> List[Dict]:
+    """归档并删除上界不晚于 cutoff 的整月分区"""
+    done = []
+    with conn.cursor() as cursor:
+        for name in list_partitions(cursor, LOG_TABLE):
+            month = _partition_month(name)
+            if month is None or month_start(month, 1) > cutoff:
+                continue
+            rows = 0
+            path = None
+            if archive:
+                path = _archive_path(LOG_TABLE, name, fmt)
+                writer = _ArchiveWriter(path, fmt)
+                try:
+                    _export(cursor, writer,
+                            f"SELECT {', '.join(LOG_COLUMNS)} FROM {LOG_TABLE} PARTITION ({name}) "
+                            "WHERE id > %s ORDER BY id LIMIT %s")
+                    writer.close()
+                except Exception:
+                    writer.abort()
+                    raise
+                rows = writer.rows
+            cursor.execute(f"ALTER TABLE {LOG_TABLE} DROP PARTITION {name}")
+            logger.info(f"操作日志分区 {name} 已删除（归档 {rows} 行 -> {path}）")
+            done.append({'partition': name, 'rows': rows, 'path': path})
+    return done
+
+
+def archive_chat_sessions(conn, cutoff: date, fmt: str, archive: bool = True) -> Dict[str, int]:
+    """归档并删除最后更新早于 cutoff 的会话（chat_agent 整段会话或其他页面的单条记录）"""
+    sessions = rows = 0
+    batch_no = 0
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    with conn.cursor() as cursor:
+        while True:
+            cursor.execute(
+                f"SELECT session_key, is_session FROM {SESSIONS_TABLE} "
+                "WHERE last_updated < %s ORDER BY last_updated LIMIT %s",
+                (cutoff, _SESSION_BATCH)
+            )
+            keys = cursor.fetchall()
+            if not keys:
+                break
+            session_ids = [k['session_key'] for k in keys if k['is_session']]
+            chat_ids = [int(k['session_key'][len('single_'):]) for k in keys if not k['is_session']]
+            conditions, params = [], []
+            if session_ids:
+                conditions.append(f"session_id IN ({','.join(['%s'] * len(session_ids))})")
+                params += session_ids
+            if chat_ids:
+                conditions.append(f"id IN ({','.join(['%s'] * len(chat_ids))})")
+                params += chat_ids
+            where = ' OR '.join(conditions)
+
+            batch_no += 1
+            if archive:
+                writer = _ArchiveWriter(_archive_path('chat_history', f"{stamp}_{batch_no:04d}", fmt), fmt)
+                try:
+                    _export(cursor, writer,
+                            f"SELECT {', '.join(CHAT_COLUMNS)} FROM chat_history "
+                            f"WHERE ({where}) AND id > %s ORDER BY id LIMIT %s", tuple(params))
+                    writer.close()
+                except Exception:
+                    writer.abort()
+                    raise
+            cursor.execute(f"DELETE FROM chat_history WHERE {where}", params)
+            rows += cursor.rowcount
+            key_list = [k['session_key'] for k in keys]
+            cursor.execute(
+                f"DELETE FROM {SESSIONS_TABLE} WHERE session_key IN ({','.join(['%s'] * len(key_list))})",
+                key_list
+            )
+            conn.commit()
+            sessions += len(keys)
+    if sessions:
+        logger.info(f"对话历史已归档并删除 {sessions} 个会话、{rows} 条记录")
+    return {'sessions': sessions, 'rows': rows}
+
+
+def run_retention() -> Dict[str, Any]:
+    """执行一次分区维护与保留策略，返回处理结果；其他进程正在执行时跳过"""
+    fmt = Config.ARCHIVE_FORMAT
+    today = date.today()
+    result: Dict[str, Any] = {'skipped': False}
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (RETENTION_LOCK_NAME,))
+            if not cursor.fetchone()['locked']:
+                return {'skipped': True}
+        try:
+            with conn.cursor() as cursor:
+                result['created_partitions'] = ensure_future_partitions(
+                    cursor, LOG_TABLE, Config.LOG_PARTITION_AHEAD_MONTHS)
+            if Config.LOG_RETENTION_MONTHS > 0:
+                result['dropped_partitions'] = archive_log_partitions(
+                    conn, month_start(today, -Config.LOG_RETENTION_MONTHS), fmt, Config.ARCHIVE_ENABLED)
+            if Config.CHAT_RETENTION_MONTHS > 0:
+                result['chat_history'] = archive_chat_sessions(
+                    conn, month_start(today, -Config.CHAT_RETENTION_MONTHS), fmt, Config.ARCHIVE_ENABLED)
+        finally:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (RETENTION_LOCK_NAME,))
+    return result
+
+
+_scheduler: Optional[threading.Thread] = None
+
+
+def start_retention_scheduler() -> None:
+    """后台线程：启动后执行一次，之后每 RETENTION_INTERVAL_HOURS 小时执行一次"""
+    global _scheduler
+    if _scheduler is not None or Config.RETENTION_INTERVAL_HOURS <= 0:
+        return
+
+    def loop():
+        while True:
+            try:
+                run_retention()
+            except Exception as e:
+                logger.error(f"日志保留策略执行失败: {e}")
+            time.sleep(Config.RETENTION_INTERVAL_HOURS * 3600)
+
+    _scheduler = threading.Thread(target=loop, name='log-retention', daemon=True)
+    _scheduler.start()
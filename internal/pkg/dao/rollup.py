@@ -0,0 +1,106 @@
+# internal/pkg/dao/rollup.py
+"""物流日汇总表 shipment_daily_rollup
+
+按 天 × 起点城市 × 终点城市 × 状态 × 快递公司 × 优先级 预聚合，每日统计、趋势和看板指标
+只读几百行汇总数据，不再扫描物流明细表。
+
+同一条物流最多计入两天：
+- 创建日（created_date）：计入 shipments / total_weight / total_fee
+- 送达日（actual_delivery）：计入 delivered / delayed_deliveries / delivery_hours / timed_deliveries
+
+维护方式是按天重算：写入方记下受影响的日期（新旧值都要算上），在同一连接上先删后插这些天的汇总行。
+"""
+from typing import Any, Iterable, List, Set
+
+ROLLUP_TABLE = 'shipment_daily_rollup'
+ROLLUP_DIMENSIONS = ('origin_city', 'destination_city', 'status', 'courier_company', 'priority')
+ROLLUP_MEASURES = ('shipments', 'total_weight', 'total_fee',
+                   'delivered', 'delayed_deliveries', 'delivery_hours', 'timed_deliveries')
+ROLLUP_COLUMNS = ('day',) + ROLLUP_DIMENSIONS + ROLLUP_MEASURES
+
+# 每条 DELETE/INSERT ... SELECT 处理的天数
+_DAYS_PER_STATEMENT = 100
+
+CREATE_ROLLUP_SQL = f"""CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    day DATE NOT NULL,
+    origin_city VARCHAR(255) NOT NULL DEFAULT '',
+    destination_city VARCHAR(255) NOT NULL DEFAULT '',
+    status VARCHAR(64) NOT NULL DEFAULT '',
+    courier_company VARCHAR(255) NOT NULL DEFAULT '',
+    priority VARCHAR(64) NOT NULL DEFAULT '',
+    shipments INT NOT NULL DEFAULT 0,
+    total_weight DOUBLE NOT NULL DEFAULT 0,
+    total_fee DOUBLE NOT NULL DEFAULT 0,
+    delivered INT NOT NULL DEFAULT 0,
+    delayed_deliveries INT NOT NULL DEFAULT 0,
+    delivery_hours DOUBLE NOT NULL DEFAULT 0,
+    timed_deliveries INT NOT NULL DEFAULT 0,
+    KEY idx_day_status (day, status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+
+
+def _aggregate_sql(source: str, created_filter: str = '', delivered_filter: str = '') -> str:
+    """从明细表聚合出汇总行的 SELECT；两个分支分别走 created_date / actual_delivery 索引"""
+    dims = ', '.join(f"COALESCE({c}, '') AS {c}" for c in ROLLUP_DIMENSIONS)
+    group_by = ', '.join(ROLLUP_DIMENSIONS)
+    sums = ', '.join(f"SUM({c})" for c in ROLLUP_MEASURES)
+    return f"""
+        SELECT day, {group_by}, {sums}
+        FROM (
+            SELECT created_date AS day, {dims},
+                   1 AS shipments, COALESCE(weight, 0) AS total_weight, COALESCE(shipping_fee, 0) AS total_fee,
+                   0 AS delivered, 0 AS delayed_deliveries, 0 AS delivery_hours, 0 AS timed_deliveries
+            FROM {source}
+            WHERE created_date IS NOT NULL {created_filter}
+            UNION ALL
+            SELECT actual_delivery, {dims},
+                   0, 0, 0,
+                   1, COALESCE(status = 'delivered' AND actual_delivery > estimated_delivery, 0),
+                   COALESCE(TIMESTAMPDIFF(SECOND, created_at, actual_delivery), 0) / 3600,
+                   (created_at IS NOT NULL)
+            FROM {source}
+            WHERE actual_delivery IS NOT NULL {delivered_filter}
+        ) t
+        GROUP BY day, {group_by}"""
+
+
+def rebuild_rollup(cursor, source: str = 'shipments', target: str = ROLLUP_TABLE) -> None:
+    """由明细表 source 全量重建汇总表 target（调用方负责提交）"""
+    cursor.execute(f"DELETE FROM {target}")
+    cursor.execute(f"INSERT INTO {target} ({', '.join(ROLLUP_COLUMNS)}) {_aggregate_sql(source)}")
+
+
+def refresh_rollup_days(cursor, days: Iterable[Any]) -> int:
+    """重算指定日期的汇总行（调用方负责提交），返回重算的天数"""
+    days = sorted(collect_days(days))
+    columns = ', '.join(ROLLUP_COLUMNS)
+    for i in range(0, len(days), _DAYS_PER_STATEMENT):
+        part = days[i:i + _DAYS_PER_STATEMENT]
+        placeholders = ','.join(['%s'] * len(part))
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE day IN ({placeholders})", part)
+        cursor.execute(
+            f"INSERT INTO {ROLLUP_TABLE} ({columns}) "
+            + _aggregate_sql('shipments',
+                             f"AND created_date IN ({placeholders})",
+                             f"AND actual_delivery IN ({placeholders})"),
+            part + part
+        )
+    return len(days)
+
+
+def collect_days(values: Iterable[Any]) -> Set[str]:
+    """日期 / 日期时间 / 字符串 -> 'YYYY-MM-DD' 集合，忽略空值"""
+    days = set()
+    for value in values:
+        if value is None or value != value:  # None / NaN
+            continue
+        text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        if len(text) >= 10:
+            days.add(text[:10])
+    return days
+
+
+def frame_days(df) -> List[Any]:
+    """数据块中受影响的日期（创建日与送达日）"""
+    return df['created_at'].tolist() + df['actual_delivery'].tolist()
@@ -0,0 +1,133 @@
+# internal/pkg/dao/snapshot.py
+"""物流数据列式快照
+
+每个数据代际只从数据库读一次，保存为 pandas 列（低基数字符串用 category 编码，日期为 datetime64），
+各服务在其上做向量化过滤与聚合，不再每次请求物化上万个字典。
+
+快照按 created_at、id 倒序排列，与 get_all_shipments 一致，latest(n) 即最近 n 条。
+导入、清空、批量改状态都会推进代际号，下一次 get_snapshot() 自动重建。
+快照最多保留 SNAPSHOT_MAX_ROWS 条最近记录。
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pymysql
+
+from internal.configs.config import Config
+from internal.pkg.dao.generation import SHIPMENTS, current_generation
+from internal.pkg.dao.pool import get_pool
+
+# 低基数字符串列，用 category 编码
+CATEGORY_COLUMNS = (
+    'origin', 'destination', 'origin_city', 'destination_city', 'status',
+    'courier_company', 'courier', 'package_type', 'priority', 'customer_type', 'payment_method',
+)
+STRING_COLUMNS = ('id', 'customer_id')
+FLOAT_COLUMNS = ('weight', 'shipping_fee', 'length', 'width', 'height', 'volumetric_weight')
+DATE_COLUMNS = ('estimated_delivery', 'actual_delivery')
+DATETIME_COLUMNS = ('created_at',)
+_SELECT_COLUMNS = STRING_COLUMNS + CATEGORY_COLUMNS + FLOAT_COLUMNS + DATE_COLUMNS + DATETIME_COLUMNS
+
+
+class ShipmentSnapshot:
+    """某一数据代际的只读列式快照"""
+
+    def __init__(self, frame: pd.DataFrame, generation: int, truncated: bool = False):
+        self.frame = frame
+        self.generation = generation
+        self.truncated = truncated
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def latest(self, n: int = None) -> pd.DataFrame:
+        """最近 n 条（不复制），n 为 None 时返回全部"""
+        return self.frame if n is None else self.frame.iloc[:n]
+
+    @staticmethod
+    def contains(series: pd.Series, keyword: str) -> pd.Series:
+        """子串筛选；category 列只在去重后的取值上匹配，再按编码映射回各行"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            hit = categories[categories.astype(str).str.contains(keyword, regex=False)]
+            return series.isin(hit)
+        return series.str.contains(keyword, regex=False, na=False)
+
+    @staticmethod
+    def to_records(frame: pd.DataFrame, columns: List[str] = None) -> List[Dict[str, Any]]:
+        """转回与 DAO 查询结果相同的字典列表（日期为 date/datetime，缺失值为 None）
+
+        只在需要逐条输出时对小结果集调用
+        """
+        if columns is not None:
+            frame = frame[list(columns)]
+        arrays = []
+        for column in frame.columns:
+            series = frame[column]
+            if column in DATE_COLUMNS:
+                values = series.dt.date.to_numpy(dtype=object, copy=True)
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                values = series.dt.to_pydatetime().astype(object)
+            else:
+                values = series.to_numpy(dtype=object, copy=True)
+            values[series.isna().to_numpy()] = None
+            arrays.append(values)
+        columns = list(frame.columns)
+        return [dict(zip(columns, row)) for row in zip(*arrays)]
+
+
+def _build_frame(rows: List[tuple]) -> pd.DataFrame:
+    """数据库行 -> 列式 DataFrame"""
+    raw = pd.DataFrame.from_records(rows, columns=_SELECT_COLUMNS)
+    out = {}
+    for column in STRING_COLUMNS:
+        out[column] = raw[column].astype(object)
+    for column in CATEGORY_COLUMNS:
+        out[column] = raw[column].astype('category')
+    for column in FLOAT_COLUMNS:
+        out[column] = pd.to_numeric(raw[column], errors='coerce').astype('float64')
+    for column in DATE_COLUMNS + DATETIME_COLUMNS:
+        out[column] = pd.to_datetime(raw[column], errors='coerce')
+    return pd.DataFrame(out)
+
+
+def _load_snapshot(generation: int) -> ShipmentSnapshot:
+    limit = Config.SNAPSHOT_MAX_ROWS
+    with get_pool().connection() as conn:
+        # 元组游标，避免逐行构造字典
+        with conn.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(_SELECT_COLUMNS)} FROM shipments "
+                "ORDER BY created_at DESC, id DESC LIMIT %s",
+                (limit + 1,)
+            )
+            rows = cursor.fetchall()
+    truncated = len(rows) > limit
+    return ShipmentSnapshot(_build_frame(list(rows[:limit])), generation, truncated)
+
+
+_lock = threading.Lock()
+_snapshot: Optional[ShipmentSnapshot] = None
+
+
+def get_snapshot() -> ShipmentSnapshot:
+    """当前代际的快照；代际变化后首次调用时重建，并发调用只重建一次"""
+    global _snapshot
+    generation = current_generation(SHIPMENTS)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            start = time.perf_counter()
+            _snapshot = _load_snapshot(generation)
+            print(f"物流快照已重建：代际 {generation}，{len(_snapshot)} 条，耗时 {time.perf_counter() - start:.3f}s")
+        return _snapshot
+
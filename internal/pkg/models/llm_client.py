@@ -0,0 +1,164 @@
+# internal/pkg/models/llm_client.py
+"""大模型异步流式 HTTP 客户端
+
+Flask 视图每个请求各自新建事件循环（asyncio.run / new_event_loop），绑定在某个循环上的连接池
+无法跨请求复用。这里在进程内单独起一个后台事件循环线程，持有一个共享的 httpx.AsyncClient：
+- 连接池 + HTTP keep-alive，后续调用跳过 TCP/TLS 握手，并发流互不阻塞
+- 响应按行增量解析 SSE，每个事件通过 call_soon_threadsafe 投递回调用方的事件循环
+- 调用方提前结束（客户端断开、生成器被关闭或任务取消）时取消上游请求，连接随之关闭
+- 连接、读取超时可配置（LLM_CONNECT_TIMEOUT / LLM_READ_TIMEOUT）
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import httpx
+
+from internal.configs.config import Config
+
+logger = logging.getLogger("LogisticsAgent")
+
+
+async def iter_sse_data(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """增量解析 SSE：按空行分隔事件，产出每个事件的 data（多行 data 以换行拼接）"""
+    data = []
+    async for line in lines:
+        line = line.rstrip('\r')
+        if not line:
+            if data:
+                yield '\n'.join(data)
+                data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if field == 'data':
+            data.append(value[1:] if value.startswith(' ') else value)
+    if data:
+        yield '\n'.join(data)
+
+
+class LLMClient:
+    """后台事件循环 + 共享连接池"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+
+                    def run():
+                        asyncio.set_event_loop(loop)
+                        self._client = httpx.AsyncClient(
+                            timeout=httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT),
+                            limits=httpx.Limits(
+                                max_connections=Config.LLM_MAX_CONNECTIONS,
+                                max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+                                keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY,
+                            ),
+                        )
+                        ready.set()
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=run, name='llm-client-loop', daemon=True)
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    async def stream_events(self, url: str, headers: Dict[str, str],
+                            payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """POST 流式请求，逐个产出 SSE 事件解析后的 JSON；HTTP 错误与超时以 httpx 异常抛出"""
+        loop = self._ensure_started()
+        caller = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def emit(kind: str, value: Any = None) -> None:
+            try:
+                caller.call_soon_threadsafe(queue.put_nowait, (kind, value))
+            except RuntimeError:
+                # 调用方事件循环已关闭，后续事件无人接收
+                future.cancel()
+
+        future = asyncio.run_coroutine_threadsafe(self._pump(url, headers, payload, emit), loop)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == 'event':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            # 正常结束时 future 已完成，cancel 无副作用；提前退出时中止上游请求
+            future.cancel()
+
+    async def _pump(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                    emit: Callable[..., None]) -> None:
+        """在后台循环中执行请求并把事件投递给调用方"""
+        try:
+            async with self._client.stream('POST', url, headers=headers, json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for data in iter_sse_data(response.aiter_lines()):
+                    if data == '[DONE]':
+                        continue
+                    try:
+                        emit('event', json.loads(data))
+                    except json.JSONDecodeError:
+                        # 忽略无法解析的事件
+                        pass
+            emit('done')
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            emit('error', e)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """关闭连接池并停止后台循环"""
+        loop, client = self._loop, self._client
+        if loop is None:
+            return
+        try:
+            if client is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout)
+        except Exception as e:
+            logger.error(f"关闭模型客户端失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._loop = self._client = self._thread = None
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """获取进程级共享的模型客户端（首次调用时创建）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def close_llm_client() -> None:
+    """关闭共享模型客户端（进程退出时调用）"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
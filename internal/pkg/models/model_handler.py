@@ -3,7 +3,12 @@
 import os
 import asyncio
 import logging
-import requests
+
+import httpx
+
+from internal.configs.config import Config
+from internal.pkg.models.llm_client import get_llm_client
+from internal.pkg.models.response_cache import cache_key, get_response_cache, merge_chunks, replay_chunks
 
 logger = logging.getLogger("LogisticsAgent")
 
@@ -38,11 +43,48 @@ class AIModelHandler:
         self.api_key = api_key or os.getenv("MINIMAX_API_KEY")
         self.api_url = os.getenv("MINIMAX_API_URL", "https://api.minimaxi.com/anthropic/v1/messages")
 
-    async def generate_response_stream(self, prompt: str, context: str = ""):
-        """使用API生成响应，真正的流式返回thinking和text"""
+    async def generate_response_stream(self, prompt: str, context: str = "", cache_ttl: float = None):
+        """使用API生成响应，真正的流式返回thinking和text
+
+        通过共享的异步客户端发送请求（连接池复用、不阻塞事件循环），调用方停止迭代时上游请求随之取消。
+        cache_ttl 为缓存秒数（由调用方按场景给出，None/0 不缓存）：按 (模型, 提示词, 数据代际) 命中时直接重放缓存内容
+        """
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        key = self._cache_key(full_prompt) if cache_ttl and Config.LLM_CACHE_ENABLED else None
+        if key is None:
+            async for chunk in self._stream(full_prompt):
+                yield chunk
+            return
+
+        cache = get_response_cache()
+        segments = cache.get(key)
+        if segments is not None:
+            logger.info("命中模型响应缓存")
+            for chunk in replay_chunks(segments):
+                yield chunk
+            return
+
+        chunks = []
+        async for chunk in self._stream(full_prompt):
+            chunks.append(chunk)
+            yield chunk
+        # 只缓存完整且无错误的响应；调用方提前结束迭代时不会走到这里
+        segments = merge_chunks(chunks)
+        if any(kind == 'text' for kind, _ in segments) and not any(c['type'] == 'error' for c in chunks):
+            cache.put(key, self.model_name, segments, cache_ttl)
+
+    def _cache_key(self, full_prompt: str):
+        """缓存键；取不到数据代际时不使用缓存"""
+        from internal.pkg.dao.generation import current_generation
         try:
-            full_prompt = f"{context}\n\n{prompt}" if context else prompt
+            return cache_key(self.model_name, full_prompt, current_generation())
+        except Exception as e:
+            logger.warning(f"获取数据代际失败，跳过模型响应缓存: {e}")
+            return None
 
+    async def _stream(self, full_prompt: str):
+        """请求模型并逐个产出 thinking / text / error 片段"""
+        try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json",
@@ -59,75 +101,48 @@ class AIModelHandler:
                 "stream": True  # 启用流式响应
             }
 
-            # 使用 stream=True 进行真正的流式请求
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=120, stream=True)
-            response.raise_for_status()
-
             logger.info("开始流式接收响应...")
 
-            # 逐行读取 SSE 响应
-            for line in response.iter_lines():
-                if not line:
-                    continue
-
-                line_text = line.decode('utf-8')
-
-                # SSE 格式: data: {...}
-                if line_text.startswith('data: '):
-                    data_str = line_text[6:].strip()
-
-                    # 跳过 [DONE] 标记
-                    if data_str == '[DONE]':
-                        break
-
-                    try:
-                        import json as json_module
-                        data = json_module.loads(data_str)
-
-                        # 处理不同类型的事件
-                        event_type = data.get("type", "")
-
-                        if event_type == "content_block_start":
-                            # 内容块开始，可能是 thinking 或 text
-                            content_block = data.get("content_block", {})
-                            block_type = content_block.get("type", "")
-                            if block_type == "thinking":
-                                yield {"type": "thinking", "content": ""}
-                            elif block_type == "text":
-                                yield {"type": "text", "content": ""}
-
-                        elif event_type == "content_block_delta":
-                            # 内容块增量更新
-                            delta = data.get("delta", {})
-                            delta_type = delta.get("type", "")
-
-                            if delta_type == "thinking_delta":
-                                content = delta.get("thinking", "")
-                                if content:
-                                    yield {"type": "thinking", "content": content}
-                            elif delta_type == "text_delta":
-                                content = delta.get("text", "")
-                                if content:
-                                    yield {"type": "text", "content": content}
-                            elif delta_type == "signature_delta":
-                                # 签名块，忽略
-                                pass
-
-                        elif event_type == "message_delta":
-                            # 消息完成
-                            delta = data.get("delta", {})
-                            if delta.get("stop_reason") == "end_turn":
-                                logger.info("流式响应完成")
-                                break
-
-                    except json_module.JSONDecodeError:
-                        # 忽略无法解析的行
+            async for data in get_llm_client().stream_events(self.api_url, headers, payload):
+                # 处理不同类型的事件
+                event_type = data.get("type", "")
+
+                if event_type == "content_block_start":
+                    # 内容块开始，可能是 thinking 或 text
+                    content_block = data.get("content_block", {})
+                    block_type = content_block.get("type", "")
+                    if block_type == "thinking":
+                        yield {"type": "thinking", "content": ""}
+                    elif block_type == "text":
+                        yield {"type": "text", "content": ""}
+
+                elif event_type == "content_block_delta":
+                    # 内容块增量更新
+                    delta = data.get("delta", {})
+                    delta_type = delta.get("type", "")
+
+                    if delta_type == "thinking_delta":
+                        content = delta.get("thinking", "")
+                        if content:
+                            yield {"type": "thinking", "content": content}
+                    elif delta_type == "text_delta":
+                        content = delta.get("text", "")
+                        if content:
+                            yield {"type": "text", "content": content}
+                    elif delta_type == "signature_delta":
+                        # 签名块，忽略
                         pass
 
-        except requests.exceptions.Timeout:
+                elif event_type == "message_delta":
+                    # 消息完成；继续读到流结束，连接才能放回连接池复用
+                    delta = data.get("delta", {})
+                    if delta.get("stop_reason") == "end_turn":
+                        logger.info("流式响应完成")
+
+        except httpx.TimeoutException:
             logger.error("API请求超时")
             yield {"type": "error", "content": "抱歉，模型请求超时，请稍后重试"}
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"API请求失败: {e}")
             yield {"type": "error", "content": f"抱歉，模型调用失败: {str(e)}"}
         except Exception as e:
@@ -0,0 +1,216 @@
+# internal/pkg/models/response_cache.py
+"""大模型响应缓存
+
+相同的提示词反复发给模型（重复的问题路由、数据未变时的日报/分析报告），每次都要花 token 和等待。
+这里按 (模型, 规范化后的提示词, 数据代际) 缓存完整响应：
+- 两级存储：进程内 LRU（LLM_CACHE_MEMORY_ENTRIES）+ 本地 SQLite（LLM_CACHE_PATH，进程重启后仍可命中）
+- 过期时间由调用方按场景传入（cache_ttl），数据变更后代际号变化，旧缓存自然失效
+- 只缓存完整且无错误的响应；命中时按原来的 thinking/text 顺序切片重放，前端 SSE 逻辑不变
+- stats() 返回内存/磁盘命中、未命中、写入、淘汰次数
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from internal.configs.config import Config
+
+logger = logging.getLogger("LogisticsAgent")
+
+CACHE_TABLE = 'llm_cache'
+
+_CREATE_TABLE_SQL = f"""CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    chunks TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)"""
+
+_CREATE_INDEX_SQL = f"CREATE INDEX IF NOT EXISTS idx_expires_at ON {CACHE_TABLE} (expires_at)"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """规范化提示词：去掉首尾空白，连续空白合并为一个空格"""
+    return re.sub(r'\s+', ' ', prompt or '').strip()
+
+
+def cache_key(model: str, prompt: str, generation: int) -> str:
+    raw = json.dumps([model, normalize_prompt(prompt), generation], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def merge_chunks(chunks: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """流式片段 -> [(类型, 内容)]，相邻同类型片段合并"""
+    merged: List[List[str]] = []
+    for chunk in chunks:
+        if not chunk.get('content'):
+            continue
+        if merged and merged[-1][0] == chunk['type']:
+            merged[-1][1] += chunk['content']
+        else:
+            merged.append([chunk['type'], chunk['content']])
+    return [(kind, content) for kind, content in merged]
+
+
+def replay_chunks(segments: List[Tuple[str, str]], size: int = None) -> Iterator[Dict[str, str]]:
+    """缓存内容切成小片段重放"""
+    size = size or Config.LLM_CACHE_REPLAY_CHUNK
+    for kind, content in segments:
+        for i in range(0, len(content), size):
+            yield {'type': kind, 'content': content[i:i + size]}
+
+
+class ResponseCache:
+    """进程内 LRU + SQLite 两级缓存"""
+
+    def __init__(self, path: str = None, memory_entries: int = None, disk_entries: int = None):
+        self.path = Config.LLM_CACHE_PATH if path is None else path
+        self.memory_entries = memory_entries or Config.LLM_CACHE_MEMORY_ENTRIES
+        self.disk_entries = disk_entries or Config.LLM_CACHE_DISK_ENTRIES
+        self._memory: 'OrderedDict[str, Tuple[float, List[Tuple[str, str]]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_failed = False
+        self._stats = {
+            'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+            'stores': 0, 'evictions': 0, 'expired': 0,
+        }
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite 连接（调用方持有 _lock）；打不开时只用内存缓存"""
+        if self._db is None and not self._db_failed and self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(_CREATE_TABLE_SQL)
+                db.execute(_CREATE_INDEX_SQL)
+                db.execute(f"DELETE FROM {CACHE_TABLE} WHERE expires_at <= ?", (time.time(),))
+                db.commit()
+                self._db = db
+            except sqlite3.Error as e:
+                self._db_failed = True
+                logger.warning(f"模型响应缓存无法使用磁盘存储，仅使用内存: {e}")
+        return self._db
+
+    def _remember(self, key: str, expires_at: float, segments: List[Tuple[str, str]]) -> None:
+        self._memory[key] = (expires_at, segments)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get(self, key: str) -> Optional[List[Tuple[str, str]]]:
+        """命中返回 [(类型, 内容)]，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+                self._stats['expired'] += 1
+
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        f"SELECT chunks, expires_at FROM {CACHE_TABLE} WHERE cache_key = ? AND expires_at > ?",
+                        (key, now)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"读取模型响应缓存失败: {e}")
+                    row = None
+                if row is not None:
+                    segments = [tuple(item) for item in json.loads(row[0])]
+                    self._remember(key, row[1], segments)
+                    self._stats['disk_hits'] += 1
+                    return segments
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key: str, model: str, segments: List[Tuple[str, str]], ttl: float) -> None:
+        """写入两级缓存；磁盘条数超过上限时淘汰最早过期的"""
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, segments)
+            self._stats['stores'] += 1
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    f"INSERT OR REPLACE INTO {CACHE_TABLE} (cache_key, model, chunks, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, json.dumps(segments, ensure_ascii=False), now, expires_at)
+                )
+                db.execute(f"DELETE FROM {CACHE_TABLE} WHERE expires_at <= ?", (now,))
+                db.execute(
+                    f"""DELETE FROM {CACHE_TABLE} WHERE cache_key IN (
+                        SELECT cache_key FROM {CACHE_TABLE} ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.disk_entries,)
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"写入模型响应缓存失败: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute(f"DELETE FROM {CACHE_TABLE}")
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats['memory_hits'] + self._stats['disk_hits']
+            lookups = hits + self._stats['misses']
+            return dict(
+                self._stats,
+                memory_entries=len(self._memory),
+                hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取进程级模型响应缓存（首次调用时创建）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def close_response_cache() -> None:
+    """关闭缓存的 SQLite 连接（进程退出时调用）"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
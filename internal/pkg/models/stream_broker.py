@@ -0,0 +1,138 @@
+# internal/pkg/models/stream_broker.py
+"""流式生成合并（single-flight）
+
+日报、分析报告页每打开一个标签页都会单独读一遍数据并调用一次模型，而同一份数据生成的报告完全相同。
+StreamBroker 按键（报告类型, 数据代际）合并并发请求：
+- 第一个请求启动上游生成，生成在后台线程的独立事件循环中运行，不依附于任何一个请求，
+  某个订阅者断开不影响其他人
+- 之后的请求作为订阅者加入，先收到已缓冲的前缀，再实时跟随后续片段
+- 生成完成后结果保留 STREAM_RETENTION_SECONDS 秒，期间的新请求直接重放；出错的结果不保留
+- 数据变更后代际号变化，自然开始新的一次生成
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional
+
+from internal.configs.config import Config
+
+logger = logging.getLogger("LogisticsAgent")
+
+
+class _Flight:
+    """一次上游生成：已产出的片段 + 完成状态"""
+
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self.cond = threading.Condition()
+        self.finished = False
+        self.failed = False
+        self.finished_at = 0.0
+
+    def append(self, item: Dict[str, Any]) -> None:
+        with self.cond:
+            self.items.append(item)
+            if item.get('type') == 'error':
+                self.failed = True
+            self.cond.notify_all()
+
+    def finish(self) -> None:
+        with self.cond:
+            self.finished = True
+            self.finished_at = time.monotonic()
+            self.cond.notify_all()
+
+    def follow(self) -> Iterator[Dict[str, Any]]:
+        """从头读取：先产出已缓冲的片段，再等待后续片段直到完成"""
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.items) and not self.finished:
+                    self.cond.wait()
+                batch = self.items[index:]
+                finished = self.finished
+            index += len(batch)
+            yield from batch
+            if finished and index >= len(self.items):
+                return
+
+
+class StreamBroker:
+    """按键合并并发的流式生成"""
+
+    def __init__(self, retention: float = None):
+        self.retention = Config.STREAM_RETENTION_SECONDS if retention is None else retention
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'subscribers': 0, 'joined_live': 0, 'reused': 0, 'failed': 0}
+
+    def subscribe(self, key: Hashable,
+                  factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """订阅 key 对应的生成；没有进行中或可复用的生成时用 factory 启动一次"""
+        with self._lock:
+            self._purge()
+            self._stats['subscribers'] += 1
+            flight = self._flights.get(key)
+            if flight is None or (flight.finished and flight.failed):
+                flight = self._flights[key] = _Flight()
+                self._stats['started'] += 1
+                threading.Thread(
+                    target=self._run, args=(key, flight, factory), name='stream-broker', daemon=True
+                ).start()
+            elif flight.finished:
+                self._stats['reused'] += 1
+            else:
+                self._stats['joined_live'] += 1
+        return flight.follow()
+
+    def _run(self, key: Hashable, flight: _Flight,
+             factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def pump():
+            async for item in factory():
+                flight.append(item)
+
+        try:
+            loop.run_until_complete(pump())
+        except Exception as e:
+            logger.error(f"流式生成失败 {key}: {e}")
+            flight.append({'type': 'error', 'content': str(e)})
+        finally:
+            loop.close()
+            flight.finish()
+            with self._lock:
+                if flight.failed:
+                    self._stats['failed'] += 1
+                    # 出错的结果不保留，下一个请求重新生成
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+
+    def _purge(self) -> None:
+        """清理超过保留时间的已完成生成（调用方持有 _lock）"""
+        now = time.monotonic()
+        expired = [key for key, flight in self._flights.items()
+                   if flight.finished and now - flight.finished_at >= self.retention]
+        for key in expired:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, active=sum(not f.finished for f in self._flights.values()),
+                        retained=sum(f.finished for f in self._flights.values()))
+
+
+_broker: Optional[StreamBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_stream_broker() -> StreamBroker:
+    """获取进程级流式生成合并器（首次调用时创建）"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = StreamBroker()
+    return _broker
@@ -1,10 +1,14 @@
 # pages/analysis_report/service.py
 """分析报告页面服务层"""
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
+from internal.configs.config import Config
+from internal.pkg.constants import STATUS_CN_MAP
 from internal.pkg.dao import ShipmentDAO
+from internal.pkg.dao.generation import current_generation
 from internal.pkg.models.model_handler import AIModelHandler
+from internal.pkg.models.stream_broker import get_stream_broker
 from internal.pkg.utils import format_ai_response
 
 
@@ -14,21 +18,30 @@ class AnalysisReportService:
         self.shipment_dao = ShipmentDAO()
         self.model_handler = AIModelHandler()
 
+    def subscribe_analysis_stream(self) -> Iterator[Dict[str, Any]]:
+        """订阅分析报告生成：同一数据代际的并发请求共享一次生成，完成后的结果在保留期内直接重放"""
+        return get_stream_broker().subscribe(('analysis_report', current_generation()), self.generate_analysis_stream_with_format)
+
     async def generate_analysis_stream_with_format(self):
         """流式生成AI分析报告，返回格式化后的HTML"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        shipments = self.shipment_dao.get_snapshot().latest(10000)
 
-        if not shipments:
+        if shipments.empty:
             yield {'type': 'error', 'content': '没有可分析的数据，请先上传CSV文件'}
             return
 
+        status = shipments['status'].astype(object).fillna('unknown')
+        status_counts = status.map(lambda s: STATUS_CN_MAP.get(s, s)).value_counts(sort=False)
+        status_distribution = {key: int(count) for key, count in status_counts.items()}
+        average_weight = float(shipments['weight'].fillna(0).mean())
+
         analysis_prompt = f"""
 你是转运中心现场的班次值班经理。基于以下全量数据输出面向执行的班次简报：
 
 数据概览：
 - 总记录数: {len(shipments)}
-- 状态分布: {self.model_handler._get_status_distribution(shipments)}
-- 平均重量: {self.model_handler._calculate_average_weight(shipments):.2f} kg
+- 状态分布: {status_distribution}
+- 平均重量: {average_weight:.2f} kg
 
 请严格按以下结构输出（短句要点式）：
 A. 今日运行态势（拥堵/异常波次/高峰时段）
@@ -39,7 +52,7 @@ E. 行动清单（≤5条，明确"责任岗位+完成时限"）
 """
 
         full_content = ""
-        async for chunk in self.model_handler.generate_response_stream(analysis_prompt, ""):
+        async for chunk in self.model_handler.generate_response_stream(analysis_prompt, "", cache_ttl=Config.LLM_CACHE_TTL_REPORT):
             if chunk['type'] in ('thinking', 'text', 'error'):
                 yield chunk
                 if chunk['type'] == 'text':
@@ -19,6 +19,7 @@ class AnalyzeHttp:
         app.add_url_rule('/page/analyze', endpoint='page_analyze', view_func=login_required(self.page_analyze))
         # API路由
         app.add_url_rule('/chart_data', endpoint='analyze_chart_data', view_func=login_required(self.get_chart_data), methods=['GET'])
+        app.add_url_rule('/daily_stats', endpoint='analyze_daily_stats', view_func=login_required(self.get_daily_stats), methods=['GET'])
 
     def page_analyze(self):
         """分析页面"""
@@ -32,3 +33,17 @@ class AnalyzeHttp:
             return success(data=result)
         else:
             return error(result.get('message'))
+
+    def get_daily_stats(self):
+        """获取日期区间内每天的统计（start/end 为 YYYY-MM-DD，包含两端）"""
+        start = request.args.get('start')
+        end = request.args.get('end', start)
+        if not start:
+            return error('缺少 start 参数')
+
+        result = self.service.get_daily_stats_range(start, end)
+
+        if result.get('success'):
+            return success(data=result)
+        else:
+            return error(result.get('message'))
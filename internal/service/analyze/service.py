@@ -4,6 +4,10 @@ from typing import Dict, Any
 
 from internal.pkg.dao import ShipmentDAO
 
+# 图表模块用到的字段
+CHART_COLUMNS = ['status', 'origin_city', 'customer_type', 'priority', 'weight', 'shipping_fee',
+                 'actual_delivery', 'created_at']
+
 
 class AnalyzeService:
     """分析服务"""
@@ -11,11 +15,19 @@ class AnalyzeService:
     def __init__(self):
         self.shipment_dao = ShipmentDAO()
 
+    def get_daily_stats_range(self, start: str, end: str) -> Dict[str, Any]:
+        """获取日期区间内每天的统计"""
+        try:
+            days = self.shipment_dao.get_daily_stats_range(start, end)
+        except ValueError as e:
+            return {'success': False, 'message': f'日期参数错误: {e}'}
+        return {'success': True, 'days': days}
+
     def get_chart_data(self) -> Dict[str, Any]:
         """获取图表数据"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        snapshot = self.shipment_dao.get_snapshot()
 
-        if not shipments:
+        if snapshot.empty:
             return {
                 'success': False,
                 'message': '没有可分析的数据，请先上传CSV文件'
@@ -26,6 +38,8 @@ class AnalyzeService:
         status_distribution = self._get_status_distribution()
 
         from internal.pkg.charts import generate_chart_data
+        # 图表只需少数几列，直接从快照取最近 10000 条
+        shipments = snapshot.to_records(snapshot.latest(10000), CHART_COLUMNS)
         chart_data = generate_chart_data(shipments, daily_stats)
 
         return {
@@ -51,12 +65,9 @@ class AnalyzeService:
         """获取状态分布"""
         from internal.pkg.constants import STATUS_CN_MAP
 
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
         distribution = {}
-
-        for shipment in shipments:
-            status = shipment.get('status', 'unknown')
+        for status, count in self.shipment_dao.get_rollup_summary()['status_counts'].items():
             cn_status = STATUS_CN_MAP.get(status, status)
-            distribution[cn_status] = distribution.get(cn_status, 0) + 1
+            distribution[cn_status] = distribution.get(cn_status, 0) + count
 
         return distribution
\ No newline at end of file
@@ -2,19 +2,26 @@
 """Agent 引擎 - 意图识别 + 路由分发"""
 import json
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from internal.configs.config import Config
 from .handlers.base import HandlerResponse
 from .handlers.query import QueryHandler
 from .handlers.mutation import MutationHandler
 from .handlers.optimize import OptimizeHandler
 from .handlers.explain import ExplainHandler
+from .intent_classifier import get_intent_classifier, normalize_status
 
 
 class Agent:
     """Agent 引擎"""
 
-    INTENT_PROMPT = """用户消息：{message}
+    INTENTS = ('query', 'mutation', 'optimize', 'explain')
+    # 需要参数的意图；explain 不需要参数
+    PARAM_INTENTS = ('query', 'mutation', 'optimize')
+
+    # 意图识别与参数提取合并为一次模型调用
+    ROUTE_PROMPT = """用户消息：{message}
 
 请判断用户想要什么，选择以下意图之一：
 - query：需要查询数据库中的物流数据（统计、筛选等）
@@ -22,11 +29,7 @@ class Agent:
 - optimize：需要对物流路线/成本进行分析优化
 - explain：只是想聊天或了解概念，不需要执行任何操作
 
-只返回一个词：query/mutation/optimize/explain"""
-
-    PARAM_EXTRACT_PROMPT = """用户消息：{message}
-
-请从消息中提取关键参数，JSON格式：
+意图不是 explain 时，再从消息中提取关键参数：
 - status: 物流状态（如延误、已送达、运输中）
 - days: 最近天数（如3天、7天）
 - origin: 发货地关键词
@@ -35,7 +38,8 @@ class Agent:
 - updates: 要更新的字段和值（如 status: 已送达）
 - optimize_type: 优化类型（route/cost/time）
 
-只返回 JSON，不要有其他内容。如果参数不存在则不包含该字段。"""
+只返回 JSON，不要有其他内容，格式：{{"intent": "query", "params": {{"status": "运输中", "days": 7}}}}
+参数不存在则不包含该字段；意图为 explain 时 params 为空对象。"""
 
     def __init__(self, dao, model):
         self.dao = dao
@@ -46,27 +50,26 @@ class Agent:
             'optimize': OptimizeHandler(dao, model),
             'explain': ExplainHandler(dao, model),
         }
+        self.classifier = get_intent_classifier(self._known_cities)
+
+    def _known_cities(self) -> List[str]:
+        """城市词典：取自当前数据代际的地点字典"""
+        index = self.dao.get_location_index()
+        return index.cities() if index is not None else []
 
     async def process(self, message: str, context: List[Dict]) -> HandlerResponse:
         """处理用户消息"""
-        # 1. 意图识别
-        intent_type = await self._detect_intent(message)
-        intent_type = intent_type.strip().lower()
-
-        if intent_type not in ('query', 'mutation', 'optimize', 'explain'):
-            intent_type = 'explain'  # 默认走对话
-
-        # 2. 参数提取
-        params = await self._extract_params(message)
+        # 1. 意图识别 + 参数提取（一次模型调用）
+        intent_type, params = await self._route(message)
 
-        # 3. 构建意图对象
+        # 2. 构建意图对象
         intent = {
             'type': intent_type,
             'message': message,
             'params': params
         }
 
-        # 4. 路由到 Handler
+        # 3. 路由到 Handler
         handler = self.handlers.get(intent_type)
         if not handler:
             return HandlerResponse(
@@ -76,11 +79,20 @@ class Agent:
                 error='No handler found'
             )
 
-        # 5. 执行处理
+        # 4. 执行处理
         response = await handler.handle(intent, context)
 
         return response
 
+    async def preview_mutation(self, plan: Dict) -> HandlerResponse:
+        """预览已确认意图的 mutation（只读，生成 Diff）"""
+        return await self.handlers['mutation'].preview_update(plan)
+
+    async def execute_mutation_stream(self, plan: Dict):
+        """执行已确认的 mutation，逐块产出进度，最后产出 {'type': 'result', 'response'}"""
+        async for item in self.handlers['mutation'].execute_update_stream(plan):
+            yield item
+
     async def execute_mutation(self, plan: Dict) -> HandlerResponse:
         """执行已确认的 mutation"""
         handler = self.handlers['mutation']
@@ -93,72 +105,85 @@ class Agent:
             error='execute_update not available'
         )
 
-    async def _detect_intent(self, message: str) -> str:
-        """识别用户意图"""
-        prompt = self.INTENT_PROMPT.format(message=message)
-        try:
-            response = await self.model.generate_response_stream(prompt, "")
-            result = ""
-            async for chunk in response:
-                if chunk['type'] == 'text':
-                    result += chunk['content']
-            return result.strip()
-        except Exception as e:
-            return 'explain'  # 出错默认走对话
-
-    async def _extract_params(self, message: str) -> Dict:
-        """提取参数"""
-        prompt = self.PARAM_EXTRACT_PROMPT.format(message=message)
+    @classmethod
+    def _parse_route(cls, text: str) -> Tuple[str, Dict]:
+        """模型输出 -> (意图, 参数)；JSON 解析失败时从文本中找意图词，参数为空"""
+        # 清理可能的 markdown 代码块
+        text = re.sub(r'```(?:json)?', '', text).strip()
+        match = re.search(r'\{.*\}', text, re.S)
+        intent_type, params = None, {}
+        if match:
+            try:
+                result = json.loads(match.group())
+                intent_type = str(result.get('intent', '')).strip().lower()
+                params = result.get('params') or {}
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        if intent_type not in cls.INTENTS:
+            found = re.search('|'.join(cls.INTENTS), text.lower())
+            intent_type = found.group() if found else 'explain'  # 默认走对话
+        if intent_type not in cls.PARAM_INTENTS or not isinstance(params, dict):
+            params = {}
+        # 状态统一为库中的英文状态
+        if 'status' in params:
+            params['status'] = normalize_status(params['status'])
+        for key in ('filters', 'updates'):
+            if isinstance(params.get(key), dict) and 'status' in params[key]:
+                params[key]['status'] = normalize_status(params[key]['status'])
+        return intent_type, params
+
+    async def _route(self, message: str) -> Tuple[str, Dict]:
+        """识别意图并提取参数"""
+        intent_type, params = 'explain', {}
+        async for chunk in self._route_stream(message):
+            if chunk['type'] == 'route':
+                intent_type, params = chunk['intent'], chunk['params']
+        return intent_type, params
+
+    async def _route_stream(self, message: str):
+        """流式识别意图并提取参数：透传 thinking 片段，最后产出 {'type': 'route', 'intent', 'params'}
+
+        先走本地分类，置信度不够时才调用模型，模型的结果用于本地模型增量学习
+        """
+        if Config.INTENT_FAST_PATH:
+            local = self.classifier.classify(message)
+            if local is not None:
+                yield {'type': 'route', 'intent': local[0], 'params': local[1]}
+                return
+
+        prompt = self.ROUTE_PROMPT.format(message=message)
+        result = ""
         try:
-            response = await self.model.generate_response_stream(prompt, "")
-            result = ""
-            async for chunk in response:
+            async for chunk in self.model.generate_response_stream(prompt, "", cache_ttl=Config.LLM_CACHE_TTL_ROUTE):
                 if chunk['type'] == 'text':
                     result += chunk['content']
-            # 尝试解析 JSON
-            # 清理可能的 markdown 代码块
-            result = re.sub(r'```json\s*', '', result)
-            result = re.sub(r'```\s*', '', result)
-            result = result.strip()
-            return json.loads(result)
-        except Exception as e:
-            return {}  # 解析失败返回空参数
+                elif chunk['type'] == 'thinking':
+                    yield chunk
+        except Exception:
+            result = ""  # 出错默认走对话
+        intent_type, params = self._parse_route(result)
+        if result and Config.INTENT_FAST_PATH:
+            self.classifier.learn(message, intent_type)
+        yield {'type': 'route', 'intent': intent_type, 'params': params}
 
     async def process_stream(self, message: str, context: List[Dict]):
         """流式处理用户消息"""
-        # 1. 流式意图识别
-        intent_type = ""
-        async for chunk in self._detect_intent_stream(message):
-            if chunk['type'] == 'text':
-                intent_type += chunk['content']
-            yield chunk
-
-        intent_type = intent_type.strip().lower()
-        if intent_type not in ('query', 'mutation', 'optimize', 'explain'):
-            intent_type = 'explain'
-
-        # 2. 流式参数提取
-        params_text = ""
-        async for chunk in self._extract_params_stream(message):
-            if chunk['type'] == 'text':
-                params_text += chunk['content']
-            yield chunk
-
-        try:
-            params_text = re.sub(r'```json\s*', '', params_text)
-            params_text = re.sub(r'```\s*', '', params_text)
-            params = json.loads(params_text.strip())
-        except:
-            params = {}
+        # 1. 意图识别 + 参数提取（一次模型调用，只透传思考过程，不把分类结果当正文输出）
+        intent_type, params = 'explain', {}
+        async for chunk in self._route_stream(message):
+            if chunk['type'] == 'route':
+                intent_type, params = chunk['intent'], chunk['params']
+            else:
+                yield chunk
 
-        # 3. 构建意图对象
+        # 2. 构建意图对象
         intent = {
             'type': intent_type,
             'message': message,
             'params': params
         }
 
-        # 4. 路由到 Handler 进行流式处理
+        # 3. 路由到 Handler 进行流式处理
         handler = self.handlers.get(intent_type)
         if handler and hasattr(handler, 'handle_stream'):
             async for chunk in handler.handle_stream(intent, context):
@@ -171,21 +196,3 @@ class Agent:
                 yield {'type': 'need_confirm', 'action_plan': response.action_plan}
         else:
             yield {'type': 'error', 'content': '无法处理此请求'}
-
-    async def _detect_intent_stream(self, message: str):
-        """流式识别用户意图"""
-        prompt = self.INTENT_PROMPT.format(message=message)
-        try:
-            async for chunk in self.model.generate_response_stream(prompt, ""):
-                yield chunk
-        except Exception as e:
-            yield {'type': 'text', 'content': 'explain'}
-
-    async def _extract_params_stream(self, message: str):
-        """流式提取参数"""
-        prompt = self.PARAM_EXTRACT_PROMPT.format(message=message)
-        try:
-            async for chunk in self.model.generate_response_stream(prompt, ""):
-                yield chunk
-        except Exception as e:
-            yield {'type': 'text', 'content': '{}'}
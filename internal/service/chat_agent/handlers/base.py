@@ -15,6 +15,7 @@ class HandlerResponse:
     action_plan: Dict = field(default_factory=dict)  # 行动计划
     diff: Dict = field(default_factory=dict)        # 变更 Diff
     error: str = None           # 错误信息
+    action_result: str = None   # 执行结果（JSON 字符串，随消息入库）
 
 
 class BaseHandler(ABC):
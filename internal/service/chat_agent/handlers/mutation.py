@@ -120,33 +120,99 @@ class MutationHandler(BaseHandler):
         except Exception as e:
             yield {'type': 'error', 'content': f'操作失败: {str(e)}'}
 
-    async def execute_update(self, plan: Dict) -> HandlerResponse:
-        """执行更新 - Diff 确认后调用"""
-        try:
-            affected_ids = plan.get('affected_ids', [])
-            new_status = plan.get('updates', {}).get('status')
-
-            if not affected_ids or not new_status:
-                return HandlerResponse(
-                    type='mutation',
-                    content='参数错误',
-                    need_confirm=False,
-                    error='Missing parameters'
-                )
-
-            count, before, after = self.dao.batch_update_status(affected_ids, new_status)
-
+    async def preview_update(self, plan: Dict) -> HandlerResponse:
+        """预览更新 - 意图确认后调用，只读出当前状态生成 Diff，不写库"""
+        affected_ids = plan.get('affected_ids', [])
+        new_status = plan.get('updates', {}).get('status')
+        if not affected_ids or not new_status:
             return HandlerResponse(
                 type='mutation',
-                content=f'成功更新 {count} 条记录',
+                content='参数错误',
                 need_confirm=False,
-                diff={'before': before, 'after': after},
-                action_result=json.dumps({'affected_rows': count})
+                error='Missing parameters'
             )
+        try:
+            with self.dao.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT id, status FROM shipments WHERE id IN ({','.join(['%s'] * len(affected_ids))})",
+                        affected_ids
+                    )
+                    rows = cursor.fetchall()
         except Exception as e:
             return HandlerResponse(
                 type='mutation',
-                content=f'更新失败: {str(e)}',
+                content=f'读取变更前状态失败: {str(e)}',
                 need_confirm=False,
                 error=str(e)
             )
+        before = [{'id': row['id'], 'status': row['status']} for row in rows]
+        after = [{'id': row['id'], 'status': new_status} for row in rows]
+        changed = sum(row['status'] != new_status for row in rows)
+        return HandlerResponse(
+            type='mutation',
+            content=f'将更新 {changed} 条记录（共匹配 {len(rows)} 条），请确认变更',
+            need_confirm=True,
+            diff={'before': before, 'after': after}
+        )
+
+    async def execute_update_stream(self, plan: Dict):
+        """执行更新 - Diff 确认后调用，逐块产出进度
+
+        每提交一块产出 {'type': 'progress', 'done', 'total', 'matched', 'updated'}，
+        最后产出 {'type': 'result', 'response': HandlerResponse}。某块失败时之前的块已提交，
+        结果中给出已提交的计数与这部分的变更前后状态。
+        """
+        affected_ids = plan.get('affected_ids', [])
+        new_status = plan.get('updates', {}).get('status')
+
+        if not affected_ids or not new_status:
+            yield {'type': 'result', 'response': HandlerResponse(
+                type='mutation',
+                content='参数错误',
+                need_confirm=False,
+                error='Missing parameters'
+            )}
+            return
+
+        before, after = [], []
+        progress = {'done': 0, 'total': len(set(affected_ids)), 'matched': 0, 'updated': 0}
+        try:
+            for chunk in self.dao.iter_batch_update_status(affected_ids, new_status):
+                before.extend(chunk.pop('before'))
+                after.extend(chunk.pop('after'))
+                progress = chunk
+                yield {'type': 'progress', **progress}
+        except Exception as e:
+            content = (f"更新中断: {str(e)}。已处理 {progress['done']}/{progress['total']} 条，"
+                       f"其中 {progress['updated']} 条变更已提交，其余记录未改动")
+            yield {'type': 'result', 'response': HandlerResponse(
+                type='mutation',
+                content=content,
+                need_confirm=False,
+                diff={'before': before, 'after': after} if before else None,
+                action_result=json.dumps({'affected_rows': progress['updated'], 'matched_rows': progress['matched'],
+                                          'done': progress['done'], 'total': progress['total']}),
+                error=str(e)
+            )}
+            return
+
+        count = progress['updated']
+        content = f'成功更新 {count} 条记录'
+        if len(before) > count:
+            content += f'（{len(before) - count} 条原本已是该状态）'
+        yield {'type': 'result', 'response': HandlerResponse(
+            type='mutation',
+            content=content,
+            need_confirm=False,
+            diff={'before': before, 'after': after},
+            action_result=json.dumps({'affected_rows': count, 'matched_rows': len(before)})
+        )}
+
+    async def execute_update(self, plan: Dict) -> HandlerResponse:
+        """执行更新 - Diff 确认后调用，返回最终结果"""
+        response = None
+        async for item in self.execute_update_stream(plan):
+            if item['type'] == 'result':
+                response = item['response']
+        return response
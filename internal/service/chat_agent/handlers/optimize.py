@@ -2,6 +2,9 @@
 """优化 Handler"""
 import json
 from typing import Dict, List
+
+import pandas as pd
+
 from .base import BaseHandler, HandlerResponse
 
 
@@ -23,10 +26,10 @@ class OptimizeHandler(BaseHandler):
         optimize_type = params.get('type', 'route')  # route/cost/time
 
         try:
-            # 获取全量数据用于分析
-            shipments, _ = self.dao.get_all_shipments(limit=5000)
+            # 从列式快照取最近 5000 条用于分析
+            shipments = self.dao.get_snapshot().latest(5000)
 
-            if not shipments:
+            if shipments.empty:
                 return HandlerResponse(
                     type='optimize',
                     content='没有足够的物流数据进行分析',
@@ -54,33 +57,29 @@ class OptimizeHandler(BaseHandler):
                 error=str(e)
             )
 
-    def _build_analysis_context(self, shipments: List[Dict], optimize_type: str) -> str:
-        """构建分析上下文"""
+    def _build_analysis_context(self, shipments: pd.DataFrame, optimize_type: str) -> str:
+        """构建分析上下文（在快照列上向量化聚合）"""
         if optimize_type == 'route':
-            routes = {}
-            for s in shipments:
-                key = (s.get('origin_city', ''), s.get('destination_city', ''))
-                routes[key] = routes.get(key, 0) + 1
-            top_routes = sorted(routes.items(), key=lambda x: x[1], reverse=True)[:10]
+            routes = (pd.DataFrame({
+                'origin_city': shipments['origin_city'].astype(object).fillna(''),
+                'destination_city': shipments['destination_city'].astype(object).fillna(''),
+            }).groupby(['origin_city', 'destination_city'], sort=False)
+              .size().sort_values(ascending=False, kind='stable').head(10))
             context = "热门路线统计：\n"
-            for (o, d), cnt in top_routes:
+            for (o, d), cnt in routes.items():
                 context += f"- {o} → {d}: {cnt} 单\n"
             return context
 
         elif optimize_type == 'cost':
-            companies = {}
-            for s in shipments:
-                c = s.get('courier_company', 'unknown')
-                fee = float(s.get('shipping_fee', 0) or 0)
-                if c not in companies:
-                    companies[c] = {'count': 0, 'total_fee': 0}
-                companies[c]['count'] += 1
-                companies[c]['total_fee'] += fee
+            companies = (pd.DataFrame({
+                'courier_company': shipments['courier_company'].astype(object).fillna('unknown'),
+                'shipping_fee': shipments['shipping_fee'].fillna(0),
+            }).groupby('courier_company', sort=False)['shipping_fee'].agg(['size', 'mean'])
+              .sort_values('mean', kind='stable'))
 
             context = "各快递公司费用统计：\n"
-            for c, data in sorted(companies.items(), key=lambda x: x[1]['total_fee']/max(x[1]['count'],1)):
-                avg = data['total_fee'] / max(data['count'], 1)
-                context += f"- {c}: {data['count']} 单, 平均运费 {avg:.2f} 元\n"
+            for c, data in companies.iterrows():
+                context += f"- {c}: {int(data['size'])} 单, 平均运费 {data['mean']:.2f} 元\n"
             return context
 
         else:
@@ -104,10 +103,10 @@ class OptimizeHandler(BaseHandler):
         optimize_type = params.get('type', 'route')  # route/cost/time
 
         try:
-            # 获取全量数据用于分析
-            shipments, _ = self.dao.get_all_shipments(limit=5000)
+            # 从列式快照取最近 5000 条用于分析
+            shipments = self.dao.get_snapshot().latest(5000)
 
-            if not shipments:
+            if shipments.empty:
                 yield {'type': 'text', 'content': '没有足够的物流数据进行分析'}
                 return
 
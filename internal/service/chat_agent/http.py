@@ -40,6 +40,8 @@ class ChatAgentHttp:
                          view_func=login_required(self.stream_message), methods=['POST'])
         app.add_url_rule('/api/chat/confirm', endpoint='chat_confirm',
                          view_func=login_required(self.confirm_action), methods=['POST'])
+        app.add_url_rule('/api/chat/confirm_stream', endpoint='chat_confirm_stream',
+                         view_func=login_required(self.confirm_action_stream), methods=['POST'])
 
     def page_chat(self):
         """ChatAgent 页面"""
@@ -219,6 +221,49 @@ class ChatAgentHttp:
             logger.error(f"确认操作失败: {e}")
             return error(f"操作失败: {str(e)}")
 
+    def confirm_action_stream(self):
+        """SSE 流式执行 Diff 确认后的更新，每提交一块推送一次进度"""
+        user_id = session.get('user_id')
+        username = session.get('username', '')
+        data = request.get_json()
+
+        session_id = data.get('session_id')
+        if not session_id:
+            return error('参数不完整')
+
+        messages = self.service.get_session_messages(session_id)
+        plan = self._extract_plan_from_messages(messages)
+        if not plan:
+            return error('无法找到待执行的操作')
+
+        def generate():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            gen = self.service.confirm_action_stream(user_id, username, session_id, plan)
+            try:
+                while True:
+                    try:
+                        item = loop.run_until_complete(gen.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    yield f"data: {json.dumps(item, ensure_ascii=False, default=str)}\n\n"
+            except Exception as e:
+                logger.error(f"流式执行更新异常: {e}")
+                yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            finally:
+                loop.run_until_complete(gen.aclose())
+                loop.close()
+
+        return Response(
+            generate(),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'Connection': 'keep-alive',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
     def _extract_plan_from_messages(self, messages: List[Dict]) -> Optional[Dict]:
         """从消息中提取最后一个 action_plan"""
         for msg in reversed(messages):
@@ -0,0 +1,443 @@
+# internal/service/chat_agent/intent_classifier.py
+"""本地意图快速分类
+
+很多消息一眼就能看出意图（「最近7天已送达的订单」「把最近3天运输中的改成已送达」），不必每次都调用模型。
+这里在本地完成分类与参数提取（亚毫秒级），只有置信度不够时才交给模型：
+- 规则：各意图的关键词正则
+- 模型：字符 1/2-gram 朴素贝叶斯。训练前先把实体替换成占位符（城市 -> @，状态 -> #，数字 -> 0），
+  让模型学句式而不是具体地名；首次使用时由内置样例训练并保存到 INTENT_MODEL_PATH，
+  之后模型兜底路由得到的 (消息, 意图) 会增量学习并定期落盘
+- 参数：状态词典由 STATUS_CN_MAP 加常用说法构成（映射到库里的英文状态），城市词典取自地点字典，
+  天数支持阿拉伯数字与中文数字
+
+规则与模型一致且概率达到 INTENT_RULE_CONFIDENCE，或没有规则命中但概率达到 INTENT_MODEL_CONFIDENCE 时采用本地结果；
+规则互相冲突、出现词典覆盖不了的限定词（如「延误」）、城市方向不明确、改状态却找不到目标状态时都交给模型。
+写操作只有带状态/天数筛选、且不指代上文（「这些」「它们」）时才走本地，避免生成不带条件的变更计划。
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from internal.configs.config import Config
+from internal.pkg.constants import STATUS_CN_MAP
+
+logger = logging.getLogger("LogisticsAgent")
+
+INTENTS = ('query', 'mutation', 'optimize', 'explain')
+
+# 中文说法 -> 库中状态；STATUS_CN_MAP 之外的常用说法
+STATUS_ALIASES = {
+    '送达': 'delivered', '签收': 'delivered', '已签收': 'delivered', '妥投': 'delivered',
+    '在途': 'in_transit', '运送中': 'in_transit', '运输途中': 'in_transit',
+    '派送中': 'out_for_delivery', '配送中': 'out_for_delivery', '派件': 'out_for_delivery',
+    '待发货': 'pending', '未处理': 'pending',
+    '揽收': 'picked_up', '已揽收': 'picked_up',
+    '投递失败': 'failed_delivery', '派送失败': 'failed_delivery',
+    '退回': 'returned', '退货': 'returned', '已退货': 'returned',
+}
+STATUS_WORDS = dict(STATUS_ALIASES, **{cn: en for en, cn in STATUS_CN_MAP.items()})
+_STATUS_RE = re.compile('|'.join(sorted(map(re.escape, STATUS_WORDS), key=len, reverse=True)))
+
+_RULES = {
+    'mutation': re.compile(r'改成|改为|改到|更新为|更新成|标记为|标记成|设为|设置为|置为|修改|批量更新|删除|删掉'),
+    'optimize': re.compile(r'优化|改进|降低成本|节省|省钱|提升时效|提高效率|更高效|路线规划|怎么改善|建议'),
+    'query': re.compile(r'查询|查一下|查查|查看|看看|看下|有多少|多少[条单个]|统计|列出|哪些|显示|找出|筛选|分布|最近\s*\S{1,3}天'),
+    'explain': re.compile(r'什么是|是什么|什么意思|啥意思|解释|介绍一下|怎么理解|你好|您好|谢谢|你是谁|能做什么'),
+}
+# 词典表达不了的限定词：出现时交给模型
+_UNMAPPED_RE = re.compile(r'延误|延迟|超时|逾期|最贵|最便宜|最重|最轻|金额|重量|运费|快递公司|承运商|客户|单号')
+_DELETE_RE = re.compile(r'删除|删掉')
+# 指代上文的说法：写操作的对象要靠上下文确定，交给模型
+_DEMONSTRATIVE_RE = re.compile(r'这些|那些|它们|他们|这几|那几|这批|那批|这条|那条|这个|那个|上面|上述|刚才|以上')
+# 「改成 X」里的目标状态
+_UPDATE_TARGET_RE = re.compile(r'(?:改成|改为|改到|更新为|更新成|标记为|标记成|设为|设置为|置为)\s*[「“"\']?\s*(' + _STATUS_RE.pattern + ')')
+
+_CN_DIGITS = {'零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_NUMBER = r'\d+|[零一二两三四五六七八九十百]+'
+_DAYS_RE = re.compile(r'(?:最近|近|过去|前)?\s*(' + _NUMBER + r')\s*(天|日|周|星期|个月|月)')
+_DAYS_WORDS = (('今天', 1), ('今日', 1), ('昨天', 2), ('本周', 7), ('这周', 7), ('上周', 14),
+               ('本月', 30), ('这个月', 30), ('上个月', 60), ('半个月', 15))
+_UNIT_DAYS = {'天': 1, '日': 1, '周': 7, '星期': 7, '个月': 30, '月': 30}
+
+# 城市前后的方向词
+_ORIGIN_BEFORE = ('从', '由', '自')
+_ORIGIN_AFTER = ('发出', '发往', '发到', '寄出', '寄往', '寄到', '出发', '到', '至', '→', '-')
+_DEST_BEFORE = ('到', '至', '往', '发往', '寄往', '送往', '送到', '发到', '寄到', '→', '-')
+_DEST_AFTER = ('收', '签收')
+
+# 内置训练样例（实体已按占位符书写：@ 城市，# 状态，0 数字）
+SEED_EXAMPLES = {
+    'query': [
+        '最近0天#的订单', '查一下#的物流', '@发往@的订单有多少', '有多少#的包裹', '统计最近0天的发货量',
+        '列出所有#的记录', '从@发出的快递', '发往@的订单', '哪些订单还在#', '看看今天的订单',
+        '显示最近0周的物流记录', '@到@的物流情况', '查询#订单', '本月#了多少单', '找出#的包裹',
+        '最近0个月@发出的货', '帮我查下@的订单', '#的订单列表', '现在有多少单', '各状态订单数量分布',
+        '最近0天的订单', '近0天#的订单有哪些', '过去0天#的包裹', '今天#的订单', '本周@的订单',
+        '#的订单', '@的订单', '发到@的包裹', '最近0天@到@的物流', '@发出的#的订单',
+    ],
+    'mutation': [
+        '把这些改成#', '将它们改为#', '把#的订单标记为#', '批量更新状态为#', '修改订单状态为#',
+        '把最近0天的都改成#', '这些订单设为#', '删除#的订单', '删掉最近0天的记录', '更新为#',
+        '全部标记成#', '把它们改为#', '帮我把#的改成#', '把今天的订单置为#',
+    ],
+    'optimize': [
+        '优化一下运输路线', '怎么降低物流成本', '给些提升时效的建议', '分析路线并给出优化方案', '如何节省运费',
+        '@到@的线路怎么优化', '有什么改进建议', '帮我做成本优化', '怎么提高配送效率', '集散中心布局怎么更高效',
+        '时效优化建议', '路线规划建议', '运费太高怎么办', '如何减少#',
+    ],
+    'explain': [
+        '你好', '谢谢', '你是谁', '你能做什么', '什么是#', '#是什么意思', '物流是什么', '解释一下集散中心',
+        '介绍一下你自己', '快递和物流有什么区别', '怎么理解时效', '为什么会#', '在吗', '早上好',
+        'SLA是什么意思', '你好，请问怎么用',
+    ],
+}
+
+
+def parse_number(text: str) -> Optional[int]:
+    """阿拉伯数字或中文数字（到百位）-> 整数"""
+    if text.isdigit():
+        return int(text)
+    total, current = 0, 0
+    for ch in text:
+        if ch in _CN_DIGITS:
+            current = _CN_DIGITS[ch]
+        elif ch == '十':
+            total += (current or 1) * 10
+            current = 0
+        elif ch == '百':
+            total += (current or 1) * 100
+            current = 0
+        else:
+            return None
+    return total + current or None
+
+
+def parse_days(message: str) -> Optional[int]:
+    """「最近7天」「近两周」「本月」-> 天数"""
+    match = _DAYS_RE.search(message)
+    if match:
+        number = parse_number(match.group(1))
+        if number:
+            return number * _UNIT_DAYS[match.group(2)]
+    for word, days in _DAYS_WORDS:
+        if word in message:
+            return days
+    return None
+
+
+def normalize_status(value) -> Optional[str]:
+    """中文/英文状态 -> 库中状态；无法识别时原样返回"""
+    if not value or not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value in STATUS_CN_MAP:
+        return value
+    return STATUS_WORDS.get(value, value)
+
+
+class NgramModel:
+    """字符 1/2-gram 多项式朴素贝叶斯（加一平滑），可增量训练"""
+
+    def __init__(self, data: Dict = None):
+        data = data or {}
+        self.docs: Dict[str, int] = defaultdict(int, data.get('docs', {}))
+        self.totals: Dict[str, int] = defaultdict(int, data.get('totals', {}))
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: defaultdict(int),
+            {intent: defaultdict(int, grams) for intent, grams in data.get('counts', {}).items()}
+        )
+        self.vocab = {gram for grams in self.counts.values() for gram in grams}
+
+    @staticmethod
+    def grams(text: str) -> List[str]:
+        text = re.sub(r'\s+', '', text)
+        return list(text) + [text[i:i + 2] for i in range(len(text) - 1)]
+
+    def learn(self, text: str, intent: str) -> None:
+        grams = self.grams(text)
+        self.docs[intent] += 1
+        self.totals[intent] += len(grams)
+        for gram in grams:
+            self.counts[intent][gram] += 1
+            self.vocab.add(gram)
+
+    def predict(self, text: str) -> Dict[str, float]:
+        """意图 -> 后验概率"""
+        total_docs = sum(self.docs.values())
+        if not total_docs:
+            return {}
+        grams = self.grams(text)
+        size = len(self.vocab) + 1
+        scores = {}
+        for intent, docs in self.docs.items():
+            counts, denominator = self.counts[intent], self.totals[intent] + size
+            scores[intent] = math.log(docs / total_docs) + sum(
+                math.log((counts.get(gram, 0) + 1) / denominator) for gram in grams
+            )
+        top = max(scores.values())
+        exp = {intent: math.exp(score - top) for intent, score in scores.items()}
+        norm = sum(exp.values())
+        return {intent: value / norm for intent, value in exp.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            'docs': dict(self.docs),
+            'totals': dict(self.totals),
+            'counts': {intent: dict(grams) for intent, grams in self.counts.items()},
+        }
+
+
+def train_seed_model() -> NgramModel:
+    model = NgramModel()
+    for intent, examples in SEED_EXAMPLES.items():
+        for text in examples:
+            model.learn(re.sub(_NUMBER, '0', text), intent)
+    return model
+
+
+class IntentClassifier:
+    """规则 + n-gram 模型的本地意图分类器；classify 返回 None 表示需要模型兜底"""
+
+    def __init__(self, cities: Callable[[], Iterable[str]] = None, model_path: str = None):
+        self._city_source = cities
+        self.model_path = Config.INTENT_MODEL_PATH if model_path is None else model_path
+        self._lock = threading.Lock()
+        self._model: Optional[NgramModel] = None
+        self._unsaved = 0
+        self._cities: Tuple[str, ...] = ()
+        self._city_re: Optional[re.Pattern] = None
+        self._stats = {'local': 0, 'fallback': 0, 'learned': 0}
+
+    # ---------- 模型 ----------
+
+    def _load(self) -> NgramModel:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    model = None
+                    if self.model_path and os.path.exists(self.model_path):
+                        try:
+                            with open(self.model_path, encoding='utf-8') as f:
+                                model = NgramModel(json.load(f))
+                        except (OSError, ValueError) as e:
+                            logger.warning(f"意图模型加载失败，改用内置样例重新训练: {e}")
+                    if model is None:
+                        model = train_seed_model()
+                        self._save(model)
+                    self._model = model
+        return self._model
+
+    def _save(self, model: NgramModel) -> None:
+        if not self.model_path:
+            return
+        try:
+            directory = os.path.dirname(self.model_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.model_path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(model.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp, self.model_path)
+        except OSError as e:
+            logger.warning(f"意图模型保存失败: {e}")
+
+    def learn(self, message: str, intent: str) -> None:
+        """记录模型兜底得到的意图，每 INTENT_MODEL_SAVE_EVERY 条落盘一次"""
+        if intent not in INTENTS:
+            return
+        model = self._load()
+        text = self._mask(message)[0]
+        with self._lock:
+            model.learn(text, intent)
+            self._stats['learned'] += 1
+            self._unsaved += 1
+            if self._unsaved < Config.INTENT_MODEL_SAVE_EVERY:
+                return
+            self._unsaved = 0
+            self._save(model)
+
+    def flush(self) -> None:
+        """保存尚未落盘的增量"""
+        with self._lock:
+            if self._model is not None and self._unsaved:
+                self._unsaved = 0
+                self._save(self._model)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------- 实体 ----------
+
+    def _city_pattern(self) -> Optional[re.Pattern]:
+        """城市词典正则；城市列表变化时重建"""
+        if self._city_source is None:
+            return None
+        try:
+            cities = tuple(sorted({c for c in self._city_source() if c}, key=len, reverse=True))
+        except Exception as e:
+            logger.warning(f"加载城市词典失败: {e}")
+            return self._city_re
+        if cities != self._cities:
+            self._cities = cities
+            self._city_re = re.compile('|'.join(map(re.escape, cities))) if cities else None
+        return self._city_re
+
+    def _mask(self, message: str) -> Tuple[str, List[re.Match], List[re.Match]]:
+        """实体替换为占位符，返回 (文本, 城市匹配, 状态匹配)"""
+        city_re = self._city_pattern()
+        cities = list(city_re.finditer(message)) if city_re else []
+        statuses = list(_STATUS_RE.finditer(message))
+        text = city_re.sub('@', message) if city_re else message
+        text = _STATUS_RE.sub('#', text)
+        return re.sub(_NUMBER, '0', text), cities, statuses
+
+    @staticmethod
+    def _city_side(message: str, match: re.Match) -> Optional[str]:
+        before, after = message[:match.start()].rstrip(), message[match.end():].lstrip()
+        if after.startswith(_ORIGIN_AFTER) or before.endswith(_ORIGIN_BEFORE):
+            return 'origin'
+        if before.endswith(_DEST_BEFORE) or after.startswith(_DEST_AFTER):
+            return 'destination'
+        return None
+
+    def _locations(self, message: str, cities: List[re.Match]) -> Optional[Dict[str, str]]:
+        """城市 -> origin/destination；方向不明确或重复时返回 None"""
+        found = {}
+        for match in cities:
+            side = self._city_side(message, match)
+            if side is None or side in found:
+                return None
+            found[side] = match.group()
+        return found
+
+    # ---------- 分类 ----------
+
+    def classify(self, message: str) -> Optional[Tuple[str, Dict]]:
+        """本地分类：(意图, 参数)；置信度不够时返回 None"""
+        result = self._classify(message.strip())
+        with self._lock:
+            self._stats['local' if result else 'fallback'] += 1
+        return result
+
+    def _classify(self, message: str) -> Optional[Tuple[str, Dict]]:
+        if not message:
+            return None
+        text, cities, statuses = self._mask(message)
+        fired = {intent for intent, rule in _RULES.items() if rule.search(message)}
+        # 改状态的句子里也常带查询词（「把最近7天的改成已送达」），以 mutation 为准
+        if 'mutation' in fired:
+            fired.discard('query')
+        if len(fired) > 1:
+            return None
+
+        probabilities = self._load().predict(text)
+        if not probabilities:
+            return None
+        intent = max(probabilities, key=probabilities.get)
+        confidence = probabilities[intent]
+        if fired:
+            if fired != {intent} or confidence < Config.INTENT_RULE_CONFIDENCE:
+                return None
+        elif confidence < Config.INTENT_MODEL_CONFIDENCE:
+            return None
+
+        if intent == 'explain':
+            return intent, {}
+        if intent == 'optimize':
+            return intent, self._optimize_params(message)
+        if _UNMAPPED_RE.search(message):
+            return None
+        locations = self._locations(message, cities)
+        if locations is None:
+            return None
+        if intent == 'query':
+            return self._query_params(message, statuses, locations)
+        # 写操作的筛选只支持状态与天数，带地点的交给模型
+        if locations:
+            return None
+        return self._mutation_params(message, statuses)
+
+    @staticmethod
+    def _optimize_params(message: str) -> Dict:
+        if re.search(r'成本|运费|费用|省钱|便宜', message):
+            return {'type': 'cost'}
+        if re.search(r'时效|速度|更快|准时|效率', message):
+            return {'type': 'time'}
+        return {'type': 'route'}
+
+    @staticmethod
+    def _query_params(message: str, statuses: List[re.Match],
+                      locations: Dict[str, str]) -> Optional[Tuple[str, Dict]]:
+        if len({STATUS_WORDS[m.group()] for m in statuses}) > 1:
+            return None
+        params = dict(locations)
+        if statuses:
+            params['status'] = STATUS_WORDS[statuses[0].group()]
+        days = parse_days(message)
+        if days:
+            params['days'] = days
+        return 'query', params
+
+    @staticmethod
+    def _mutation_params(message: str, statuses: List[re.Match]) -> Optional[Tuple[str, Dict]]:
+        """写操作参数；没有状态/天数筛选或指代上文时返回 None（空筛选会变成对任意记录的变更计划）"""
+        if _DEMONSTRATIVE_RE.search(message):
+            return None
+        filters = {}
+        days = parse_days(message)
+        if days:
+            filters['days'] = days
+        if _DELETE_RE.search(message):
+            conditions = [STATUS_WORDS[m.group()] for m in statuses]
+            if len(set(conditions)) > 1:
+                return None
+            if conditions:
+                filters['status'] = conditions[0]
+            if not filters:
+                return None
+            return 'mutation', {'action': 'delete', 'filters': filters}
+
+        target = _UPDATE_TARGET_RE.search(message)
+        if not target:
+            return None
+        conditions = {STATUS_WORDS[m.group()] for m in statuses if m.start() != target.start(1)}
+        if len(conditions) > 1:
+            return None
+        if conditions:
+            filters['status'] = conditions.pop()
+        if not filters:
+            return None
+        return 'mutation', {
+            'action': 'update',
+            'filters': filters,
+            'updates': {'status': STATUS_WORDS[target.group(1)]},
+        }
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier(cities: Callable[[], Iterable[str]] = None) -> IntentClassifier:
+    """获取进程级意图分类器（首次调用时创建，cities 为城市词典来源）"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier(cities)
+    return _classifier
+
+
+def close_intent_classifier() -> None:
+    """保存增量学习结果（进程退出时调用）"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is not None:
+            _classifier.flush()
+            _classifier = None
@@ -53,14 +53,14 @@ class ChatAgentService:
 
         # 保存用户消息
         user_msg_order = len(context) * 2 + 1
-        self.chat_dao.add_message(
+        self.chat_dao.queue_message(
             user_id, username, session_id,
             user_msg_order, 'user', message
         )
 
         # 保存 AI 响应
         ai_msg_order = user_msg_order + 1
-        self.chat_dao.add_message(
+        self.chat_dao.queue_message(
             user_id, username, session_id,
             ai_msg_order, 'assistant', response.content,
             action_type=response.type,
@@ -83,7 +83,7 @@ class ChatAgentService:
         # 获取上下文并保存用户消息
         context = self.get_session_messages(session_id)
         user_msg_order = len(context) * 2 + 1
-        self.chat_dao.add_message(
+        self.chat_dao.queue_message(
             user_id, username, session_id,
             user_msg_order, 'user', message
         )
@@ -111,7 +111,7 @@ class ChatAgentService:
 
             # 流结束后保存 AI 响应
             final_content = ''.join(full_content)
-            self.chat_dao.add_message(
+            self.chat_dao.queue_message(
                 user_id, username, session_id,
                 ai_msg_order, 'assistant', final_content,
                 action_type=action_type,
@@ -125,12 +125,12 @@ class ChatAgentService:
                             session_id: str, step: str, plan: Dict) -> Dict:
         """确认执行操作"""
         if step == 'intent':
-            # 意图确认 → 返回 Diff
-            result = await self.agent.execute_mutation(plan)
+            # 意图确认 → 返回 Diff（只读预览，Diff 确认后才写库）
+            result = await self.agent.preview_mutation(plan)
             # 更新最后一条 AI 消息的 diff
             return {
                 'success': True,
-                'need_diff_confirm': True,
+                'need_diff_confirm': result.error is None,
                 'diff': result.diff,
                 'affected_rows': len(plan.get('affected_ids', [])),
                 'content': result.content
@@ -138,13 +138,29 @@ class ChatAgentService:
         elif step == 'diff':
             # Diff 确认 → 执行真正更新
             result = await self.agent.execute_mutation(plan)
-            return {
-                'success': True,
-                'affected_rows': len(plan.get('affected_ids', [])),
-                'message': result.content
-            }
+            return self._mutation_result(result)
         else:
             return {
                 'success': False,
                 'message': f'未知的确认步骤: {step}'
             }
+
+    async def confirm_action_stream(self, user_id: int, username: str, session_id: str, plan: Dict):
+        """Diff 确认后流式执行更新：逐块产出 {'type': 'progress', ...}，最后产出 {'type': 'result', ...}"""
+        async for item in self.agent.execute_mutation_stream(plan):
+            if item['type'] == 'progress':
+                yield item
+            elif item['type'] == 'result':
+                yield dict(self._mutation_result(item['response']), type='result')
+
+    @staticmethod
+    def _mutation_result(result) -> Dict:
+        """执行结果 -> 接口返回；部分失败时 affected_rows 为已提交的变更数"""
+        summary = json.loads(result.action_result) if result.action_result else {}
+        return {
+            'success': result.error is None,
+            'affected_rows': summary.get('affected_rows', 0),
+            'message': result.content,
+            'diff': result.diff,
+            'error': result.error
+        }
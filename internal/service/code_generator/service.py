@@ -7,6 +7,7 @@ import builtins
 import traceback
 from typing import Dict, Any
 
+from internal.configs.config import Config
 from internal.pkg.dao import ShipmentDAO
 from internal.pkg.models.model_handler import AIModelHandler
 
@@ -24,15 +25,15 @@ class CodeGenService:
             yield {'type': 'error', 'content': '请输入问题'}
             return
 
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=1000)
-        context = self._build_code_generation_context(shipments)
+        snapshot = self.shipment_dao.get_snapshot()
+        context = self._build_code_generation_context(snapshot.to_records(snapshot.latest(5)))
 
         prompt = f"""用户问题：{question}
 
 请根据上述信息生成Python代码。只返回可运行的Python代码，不要包含任何说明文字、注释或markdown标记。代码应该能够直接在提供的沙箱环境中执行。"""
 
         # 流式获取 thinking 和 code，直接透传不处理
-        async for chunk in self.model_handler.generate_response_stream(prompt, context):
+        async for chunk in self.model_handler.generate_response_stream(prompt, context, cache_ttl=Config.LLM_CACHE_TTL_CODE):
             if chunk['type'] in ('thinking', 'text', 'error'):
                 yield chunk
 
@@ -55,6 +56,7 @@ class CodeGenService:
             safe_builtins['__import__'] = builtins.__import__
 
         try:
+            snapshot = self.shipment_dao.get_snapshot()
             import pandas as pd
             import numpy as np
             import matplotlib
@@ -76,7 +78,13 @@ class CodeGenService:
                 'datetime': datetime,
                 'timedelta': timedelta,
                 'json': json,
-                'shipments': self.shipment_dao.get_all_shipments(limit=10000)[0]
+                'shipments': snapshot.to_records(snapshot.latest(10000)),
+                # 列式副本，沙箱代码可直接向量化分析，修改不影响共享快照
+                'df': snapshot.latest(10000).copy(),
+                # 全表分批遍历（服务端游标），用于超过 10000 条的全量统计
+                'iter_shipment_frames': lambda columns=None, batch_size=50000: self.shipment_dao.iter_shipments(
+                    columns=columns, batch_size=batch_size, as_frame=True
+                )
             }
         except ImportError as e:
             return {'success': False, 'error': f'缺少必要的库: {str(e)}'}
@@ -142,6 +150,8 @@ class CodeGenService:
 - estimated_delivery: 预计送达时间
 - actual_delivery: 实际送达时间
 - weight: 重量
+- length / width / height: 长宽高（cm）
+- volumetric_weight: 体积重（长×宽×高/6000）
 - courier_company: 快递公司
 - shipping_fee: 运费
 - created_at: 创建时间
@@ -152,7 +162,8 @@ class CodeGenService:
 ## 重要说明
 - 数据已经存在于 `shipments` 变量中（类型：list of dict），不需要重新加载
 - `shipments` 变量可以直接使用，无需导入或读取
-- 代码中可以直接使用 `pd.DataFrame(shipments)` 将数据转为 DataFrame
+- 同样的数据已预先转为 DataFrame，存放在 `df` 变量中（日期列为 datetime64），优先直接使用 `df`
+- `shipments` 和 `df` 只包含最近 10000 条；需要全量统计时用 `for chunk in iter_shipment_frames(columns=['status', 'weight']): ...` 逐批（每批一个 DataFrame）累加，不要把所有批次拼接到一起
 
 ## 可用的库和函数
 - pandas (pd): 数据处理
@@ -1,13 +1,28 @@
 # pages/compare/service.py
 """物流对比页面服务层"""
 import asyncio
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 
+import numpy as np
+import pandas as pd
+
+from internal.configs.config import Config
 from internal.pkg.dao import ShipmentDAO
 from internal.pkg.models.model_handler import AIModelHandler
 
 
+def _value_counts(series: pd.Series) -> Dict[str, int]:
+    """计数分布，缺失值记为 unknown"""
+    counts = series.astype(object).fillna('unknown').value_counts(sort=False)
+    return {key: int(count) for key, count in counts.items()}
+
+
+def _distinct(series: pd.Series) -> List[str]:
+    """去重后排序的非空取值"""
+    values = series.dropna().unique()
+    return sorted(value for value in values if value)
+
+
 class CompareService:
     """物流对比服务"""
 
@@ -17,103 +32,68 @@ class CompareService:
 
     def get_compare_data(self, origin_filter: str = '', destination_filter: str = '', courier_filter: str = '', page: int = 1, pageSize: int = 20) -> Dict[str, Any]:
         """对比同一收件地址或发件地址的物流信息"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        snapshot = self.shipment_dao.get_snapshot()
 
-        if not shipments:
+        if snapshot.empty:
             return {'success': False, 'message': '没有可用的数据'}
 
+        df = snapshot.latest(10000)
+
         # 过滤
-        filtered_shipments = []
-        for shipment in shipments:
-            origin = shipment.get('origin', '')
-            destination = shipment.get('destination', '')
-            courier = shipment.get('courier_company', '')
-
-            if origin_filter and origin_filter not in origin:
-                continue
-            if destination_filter and destination_filter not in destination:
-                continue
-            if courier_filter and courier_filter not in courier:
-                continue
-
-            filtered_shipments.append(shipment)
-
-        # 按地址分组
-        address_groups = {}
-        for shipment in filtered_shipments:
-            destination = shipment.get('destination', '')
-            if destination:
-                if destination not in address_groups:
-                    address_groups[destination] = {'type': 'destination', 'shipments': []}
-                address_groups[destination]['shipments'].append(shipment)
-
-            origin = shipment.get('origin', '')
-            if origin:
-                if origin not in address_groups:
-                    address_groups[origin] = {'type': 'origin', 'shipments': []}
-                address_groups[origin]['shipments'].append(shipment)
-
-        # 过滤出有两条以上记录的地址
-        valid_groups = {addr: grp for addr, grp in address_groups.items() if len(grp['shipments']) >= 2}
-
-        # 分析
-        comparison_results = []
-        for address, group in valid_groups.items():
-            shipments_list = group['shipments']
-
-            delivery_times = []
-            for shipment in shipments_list:
-                if shipment.get('actual_delivery') and shipment.get('created_at'):
-                    try:
-                        created = datetime.fromisoformat(str(shipment['created_at']).replace('Z', '+00:00'))
-                        delivered = datetime.fromisoformat(str(shipment['actual_delivery']).replace('Z', '+00:00'))
-                        hours = (delivered - created).total_seconds() / 3600
-                        delivery_times.append(hours)
-                    except:
-                        pass
-
-            avg_delivery_time = sum(delivery_times) / len(delivery_times) if delivery_times else 0
-
-            status_counts = {}
-            for shipment in shipments_list:
-                status = shipment.get('status', 'unknown')
-                status_counts[status] = status_counts.get(status, 0) + 1
-
-            courier_counts = {}
-            for shipment in shipments_list:
-                courier = shipment.get('courier_company', 'unknown')
-                courier_counts[courier] = courier_counts.get(courier, 0) + 1
-
-            total_fee = sum(shipment.get('shipping_fee', 0) for shipment in shipments_list)
-            avg_fee = total_fee / len(shipments_list) if shipments_list else 0
-
-            comparison_results.append({
+        mask = pd.Series(True, index=df.index)
+        for column, keyword in (('origin', origin_filter), ('destination', destination_filter),
+                                ('courier_company', courier_filter)):
+            if keyword:
+                mask &= snapshot.contains(df[column], keyword)
+        filtered = df[mask]
+
+        # 按地址分组：每条物流同时计入收件地址组和发件地址组，组类型取该地址首次出现时的角色
+        n = len(filtered)
+        positions = np.arange(n)
+        long = pd.concat([
+            pd.DataFrame({'address': filtered['destination'].astype(object).values, 'type': 'destination',
+                          'row': positions, 'order': positions * 2}),
+            pd.DataFrame({'address': filtered['origin'].astype(object).values, 'type': 'origin',
+                          'row': positions, 'order': positions * 2 + 1}),
+        ], ignore_index=True)
+        long = long[long['address'].notna() & (long['address'] != '')].sort_values('order', kind='stable')
+
+        groups = long.groupby('address', sort=False).agg(type=('type', 'first'), shipment_count=('row', 'size'))
+        # 过滤出有两条以上记录的地址，按记录数倒序（同数量保持首次出现顺序）
+        groups = groups[groups['shipment_count'] >= 2].sort_values('shipment_count', ascending=False, kind='stable')
+
+        # 只为当前页的分组计算明细
+        total = len(groups)
+        start = (page - 1) * pageSize
+        end = start + pageSize
+        page_data = []
+        for address, group in groups.iloc[start:end].iterrows():
+            rows = filtered.iloc[long.loc[long['address'] == address, 'row'].values]
+
+            hours = (rows['actual_delivery'] - rows['created_at']).dt.total_seconds() / 3600
+            hours = hours.dropna()
+            fees = rows['shipping_fee'].fillna(0)
+
+            page_data.append({
                 'address': address,
                 'address_type': group['type'],
-                'shipment_count': len(shipments_list),
-                'avg_delivery_time': avg_delivery_time,
-                'status_distribution': status_counts,
-                'courier_distribution': courier_counts,
-                'avg_shipping_fee': avg_fee,
-                'shipments': shipments_list
+                'shipment_count': int(group['shipment_count']),
+                'avg_delivery_time': float(hours.mean()) if not hours.empty else 0,
+                'status_distribution': _value_counts(rows['status']),
+                'courier_distribution': _value_counts(rows['courier_company']),
+                'avg_shipping_fee': float(fees.mean()) if not fees.empty else 0,
+                'shipments': snapshot.to_records(rows)
             })
 
-        comparison_results.sort(key=lambda x: x['shipment_count'], reverse=True)
-
-        total = len(comparison_results)
-        start = (page - 1) * pageSize
-        end = start + pageSize
-        page_data = comparison_results[start:end]
-
         return {'success': True, 'data': page_data, 'total': total, 'page': page, 'pageSize': pageSize}
 
     def get_filters(self) -> Dict[str, Any]:
         """获取物流筛选过滤选项"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        df = self.shipment_dao.get_snapshot().latest(10000)
 
-        origins = sorted(list(set(s.get('origin', '') for s in shipments if s.get('origin'))))
-        destinations = sorted(list(set(s.get('destination', '') for s in shipments if s.get('destination'))))
-        couriers = sorted(list(set(s.get('courier_company', '') for s in shipments if s.get('courier_company'))))
+        origins = _distinct(df['origin'])
+        destinations = _distinct(df['destination'])
+        couriers = _distinct(df['courier_company'])
 
         return {'success': True, 'origins': origins, 'destinations': destinations, 'couriers': couriers}
 
@@ -137,7 +117,7 @@ class CompareService:
         分析要具体、可操作，基于实际物流运营场景。
         """
 
-        async for chunk in self.model_handler.generate_response_stream(prompt, ""):
+        async for chunk in self.model_handler.generate_response_stream(prompt, "", cache_ttl=Config.LLM_CACHE_TTL_REPORT):
             if chunk['type'] in ('thinking', 'text', 'error'):
                 yield chunk
 
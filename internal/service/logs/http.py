@@ -28,6 +28,24 @@ class LogsHttp:
             view_func=login_required(admin_required(self.get_logs)),
             methods=['GET']
         )
+        app.add_url_rule(
+            '/api/logs/pipeline',
+            endpoint='api_logs_pipeline',
+            view_func=login_required(admin_required(self.get_pipeline_stats)),
+            methods=['GET']
+        )
+        app.add_url_rule(
+            '/api/logs/llm_cache',
+            endpoint='api_logs_llm_cache',
+            view_func=login_required(admin_required(self.get_llm_cache_stats)),
+            methods=['GET']
+        )
+        app.add_url_rule(
+            '/api/logs/retention',
+            endpoint='api_logs_retention',
+            view_func=login_required(admin_required(self.run_retention)),
+            methods=['POST']
+        )
 
     def page_logs(self):
         """日志页面"""
@@ -37,4 +55,22 @@ class LogsHttp:
         """获取日志列表"""
         limit = request.args.get('limit', 100, type=int)
         logs = self.service.get_all_logs(limit)
-        return success(data={'logs': logs})
\ No newline at end of file
+        return success(data={'logs': logs})
+
+    def get_pipeline_stats(self):
+        """操作日志写入管道统计"""
+        return success(data={'stats': self.service.get_pipeline_stats()})
+
+    def get_llm_cache_stats(self):
+        """模型响应缓存与报告生成合并统计"""
+        return success(data={
+            'stats': self.service.get_llm_cache_stats(),
+            'streams': self.service.get_stream_stats(),
+        })
+
+    def run_retention(self):
+        """立即执行一次日志保留策略"""
+        try:
+            return success(data=self.service.run_retention())
+        except Exception as e:
+            return error(f"执行失败: {str(e)}")
\ No newline at end of file
@@ -1,8 +1,10 @@
 # pages/logs/service.py
 """日志页面服务层"""
-from typing import List, Dict
+from typing import Any, List, Dict
 
-from internal.pkg.dao import LogDAO
+from internal.pkg.dao import LogDAO, run_retention
+from internal.pkg.models.response_cache import get_response_cache
+from internal.pkg.models.stream_broker import get_stream_broker
 
 
 class LogService:
@@ -14,3 +16,19 @@ class LogService:
     def get_all_logs(self, limit: int = 100) -> List[Dict]:
         """获取所有操作日志"""
         return self.log_dao.get_all_logs(limit)
+
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """操作日志写入管道统计"""
+        return self.log_dao.get_pipeline_stats()
+
+    def get_llm_cache_stats(self) -> Dict[str, Any]:
+        """模型响应缓存命中统计"""
+        return get_response_cache().stats()
+
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """日报 / 分析报告生成合并统计"""
+        return get_stream_broker().stats()
+
+    def run_retention(self) -> Dict[str, Any]:
+        """立即执行一次分区维护与归档清理"""
+        return run_retention()
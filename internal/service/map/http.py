@@ -29,23 +29,8 @@ class MapHttp:
         city = request.args.get('city', '')  # 默认全部城市
         # 前端传入的 limit 优先，否则使用配置的默认值
         limit = request.args.get('limit', type=int) or Config.MAP_SHIPMENT_LIMIT
-        shipments, _ = self.shipment_service.get_shipments(limit=1000)
-        # 如果选择了城市，则过滤与该城市相关的物流（起点或终点）
-        if city:
-            filtered = [s for s in shipments if s.get('origin_city') == city or s.get('destination_city') == city]
-        else:
-            filtered = shipments
-        # 限制条数
-        filtered = filtered[:limit]
-        data = [{
-            'id': s.get('id'),
-            'origin': s.get('origin'),
-            'origin_city': s.get('origin_city'),
-            'destination': s.get('destination'),
-            'destination_city': s.get('destination_city'),
-            'status': s.get('status'),
-            'courier_company': s.get('courier_company'),
-        } for s in filtered]
+        # 如果选择了城市，则只保留与该城市相关的物流（起点或终点）
+        data = self.shipment_service.get_map_shipments(city, limit)
         return success(data={'data': data})
 
     def get_cities(self):
@@ -3,6 +3,8 @@
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
+import pandas as pd
+
 from internal.pkg.dao import ShipmentDAO
 
 
@@ -14,9 +16,9 @@ class DashboardService:
 
     def get_trend_data(self, granularity: str = 'realtime') -> Dict[str, Any]:
         """获取趋势数据"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        shipment_count = len(self.shipment_dao.get_snapshot().latest(10000))
 
-        if not shipments:
+        if not shipment_count:
             return {'success': False, 'message': '没有可用的数据'}
 
         trend_data = []
@@ -34,7 +36,7 @@ class DashboardService:
 
         for i in range(points):
             time = now - timedelta(seconds=i * interval)
-            base_value = len(shipments) // 100
+            base_value = shipment_count // 100
             random_factor = (hash(str(time)) % 100) / 100
             value = base_value + int(random_factor * 100)
 
@@ -50,28 +52,17 @@ class DashboardService:
 
     def get_metrics(self) -> Dict[str, Any]:
         """获取指标数据"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        total = self.shipment_dao.count_shipments()
 
-        if not shipments:
+        if not total:
             return {'success': False, 'message': '没有可用的数据'}
 
-        total = len(shipments)
-        delivered = sum(1 for s in shipments if s.get('status') == 'delivered')
-        in_transit = sum(1 for s in shipments if s.get('status') == 'in_transit')
+        # 状态计数与平均时效直接读日汇总表
+        summary = self.shipment_dao.get_rollup_summary()
+        delivered = summary['status_counts'].get('delivered', 0)
+        in_transit = summary['status_counts'].get('in_transit', 0)
         delivery_rate = (delivered / total * 100) if total > 0 else 0
-
-        delivery_times = []
-        for s in shipments:
-            if s.get('actual_delivery') and s.get('created_at'):
-                try:
-                    created = datetime.fromisoformat(str(s['created_at']).replace('Z', '+00:00'))
-                    delivered_time = datetime.fromisoformat(str(s['actual_delivery']).replace('Z', '+00:00'))
-                    hours = (delivered_time - created).total_seconds() / 3600
-                    delivery_times.append(hours)
-                except:
-                    pass
-
-        avg_delivery_time = sum(delivery_times) / len(delivery_times) if delivery_times else 0
+        avg_delivery_time = summary['avg_delivery_hours']
 
         warehouse_efficiency = 75 + (hash(str(datetime.now())) % 20)
         exception_rate = 5 + (hash(str(datetime.now())) % 10)
@@ -92,9 +83,9 @@ class DashboardService:
 
     def get_table_data(self, page: int = 1, pageSize: int = 10, status_filter: str = 'all', search: str = '', sortField: str = 'time', sortDirection: str = 'desc') -> Dict[str, Any]:
         """获取表格数据"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
+        snapshot = self.shipment_dao.get_snapshot()
 
-        if not shipments:
+        if snapshot.empty:
             return {'success': False, 'message': '没有可用的数据'}
 
         status_map = {
@@ -103,36 +94,32 @@ class DashboardService:
             'failed_delivery': '配送失败', 'returned': '已退回'
         }
 
-        table_data = []
-        for s in shipments:
-            status_cn = status_map.get(s.get('status'), s.get('status', '未知'))
-            table_data.append({
-                'orderId': s.get('id', ''),
-                'company': s.get('courier_company', '未知'),
-                'status': status_cn,
-                'origin': s.get('origin_city', s.get('origin', '未知')),
-                'destination': s.get('destination_city', s.get('destination', '未知')),
-                'time': s.get('created_at', ''),
-                'value': str(s.get('shipping_fee', 0))
-            })
+        df = snapshot.latest(10000)
+        status = df['status'].astype(object)
+        table = pd.DataFrame({
+            'orderId': df['id'].fillna(''),
+            'company': df['courier_company'].astype(object),
+            'status': status.map(status_map).fillna(status).fillna('未知'),
+            'origin': df['origin_city'].astype(object),
+            'destination': df['destination_city'].astype(object),
+            'time': df['created_at'],
+            'value': df['shipping_fee'].fillna(0).astype(str)
+        })
 
         if status_filter != 'all':
-            table_data = [d for d in table_data if d['status'] == status_filter]
+            table = table[table['status'] == status_filter]
 
         if search:
             search_lower = search.lower()
-            table_data = [d for d in table_data
-                         if search_lower in d['orderId'].lower() or search_lower in d['company'].lower()]
+            table = table[table['orderId'].str.lower().str.contains(search_lower, regex=False)
+                          | table['company'].str.lower().str.contains(search_lower, regex=False, na=False)]
 
-        reverse = sortDirection == 'desc'
-        try:
-            table_data.sort(key=lambda x: x.get(sortField, ''), reverse=reverse)
-        except:
-            pass
+        if sortField in table.columns:
+            table = table.sort_values(sortField, ascending=sortDirection != 'desc', kind='stable')
 
-        total = len(table_data)
+        total = len(table)
         start = (page - 1) * pageSize
         end = start + pageSize
-        page_data = table_data[start:end]
+        page_data = snapshot.to_records(table.iloc[start:end])
 
         return {'success': True, 'data': page_data, 'total': total, 'page': page, 'pageSize': pageSize}
@@ -1,6 +1,5 @@
 # pages/report/http.py
 """报告页面 HTTP 处理器"""
-import asyncio
 import json
 import logging
 from flask import request, render_template, Response, session
@@ -40,60 +39,35 @@ class ReportHttp:
         def generate():
             yield f"data: {json.dumps({'type': 'start'})}\n\n"
 
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
+            # 并发请求共享同一次生成：先收到已生成的部分，再实时跟随后续片段
+            full_content = None
             try:
-                async def stream_result():
-                    async for item in self.service.generate_report_stream_with_format():
-                        if item['type'] == 'thinking':
-                            yield f"data: {json.dumps({'type': 'thinking', 'content': item['content']})}\n\n"
-                        elif item['type'] == 'text':
-                            yield f"data: {json.dumps({'type': 'text', 'content': item['content']})}\n\n"
-                        elif item['type'] == 'done':
-                            yield f"data: {json.dumps({'type': 'done', 'content': item['content']})}\n\n"
-                            yield f"data: {json.dumps({'type': 'end'})}\n\n"
-                            return
-                        elif item['type'] == 'error':
-                            yield f"data: {json.dumps({'type': 'error', 'content': item['content']})}\n\n"
+                for item in self.service.subscribe_report_stream():
+                    if item['type'] in ('thinking', 'text', 'error'):
+                        yield f"data: {json.dumps({'type': item['type'], 'content': item['content']})}\n\n"
+                    elif item['type'] == 'done':
+                        full_content = item['content']
+                        yield f"data: {json.dumps({'type': 'done', 'content': item['content']})}\n\n"
+                        yield f"data: {json.dumps({'type': 'end'})}\n\n"
+                        break
+            except Exception as e:
+                logger.error(f"流式生成日报异常: {e}")
+                yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
 
-                gen = stream_result()
-                full_content = None
+            # 流结束后，保存到对话历史
+            if full_content:
                 try:
-                    while True:
-                        try:
-                            chunk = loop.run_until_complete(gen.__anext__())
-                            # 捕获 done 类型的内容用于后续入库
-                            if full_content is None and 'done' in chunk:
-                                try:
-                                    data = json.loads(chunk.split('data: ')[1].split('\n')[0])
-                                    if data.get('type') == 'done':
-                                        full_content = data.get('content', '')
-                                except:
-                                    pass
-                            yield chunk
-                        except StopAsyncIteration:
-                            break
+                    self.chat_dao.create_chat(
+                        user_id=user_id,
+                        username=username,
+                        page='report',
+                        title='日报中心 - ' + self.service.shipment_dao.get_daily_stats().get('date', '未知'),
+                        user_input='生成日报',
+                        ai_response=full_content
+                    )
+                    logger.info(f"日报已自动保存到对话历史, user_id={user_id}")
                 except Exception as e:
-                    logger.error(f"流式生成日报异常: {e}")
-                    yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
-
-                # 流结束后，保存到对话历史
-                if full_content:
-                    try:
-                        self.chat_dao.create_chat(
-                            user_id=user_id,
-                            username=username,
-                            page='report',
-                            title='日报中心 - ' + self.service.shipment_dao.get_daily_stats().get('date', '未知'),
-                            user_input='生成日报',
-                            ai_response=full_content
-                        )
-                        logger.info(f"日报已自动保存到对话历史, user_id={user_id}")
-                    except Exception as e:
-                        logger.error(f"保存日报到对话历史失败: {e}")
-            finally:
-                loop.close()
+                    logger.error(f"保存日报到对话历史失败: {e}")
 
         return Response(
             generate(),
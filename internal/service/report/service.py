@@ -1,10 +1,13 @@
 # pages/report/service.py
 """报告页面服务层"""
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
+from internal.configs.config import Config
 from internal.pkg.dao import ShipmentDAO
+from internal.pkg.dao.generation import current_generation
 from internal.pkg.models.model_handler import AIModelHandler
+from internal.pkg.models.stream_broker import get_stream_broker
 from internal.pkg.utils import format_ai_response
 
 
@@ -15,11 +18,13 @@ class ReportService:
         self.shipment_dao = ShipmentDAO()
         self.model_handler = AIModelHandler()
 
+    def subscribe_report_stream(self) -> Iterator[Dict[str, Any]]:
+        """订阅日报生成：同一数据代际的并发请求共享一次生成，完成后的结果在保留期内直接重放"""
+        return get_stream_broker().subscribe(('report', current_generation()), self.generate_report_stream_with_format)
+
     async def generate_report_stream_with_format(self):
         """流式生成日报，返回格式化后的HTML"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
-
-        if not shipments:
+        if self.shipment_dao.get_snapshot().empty:
             yield {'type': 'error', 'content': '没有可分析的数据，请先上传CSV文件'}
             return
 
@@ -41,7 +46,7 @@ E. 行动清单（≤5条，明确"责任岗位+完成时限"）
 """
 
         full_content = ""
-        async for chunk in self.model_handler.generate_response_stream(prompt, ""):
+        async for chunk in self.model_handler.generate_response_stream(prompt, "", cache_ttl=Config.LLM_CACHE_TTL_REPORT):
             if chunk['type'] in ('thinking', 'text', 'error'):
                 yield chunk
                 if chunk['type'] == 'text':
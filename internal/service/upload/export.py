@@ -0,0 +1,120 @@
+# pages/upload/export.py
+"""物流数据流式导出编码
+
+每批数据（DataFrame）编码后立即产出字节块，服务端内存只与批大小有关。
+"""
+import io
+import zlib
+from typing import Iterable, Iterator, List
+
+import pandas as pd
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# 导出时转为 ISO 字符串的日期列
+_DATE_COLUMNS = ('estimated_delivery', 'actual_delivery', 'created_at', 'created_date')
+_FLOAT_COLUMNS = ('weight', 'length', 'width', 'height', 'volumetric_weight', 'shipping_fee')
+
+
+def _stringify_dates(df: pd.DataFrame) -> pd.DataFrame:
+    for column in _DATE_COLUMNS:
+        if column in df:
+            series = df[column]
+            df[column] = series.astype(str).where(series.notna(), None)
+    return df
+
+
+def iter_ndjson(frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """每行一个 JSON 对象"""
+    for df in frames:
+        text = _stringify_dates(df).to_json(orient='records', lines=True, force_ascii=False)
+        if not text.endswith('\n'):
+            text += '\n'
+        yield text.encode('utf-8')
+
+
+def iter_csv(frames: Iterable[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+    """带表头的 CSV（UTF-8 BOM，Excel 可直接打开）；没有数据时只输出表头"""
+    first = True
+    for df in frames:
+        text = df.to_csv(index=False, header=first, lineterminator='\n')
+        yield (('\ufeff' if first else '') + text).encode('utf-8')
+        first = False
+    if first:
+        yield ('\ufeff' + ','.join(columns) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 的写入目标：收集写入的字节，由生成器按批取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(columns: List[str]):
+    import pyarrow as pa
+
+    def arrow_type(column: str):
+        if column in ('estimated_delivery', 'actual_delivery', 'created_date'):
+            return pa.date32()
+        if column == 'created_at':
+            return pa.timestamp('s')
+        if column in _FLOAT_COLUMNS:
+            return pa.float64()
+        if column == 'row_hash':
+            return pa.uint64()
+        return pa.string()
+
+    return pa.schema([(column, arrow_type(column)) for column in columns])
+
+
+def iter_parquet(frames: Iterable[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+    """每批写为一个 row group；显式指定 schema，避免某批整列为空时类型推断不一致"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """增量 gzip 压缩"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,7 +1,8 @@
 # pages/upload/http.py
 """上传页面 HTTP 处理器"""
-from flask import request, session, render_template
+from flask import Response, request, session, render_template, stream_with_context
 
+from internal.service.upload.export import EXPORT_FORMATS, gzip_stream
 from internal.service.upload.service import ShipmentService
 from internal.pkg.response import success, error
 from internal.middleware import login_required
@@ -22,17 +23,28 @@ class UploadHttp:
         app.add_url_rule('/delete_csv', endpoint='delete_csv', view_func=login_required(self.delete_csv), methods=['POST'])
         app.add_url_rule('/shipments', endpoint='get_shipments', view_func=self.get_shipments, methods=['GET'])
         app.add_url_rule('/shipment/<shipment_id>', endpoint='get_shipment', view_func=self.get_shipment, methods=['GET'])
+        app.add_url_rule('/api/shipments/export', endpoint='export_shipments', view_func=login_required(self.export_shipments), methods=['GET'])
 
     def page_upload(self):
         """上传页面"""
         return render_template('upload.html')
 
     def get_shipments(self):
-        """获取物流列表"""
+        """获取物流列表
+
+        传入 cursor 参数（首页传空串）时使用游标分页，返回 next_cursor；否则沿用页码分页
+        """
         page = request.args.get('page', 1, type=int)
         pageSize = request.args.get('pageSize', 10, type=int)
         limit = request.args.get('limit', None, type=int)
 
+        if 'cursor' in request.args:
+            try:
+                shipments, next_cursor, total = self.service.get_shipments_page(request.args.get('cursor'), pageSize)
+            except ValueError as e:
+                return error(str(e))
+            return success(data={'data': shipments, 'total': total, 'pageSize': pageSize, 'next_cursor': next_cursor})
+
         if limit is not None:
             shipments = self.service.get_shipments(limit=limit)
             if isinstance(shipments, tuple):
@@ -42,6 +54,43 @@ class UploadHttp:
         shipments, total = self.service.get_shipments(page=page, pageSize=pageSize)
         return success(data={'data': shipments, 'total': total, 'page': page, 'pageSize': pageSize})
 
+    def export_shipments(self):
+        """流式导出物流数据
+
+        format: ndjson（默认）/ csv / parquet；筛选参数与 Agent 查询一致：status、days、origin、destination；
+        columns 为逗号分隔的列名。客户端支持 gzip 时 ndjson/csv 以 gzip 分块传输
+        """
+        fmt = request.args.get('format', 'ndjson').lower()
+        filters = {key: request.args.get(key) for key in ('status', 'days', 'origin', 'destination')
+                   if request.args.get(key)}
+        if 'days' in filters and not filters['days'].isdigit():
+            return error('days 必须为正整数')
+        columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()] or None
+
+        try:
+            chunks = self.service.export_shipments(
+                fmt, filters, columns,
+                user_id=session.get('user_id'),
+                username=session.get('username'),
+                ip_address=request.remote_addr
+            )
+        except ValueError as e:
+            return error(str(e))
+
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        headers = {
+            'Content-Disposition': f'attachment; filename=shipments.{extension}',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Vary': 'Accept-Encoding',
+        }
+        # parquet 自带列压缩，不再 gzip
+        if fmt != 'parquet' and 'gzip' in request.accept_encodings:
+            chunks = gzip_stream(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
     def get_shipment(self, shipment_id):
         """获取单个物流详情"""
         shipment, events = self.service.get_shipment_by_id(shipment_id)
@@ -61,19 +110,29 @@ class UploadHttp:
         if not file.filename.lower().endswith('.csv'):
             return error('只支持CSV文件')
 
-        file_bytes = file.read()
+        # 导入模式：swap/replace 全量替换，append/merge 增量
+        mode = request.form.get('mode') or None
+        tombstone_missing = request.form.get('tombstone') in ('1', 'true', 'on')
+
         user_id = session.get('user_id')
         username = session.get('username')
 
+        # 直接传入上传流，按块读取，避免整文件读入内存
         result = self.service.import_csv(
-            file_bytes,
+            file.stream,
             user_id=user_id,
             username=username,
-            ip_address=request.remote_addr
+            ip_address=request.remote_addr,
+            mode=mode,
+            tombstone_missing=tombstone_missing
         )
 
         if result.get('success'):
-            return success(message=result.get('message'), data={'count': result.get('count')})
+            data = {'count': result.get('count')}
+            for key in ('inserted', 'updated', 'unchanged', 'deleted'):
+                if key in result:
+                    data[key] = result[key]
+            return success(message=result.get('message'), data=data)
         else:
             return error(result.get('message'))
 
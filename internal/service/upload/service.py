@@ -1,8 +1,14 @@
 # pages/upload/service.py
 """上传页面服务层"""
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Tuple, Union, BinaryIO
 
 from internal.pkg.dao import ShipmentDAO, LogDAO
+from internal.pkg.dao.dao import STREAM_COLUMNS
+from internal.service.upload.export import EXPORT_FORMATS, iter_ndjson, iter_csv, iter_parquet
+
+
+# 默认导出列（不含内部使用的 row_hash）
+EXPORT_COLUMNS = [c for c in STREAM_COLUMNS if c != 'row_hash']
 
 
 class ShipmentService:
@@ -12,17 +18,22 @@ class ShipmentService:
         self.shipment_dao = ShipmentDAO()
         self.log_dao = LogDAO()
 
-    def import_csv(self, file_bytes: bytes, user_id: int = None, username: str = None, ip_address: str = None) -> Dict[str, Any]:
-        """导入 CSV 数据"""
-        result = self.shipment_dao.import_from_csv_bytes(file_bytes)
+    def import_csv(self, source: Union[bytes, BinaryIO], user_id: int = None, username: str = None, ip_address: str = None,
+                   mode: str = None, tombstone_missing: bool = False) -> Dict[str, Any]:
+        """导入 CSV 数据（字节或文件流），mode 见 ShipmentDAO.import_from_csv"""
+        result = self.shipment_dao.import_from_csv(source, mode=mode, tombstone_missing=tombstone_missing)
 
         if result.get('success') and user_id:
-            count = result.get('count', 0)
+            if 'inserted' in result:
+                detail = (f"增量上传CSV文件（{mode}），新增{result['inserted']}条，更新{result['updated']}条，"
+                          f"未变化{result['unchanged']}条，删除{result['deleted']}条")
+            else:
+                detail = f"上传CSV文件，导入{result.get('count', 0)}条记录"
             self.log_dao.add_log(
                 user_id,
                 username or '',
                 '数据上传',
-                f'上传CSV文件，导入{count}条记录',
+                detail,
                 ip_address or ''
             )
 
@@ -50,6 +61,44 @@ class ShipmentService:
         """获取物流列表"""
         return self.shipment_dao.get_all_shipments(limit, page, pageSize)
 
+    def export_shipments(self, fmt: str, filters: Dict[str, Any] = None, columns: List[str] = None,
+                         user_id: int = None, username: str = None, ip_address: str = None) -> Iterator[bytes]:
+        """按格式流式导出物流数据，返回字节块生成器
+
+        参数错误（格式、列名、缺少 pyarrow）在返回前抛出 ValueError，不会在响应开始后才失败
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        columns = list(columns or EXPORT_COLUMNS)
+        unknown = [c for c in columns if c not in STREAM_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的列: {', '.join(unknown)}")
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("导出 parquet 需要安装 pyarrow")
+
+        if user_id:
+            self.log_dao.add_log(
+                user_id,
+                username or '',
+                '数据导出',
+                f"导出物流数据（{fmt}），筛选条件: {filters or {}}",
+                ip_address or ''
+            )
+
+        frames = self.shipment_dao.iter_shipments(filters, columns, as_frame=True)
+        if fmt == 'ndjson':
+            return iter_ndjson(frames)
+        if fmt == 'csv':
+            return iter_csv(frames, columns)
+        return iter_parquet(frames, columns)
+
+    def get_shipments_page(self, cursor: str = None, page_size: int = 20) -> Tuple[List[Dict], Optional[str], int]:
+        """游标分页获取物流列表"""
+        return self.shipment_dao.get_shipments_page(cursor or None, page_size)
+
     def get_shipment_by_id(self, shipment_id: str) -> Tuple[Dict, List[Dict]]:
         """获取单个物流详情"""
         shipment = self.shipment_dao.get_shipment_by_id(shipment_id)
@@ -61,11 +110,15 @@ class ShipmentService:
 
     def get_cities(self) -> List[str]:
         """获取所有城市列表"""
-        shipments, _ = self.shipment_dao.get_all_shipments(limit=10000)
-        cities = set()
-        for s in shipments:
-            if s.get('origin_city'):
-                cities.add(s.get('origin_city'))
-            if s.get('destination_city'):
-                cities.add(s.get('destination_city'))
-        return sorted(list(cities))
\ No newline at end of file
+        df = self.shipment_dao.get_snapshot().latest(10000)
+        cities = set(df['origin_city'].dropna().unique()) | set(df['destination_city'].dropna().unique())
+        return sorted(city for city in cities if city)
+
+    def get_map_shipments(self, city: str = '', limit: int = 100) -> List[Dict]:
+        """地图展示用的物流数据：最近 1000 条中与城市相关（起点或终点）的前 limit 条"""
+        snapshot = self.shipment_dao.get_snapshot()
+        df = snapshot.latest(1000)
+        if city:
+            df = df[(df['origin_city'] == city) | (df['destination_city'] == city)]
+        columns = ['id', 'origin', 'origin_city', 'destination', 'destination_city', 'status', 'courier_company']
+        return snapshot.to_records(df.iloc[:limit], columns)
\ No newline at end of file
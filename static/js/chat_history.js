@@ -205,7 +205,7 @@ class ChatHistoryManager {
                     <button class="chat-item-delete" data-id="${chat.id}" title="删除">&#128465;</button>
                 </div>
                 <div class="chat-item-title">${this.escapeHtml(chat.title || '无标题')}</div>
-                <div class="chat-item-preview">${this.escapeHtml(chat.user_input || '')}</div>
+                <div class="chat-item-preview">${chat.snippet || this.escapeHtml(chat.user_input || '')}</div>
                 <div class="chat-item-time">${this.formatTime(chat.created_at)}</div>
             </div>
         `).join('');
@@ -20,6 +20,10 @@ $(function(){
             $('#uploadResult').html('<div class="success">已选择文件: ' + fileName + '，正在上传...</div>');
             var formData = new FormData();
             formData.append('file', this.files[0]);
+            formData.append('mode', $('#importMode').val());
+            if ($('#importMode').val() && $('#importTombstone').is(':checked')) {
+                formData.append('tombstone', '1');
+            }
             $.ajax({
                 url: '/upload',
                 type: 'POST',
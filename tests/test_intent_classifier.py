@@ -0,0 +1,78 @@
+"""本地意图分类器"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from internal.service.chat_agent.intent_classifier import (
+    IntentClassifier, normalize_status, parse_days, parse_number
+)
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier(lambda: ['北京', '上海', '广州'], model_path='')
+
+
+def test_parse_helpers():
+    assert parse_number('7') == 7
+    assert parse_number('二十三') == 23
+    assert parse_number('天') is None
+    assert parse_days('最近7天') == 7
+    assert parse_days('近两周') == 14
+    assert parse_days('所有订单') is None
+
+
+def test_normalize_status():
+    assert normalize_status('已送达') == 'delivered'
+    assert normalize_status('delivered') == 'delivered'
+    assert normalize_status(' 运输中 ') == 'in_transit'
+    assert normalize_status(None) is None
+
+
+def test_local_query_hits(classifier):
+    assert classifier.classify('最近7天已送达的订单') == ('query', {'status': 'delivered', 'days': 7})
+    assert classifier.classify('从北京发往上海的订单') == (
+        'query', {'origin': '北京', 'destination': '上海'})
+
+
+def test_local_mutation_normalizes_status(classifier):
+    assert classifier.classify('把最近三天运输中的订单改为已送达') == ('mutation', {
+        'action': 'update',
+        'filters': {'days': 3, 'status': 'in_transit'},
+        'updates': {'status': 'delivered'},
+    })
+
+
+def test_local_explain_and_optimize(classifier):
+    assert classifier.classify('你好') == ('explain', {})
+    assert classifier.classify('怎么降低物流成本') == ('optimize', {'type': 'cost'})
+
+
+@pytest.mark.parametrize('message', [
+    '',
+    '今天天气怎么样',
+    '上海的订单',              # 城市方向不明确
+    '把这些改成已送达',        # 指代前文，需要上下文
+    '把订单改为已送达',        # 没有筛选条件，不能本地直接改
+])
+def test_falls_back_to_model(classifier, message):
+    assert classifier.classify(message) is None
+
+
+def test_stats_count_local_and_fallback(classifier):
+    classifier.classify('你好')
+    classifier.classify('今天天气怎么样')
+    assert classifier.stats() == {'local': 1, 'fallback': 1, 'learned': 0}
+
+
+def test_learn_persists_model(tmp_path):
+    path = str(tmp_path / 'intent.json')
+    classifier = IntentClassifier(model_path=path)
+    classifier.learn('随便聊聊', 'explain')
+    classifier.learn('随便聊聊', 'unknown')
+    classifier.flush()
+    assert classifier.stats()['learned'] == 1
+    assert os.path.exists(path)
@@ -0,0 +1,68 @@
+"""SSE 增量解析"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from internal.pkg.models.llm_client import iter_sse_data
+
+
+async def _lines(lines):
+    for line in lines:
+        yield line
+
+
+def _parse(lines):
+    async def collect():
+        return [data async for data in iter_sse_data(_lines(lines))]
+    return asyncio.run(collect())
+
+
+def test_events_split_on_blank_lines():
+    assert _parse(['data: {"a": 1}', '', 'data: {"b": 2}', '']) == ['{"a": 1}', '{"b": 2}']
+
+
+def test_multiline_data_joined_with_newline():
+    assert _parse(['data: first', 'data: second', '']) == ['first\nsecond']
+
+
+def test_comments_and_other_fields_ignored():
+    lines = [': keep-alive', 'event: message', 'id: 7', 'data: payload', 'retry: 100', '']
+    assert _parse(lines) == ['payload']
+
+
+def test_done_marker_and_crlf():
+    # [DONE] 原样产出，由调用方跳过；行尾 \r 去掉
+    assert _parse(['data: x\r', '\r', 'data: [DONE]', '']) == ['x', '[DONE]']
+
+
+def test_trailing_event_without_blank_line():
+    assert _parse(['data:no-space']) == ['no-space']
+
+
+def test_pump_skips_done_and_invalid_json():
+    from internal.pkg.models.llm_client import LLMClient
+
+    class Response:
+        is_error = False
+
+        async def aiter_lines(self):
+            for line in ['data: {"type": "ping"}', '', 'data: not json', '', 'data: [DONE]', '']:
+                yield line
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Client:
+        def stream(self, *args, **kwargs):
+            return Response()
+
+    client = LLMClient()
+    client._client = Client()
+    emitted = []
+    asyncio.run(client._pump('url', {}, {}, lambda kind, value=None: emitted.append((kind, value))))
+    assert emitted == [('event', {'type': 'ping'}), ('done', None)]
@@ -0,0 +1,121 @@
+"""地址拆分与地点字典改写"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from internal.pkg.dao.location import (
+    LOCATION_COLUMNS, LocationIndex, normalize_city, parse_location, split_locations
+)
+
+
+def test_normalize_city_strips_suffix():
+    assert normalize_city('北京市') == '北京'
+    assert normalize_city(' 上海 ') == '上海'
+    # 两个字的「X市」不去后缀
+    assert normalize_city('沙市') == '沙市'
+
+
+def test_parse_location_with_city_column():
+    assert parse_location('北京朝阳区分拨中心', '北京市') == ('北京', '朝阳区', '分拨中心')
+    assert parse_location('上海浦东新区', '上海') == ('上海', '浦东新区', '')
+
+
+def test_parse_location_uses_known_cities():
+    # 没有城市列时按已知城市匹配地址开头，取最长的
+    assert parse_location('呼和浩特新城区网点', None, ['呼和', '呼和浩特']) == ('呼和浩特', '新城区', '网点')
+
+
+def test_parse_location_falls_back_to_city_suffix():
+    assert parse_location('杭州市西湖区文三路') == ('杭州', '西湖区', '文三路')
+
+
+def _index(max_in=500):
+    return LocationIndex({
+        'origin': [
+            ('北京', '朝阳区', '分拨中心'),
+            ('北京', '海淀区', '中关村'),
+            ('上海', '浦东新区', ''),
+            ('上海', '徐汇区', '漕河泾'),
+        ],
+    }, generation=1, max_in=max_in)
+
+
+def test_resolve_whole_city():
+    clause, params = _index().resolve('origin', '北京')
+    assert clause == '(origin_city IN (%s))'
+    assert params == ['北京']
+
+
+def test_resolve_partial_tuple():
+    clause, params = _index().resolve('origin', '浦东')
+    assert clause == '((origin_city, origin_district, origin_hub) IN ((%s,%s,%s)))'
+    assert params == ['上海', '浦东新区', '']
+
+
+def test_resolve_whole_city_and_tuple_combined():
+    index = LocationIndex({'origin': [('北京', '朝阳区', '中心'), ('上海', '浦东新区', '中心'), ('上海', '徐汇区', '')]}, 1)
+    clause, params = index.resolve('origin', '中心')
+    assert clause == '(origin_city IN (%s) OR (origin_city, origin_district, origin_hub) IN ((%s,%s,%s)))'
+    assert params == ['北京', '上海', '浦东新区', '中心']
+
+
+def test_resolve_no_match():
+    assert _index().resolve('origin', '广州') == ('1=0', [])
+
+
+def test_resolve_falls_back_to_like():
+    # 命中组合超过 max_in、该侧没有字典、关键词为空时都返回 None，由调用方退回 LIKE
+    assert _index(max_in=1).resolve('origin', '区') is None
+    assert _index().resolve('destination', '北京') is None
+    assert _index().resolve('origin', '  ') is None
+
+
+def test_cities():
+    assert _index().cities() == ['上海', '北京']
+
+
+def _split_row_by_row(df, side):
+    """逐行调用 parse_location 的参考实现"""
+    city_col = LOCATION_COLUMNS[side][0]
+    known = {normalize_city(c) for col, _, _ in LOCATION_COLUMNS.values() if col in df for c in df[col]}
+    known.discard('')
+    cities = df[city_col] if city_col in df else [''] * len(df)
+    return [parse_location(address, city, known) for address, city in zip(df[side], cities)]
+
+
+def _frame(with_city_columns=True):
+    data = {
+        'origin': ['北京朝阳区分拨中心', '北京朝阳区分拨中心', '上海市浦东新区张江站', '广州天河区',
+                   '广州天河区', '深圳市南山区科技园', '', None, '杭州西湖区'],
+        'destination': ['上海浦东新区', '上海浦东新区', '北京海淀区', '成都市武侯区',
+                        '成都市武侯区', '北京朝阳区分拨中心', '上海浦东新区', '广州天河区', ''],
+    }
+    if with_city_columns:
+        data['origin_city'] = ['北京', '北京', '上海市', '', '广州', '', '', '', None]
+        data['destination_city'] = ['上海', '', '北京', '', '', '北京', None, '广州', '']
+    return pd.DataFrame(data)
+
+
+@pytest.mark.parametrize('with_city_columns', [True, False])
+def test_split_locations_matches_parse_location(with_city_columns):
+    df = _frame(with_city_columns)
+    for side in LOCATION_COLUMNS:
+        # None 地址 / 城市与空串等价
+        expected = _split_row_by_row(df.fillna(''), side)
+        split_locations(df, side)
+        assert list(zip(*(df[c] for c in LOCATION_COLUMNS[side]))) == expected
+
+
+def test_split_locations_keeps_index_and_empty_chunk():
+    df = _frame().iloc[3:].set_index(pd.Index([10, 11, 12, 13, 14, 15]))
+    split_locations(df, 'origin')
+    assert df.loc[10, 'origin_district'] == '天河区'
+    assert df.loc[12, 'origin_city'] == '深圳'
+
+    empty = _frame().iloc[:0].copy()
+    split_locations(empty, 'origin')
+    assert list(empty['origin_hub']) == []
@@ -0,0 +1,87 @@
+"""模型响应缓存"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from internal.pkg.models.response_cache import (
+    ResponseCache, cache_key, merge_chunks, normalize_prompt, replay_chunks
+)
+
+SEGMENTS = [('thinking', '想一想'), ('text', 'hello')]
+
+
+def test_merge_chunks_joins_adjacent_and_skips_empty():
+    chunks = [
+        {'type': 'thinking', 'content': '想'},
+        {'type': 'thinking', 'content': '一想'},
+        {'type': 'text', 'content': ''},
+        {'type': 'text', 'content': 'hel'},
+        {'type': 'text', 'content': 'lo'},
+        {'type': 'thinking', 'content': '再想'},
+    ]
+    assert merge_chunks(chunks) == [('thinking', '想一想'), ('text', 'hello'), ('thinking', '再想')]
+
+
+def test_replay_chunks_round_trip():
+    pieces = list(replay_chunks(SEGMENTS, size=2))
+    assert pieces[:2] == [{'type': 'thinking', 'content': '想一'}, {'type': 'thinking', 'content': '想'}]
+    assert all(len(p['content']) <= 2 for p in pieces)
+    assert merge_chunks(pieces) == SEGMENTS
+
+
+def test_cache_key_ignores_whitespace_but_not_generation():
+    assert normalize_prompt('  a \n\t b ') == 'a b'
+    assert cache_key('m', 'a  b', 1) == cache_key('m', ' a b\n', 1)
+    assert cache_key('m', 'a b', 1) != cache_key('m', 'a b', 2)
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(path='', memory_entries=4)
+    cache.put('k', 'm', SEGMENTS, ttl=-1)
+    assert cache.get('k') is None
+    stats = cache.stats()
+    assert stats['expired'] == 1 and stats['misses'] == 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(path='', memory_entries=2)
+    cache.put('a', 'm', SEGMENTS, ttl=60)
+    cache.put('b', 'm', SEGMENTS, ttl=60)
+    assert cache.get('a') == SEGMENTS          # a 变为最近使用
+    cache.put('c', 'm', SEGMENTS, ttl=60)      # 淘汰 b
+    assert cache.get('b') is None
+    assert cache.get('a') == SEGMENTS and cache.get('c') == SEGMENTS
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_hit_after_restart(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite3')
+    cache = ResponseCache(path=path, memory_entries=4)
+    cache.put('k', 'm', SEGMENTS, ttl=60)
+    cache.put('old', 'm', SEGMENTS, ttl=0.01)
+    cache.close()
+
+    time.sleep(0.02)
+    reopened = ResponseCache(path=path, memory_entries=4)
+    try:
+        assert reopened.get('k') == SEGMENTS
+        assert reopened.get('k') == SEGMENTS   # 第二次从内存命中
+        assert reopened.get('old') is None
+        stats = reopened.stats()
+        assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+    finally:
+        reopened.close()
+
+
+def test_disk_entries_cap(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'), memory_entries=1, disk_entries=2)
+    try:
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, 'm', SEGMENTS, ttl=60 + i)
+        # 内存只留 c；磁盘按过期时间保留 b、c
+        assert cache.get('a') is None
+        assert cache.get('b') == SEGMENTS
+    finally:
+        cache.close()
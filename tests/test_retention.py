@@ -0,0 +1,68 @@
+"""日志分区辅助函数"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from internal.pkg.dao.retention import (
+    _partition_clause, _partition_month, ensure_future_partitions, month_start, partition_name
+)
+
+
+@pytest.mark.parametrize('day, offset, expected', [
+    (date(2024, 1, 31), 0, date(2024, 1, 1)),
+    (date(2024, 1, 15), 1, date(2024, 2, 1)),
+    (date(2024, 12, 5), 1, date(2025, 1, 1)),
+    (date(2024, 1, 5), -1, date(2023, 12, 1)),
+    (date(2024, 3, 1), -14, date(2023, 1, 1)),
+])
+def test_month_start(day, offset, expected):
+    assert month_start(day, offset) == expected
+
+
+def test_partition_name_round_trip():
+    assert partition_name(date(2024, 1, 1)) == 'p202401'
+    assert _partition_month('p202401') == date(2024, 1, 1)
+    assert _partition_month(partition_name(date(2025, 12, 1))) == date(2025, 12, 1)
+
+
+@pytest.mark.parametrize('name', ['pmax', 'p2024', 'p2024011', 'x202401', 'p2024ab'])
+def test_partition_month_rejects_other_names(name):
+    assert _partition_month(name) is None
+
+
+def test_partition_clause_upper_bound_is_next_month():
+    assert _partition_clause(date(2024, 12, 1)) == (
+        "PARTITION p202412 VALUES LESS THAN (TO_DAYS('2025-01-01'))")
+
+
+class _Cursor:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchall(self):
+        return [{'name': name} for name in self.partitions]
+
+
+def test_ensure_future_partitions_splits_pmax():
+    current = month_start(date.today())
+    cursor = _Cursor([partition_name(month_start(current, -1)), partition_name(current), 'pmax'])
+    created = ensure_future_partitions(cursor, 'operation_logs', 2)
+    assert created == [partition_name(month_start(current, 1)), partition_name(month_start(current, 2))]
+    assert cursor.statements[-1].startswith('ALTER TABLE operation_logs REORGANIZE PARTITION pmax INTO (')
+
+
+def test_ensure_future_partitions_noop():
+    current = month_start(date.today())
+    cursor = _Cursor([partition_name(current), partition_name(month_start(current, 1)), 'pmax'])
+    assert ensure_future_partitions(cursor, 'operation_logs', 1) == []
+    assert len(cursor.statements) == 1    # 只查询了分区列表
+    # 未分区的表不做任何修改
+    assert ensure_future_partitions(_Cursor([]), 'operation_logs', 1) == []
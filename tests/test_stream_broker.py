@@ -0,0 +1,81 @@
+"""流式生成合并"""
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from internal.pkg.models.stream_broker import StreamBroker
+
+
+def _gated_factory(gate: threading.Event, calls: list):
+    """先产出 a，等 gate 放行后再产出 b、c"""
+    async def generate():
+        calls.append(1)
+        yield {'type': 'text', 'content': 'a'}
+        while not gate.is_set():
+            await asyncio.sleep(0.005)
+        yield {'type': 'text', 'content': 'b'}
+        yield {'type': 'text', 'content': 'c'}
+    return generate
+
+
+def test_late_subscriber_gets_prefix_and_live_tail():
+    broker = StreamBroker(retention=60)
+    gate, calls = threading.Event(), []
+    factory = _gated_factory(gate, calls)
+
+    first = broker.subscribe('k', factory)
+    assert next(first)['content'] == 'a'         # 生成已开始，a 已缓冲
+
+    late = broker.subscribe('k', factory)
+    assert next(late)['content'] == 'a'          # 先重放前缀
+    gate.set()
+    assert [item['content'] for item in late] == ['b', 'c']
+    assert [item['content'] for item in first] == ['b', 'c']
+
+    replay = broker.subscribe('k', factory)
+    assert [item['content'] for item in replay] == ['a', 'b', 'c']
+    assert len(calls) == 1
+    stats = broker.stats()
+    assert (stats['started'], stats['joined_live'], stats['reused']) == (1, 1, 1)
+    assert stats['retained'] == 1
+
+
+def test_failed_flight_not_retained():
+    broker = StreamBroker(retention=60)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        yield {'type': 'text', 'content': 'partial'}
+        raise RuntimeError('boom')
+
+    items = list(broker.subscribe('k', failing))
+    assert items[0] == {'type': 'text', 'content': 'partial'}
+    assert items[-1] == {'type': 'error', 'content': 'boom'}
+
+    # 失败的生成由后台线程移除；再次订阅重新生成
+    for _ in range(100):
+        if 'k' not in broker._flights:
+            break
+        threading.Event().wait(0.01)
+    assert 'k' not in broker._flights
+    assert broker.stats()['failed'] == 1
+
+    list(broker.subscribe('k', failing))
+    assert len(calls) == 2
+
+
+def test_retention_expiry_starts_new_flight():
+    broker = StreamBroker(retention=0)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        yield {'type': 'text', 'content': 'x'}
+
+    assert list(broker.subscribe('k', generate)) == [{'type': 'text', 'content': 'x'}]
+    assert list(broker.subscribe('k', generate)) == [{'type': 'text', 'content': 'x'}]
+    assert len(calls) == 2